@@ -0,0 +1,145 @@
+"""Benchmark streaming export against materializing every row.
+
+With POMO_DATABASE_URL set, rows are generated server-side in that (scratch)
+database, tagged and deleted afterwards. Without it, a temporary local SQLite
+store is used.
+
+    POMO_DATABASE_URL=postgresql://localhost/pomo_bench \
+        uv run python benchmarks/bench_export.py --rows 1000000
+
+Peak memory is measured with tracemalloc, which slows every run down by a
+similar factor; compare the runs with each other, not with real export times.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from pomo.export import EXPORT_FORMATS, is_arrow_available, open_writer
+
+TAG = "pomo-bench-export"
+
+
+def seed_postgres(rows: int) -> None:
+    from pomo.db import get_connection
+
+    conn = get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO pomodoro_sessions
+            (session_type, started_at, ended_at, planned_duration_seconds,
+             actual_duration_seconds, completed, notes)
+            SELECT 'focus',
+                   '2000-01-01'::timestamptz + i * interval '30 minutes',
+                   '2000-01-01'::timestamptz + i * interval '30 minutes'
+                       + interval '25 minutes',
+                   1500, 1500, i % 5 <> 0, %s
+            FROM generate_series(1, %s) AS i
+            """,
+            (TAG, rows),
+        )
+    conn.close()
+
+
+def cleanup_postgres() -> None:
+    from pomo.db import get_connection
+
+    conn = get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM pomodoro_sessions WHERE notes = %s", (TAG,))
+    conn.close()
+
+
+def seed_sqlite(rows: int) -> None:
+    from pomo import local_db
+
+    base = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    batch = []
+    for i in range(rows):
+        started_at = base + timedelta(minutes=30 * i)
+        batch.append(
+            {
+                "session_type": "focus",
+                "started_at": started_at,
+                "ended_at": started_at + timedelta(minutes=25),
+                "planned_seconds": 1500,
+                "completed": i % 5 != 0,
+                "notes": TAG,
+            }
+        )
+        if len(batch) == 50_000:
+            local_db.sync_sessions(batch)
+            batch = []
+    local_db.sync_sessions(batch)
+
+
+def measure(name: str, run) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<22} {rows:>8} rows  {seconds:8.2f}s  {rows / seconds:>10.0f} rows/s"
+        f"  peak {peak / 2**20:8.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows to export")
+    args = parser.parse_args()
+
+    if os.getenv("POMO_DATABASE_URL"):
+        from pomo import db as backend
+
+        if not backend.init_db():
+            sys.exit("POMO_DATABASE_URL must point at a reachable scratch database")
+        cleanup_postgres()
+        seed_postgres(args.rows)
+        cleanup = cleanup_postgres
+    else:
+        os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="pomo-bench-")
+        from pomo import local_db as backend
+
+        seed_sqlite(args.rows)
+        cleanup = backend.close
+
+    out_dir = tempfile.mkdtemp(prefix="pomo-bench-out-")
+    try:
+        measure("fetchall (get_sessions)", lambda: len(backend.get_sessions(args.rows)))
+
+        for fmt in EXPORT_FORMATS:
+            if fmt in ("parquet", "arrow") and not is_arrow_available():
+                print(f"{fmt:<22} skipped (pyarrow not installed)")
+                continue
+            path = os.path.join(out_dir, f"sessions.{fmt}")
+
+            def run(fmt=fmt, path=path):
+                if fmt in ("parquet", "arrow"):
+                    writer = open_writer(fmt, path=path)
+                    stream = None
+                else:
+                    stream = open(path, "w", newline="")
+                    writer = open_writer(fmt, stream=stream)
+                try:
+                    return backend.export_sessions(writer.write_batch)
+                finally:
+                    writer.close()
+                    if stream:
+                        stream.close()
+
+            measure(f"export {fmt}", run)
+            print(f"{'':<22} {os.path.getsize(path) / 2**20:8.1f} MiB on disk")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
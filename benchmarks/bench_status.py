@@ -0,0 +1,45 @@
+"""Microbenchmark status decoding: JSON read_status against the compact record.
+
+    uv run python benchmarks/bench_status.py
+"""
+
+import os
+import tempfile
+import timeit
+
+os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="pomo-bench-")
+
+import pomo.status  # noqa: E402
+from pomo.status import (  # noqa: E402
+    Status,
+    read_compact_status,
+    read_status,
+    read_status_fast,
+    write_status,
+)
+
+NUMBER = 20000
+
+
+def uncached_read_status() -> Status:
+    pomo.status._status_cache = None
+    return read_status()
+
+
+def report(name: str, func) -> None:
+    seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+    print(f"{name:<28} {seconds / NUMBER * 1e6:8.2f} us/call")
+
+
+def main() -> None:
+    write_status(Status(duration_seconds=25 * 60, notes="Writing blog post"))
+
+    report("read_status (json)", uncached_read_status)
+    report("read_status (stat cache)", read_status)
+    report("read_compact_status (read)", read_compact_status)
+    report("read_compact_status (mmap)", lambda: read_compact_status(use_mmap=True))
+    report("read_status_fast", read_status_fast)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark one-row-per-connection sync against bulk sync.
+
+Needs a scratch database; rows are tagged and deleted afterwards.
+
+    POMO_DATABASE_URL=postgresql://localhost/pomo_bench \
+        uv run python benchmarks/bench_sync.py --rows 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from pomo.db import get_connection, init_db, sync_session, sync_sessions
+
+TAG = "pomo-bench-sync"
+
+
+def make_sessions(count: int) -> list[dict]:
+    """Generate synthetic finished sessions."""
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    sessions = []
+    for i in range(count):
+        started_at = base + timedelta(minutes=30 * i)
+        sessions.append(
+            {
+                "session_type": "focus",
+                "started_at": started_at,
+                "ended_at": started_at + timedelta(minutes=25),
+                "planned_seconds": 25 * 60,
+                "completed": True,
+                "notes": TAG,
+            }
+        )
+    return sessions
+
+
+def cleanup() -> None:
+    conn = get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM pomodoro_sessions WHERE notes = %s", (TAG,))
+    conn.close()
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    print(f"{name:<28} {rows:>7} rows  {seconds:8.3f}s  {rows / seconds:>10.0f} rows/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000, help="rows for bulk sync")
+    parser.add_argument("--single-rows", type=int, default=200, help="rows for sync_session")
+    parser.add_argument("--batch", type=int, default=500, help="bulk batch size")
+    args = parser.parse_args()
+
+    if not os.getenv("POMO_DATABASE_URL") or not init_db():
+        sys.exit("POMO_DATABASE_URL must point at a reachable scratch database")
+
+    cleanup()
+    try:
+        sessions = make_sessions(args.single_rows)
+        start = time.perf_counter()
+        for session in sessions:
+            sync_session(**session)
+        report("sync_session (per row)", len(sessions), time.perf_counter() - start)
+
+        sessions = make_sessions(args.rows)
+        start = time.perf_counter()
+        stored = 0
+        for i in range(0, len(sessions), args.batch):
+            stored += sync_sessions(sessions[i : i + args.batch]).count(True)
+        report(f"sync_sessions (batch {args.batch})", stored, time.perf_counter() - start)
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Benchmark suite for the CLI hot paths, with baselines and regression checks.
+
+Measures:
+
+- cold start of ``pomo`` without a subcommand (the tmux statusline), as wall
+  time of a fresh interpreter minus a bare ``python -c pass``
+- the import graph of that call: modules loaded, cumulative import time
+  (``-X importtime``) and any heavy module that leaked into it
+- per-call cost of read_status, write_status, get_config, format_duration,
+  get_emoji and parse_duration
+- sync_session latency against the scratch database in POMO_DATABASE_URL,
+  if set (rows are tagged and deleted afterwards)
+
+Save a baseline on a quiet machine, then compare later runs against it:
+
+    uv run python benchmarks/suite.py --save benchmarks/baseline.json
+    uv run python benchmarks/suite.py --compare benchmarks/baseline.json
+
+Comparison exits with status 1 when a metric is slower than its baseline by
+more than the threshold (default 25%, cold start and sync latency are given
+more slack as they are noisier), when more modules are imported, or when a
+heavy module shows up in the statusline path. Baselines are machine
+specific; only compare runs from the same machine and Python.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+CONFIG_HOME = tempfile.mkdtemp(prefix="pomo-bench-")
+os.environ["XDG_CONFIG_HOME"] = CONFIG_HOME
+os.environ["XDG_RUNTIME_DIR"] = CONFIG_HOME  # No daemon socket here
+
+import pomo.config  # noqa: E402
+import pomo.status  # noqa: E402
+from pomo.config import Config, get_config  # noqa: E402
+from pomo.status import Status, read_status, write_status  # noqa: E402
+from pomo.timer import format_duration, get_emoji  # noqa: E402
+
+# Modules that must never be imported by a bare ``pomo``
+HEAVY_MODULES = ("typer", "click", "rich", "psycopg", "pomo.main", "pomo.db")
+
+# Allowed slowdown over the baseline, as a fraction
+DEFAULT_THRESHOLD = 0.25
+
+# Slack for metrics dominated by process startup or the network
+NOISY_THRESHOLDS = {"cold_start_ms": 0.5, "sync_session_p50_ms": 1.0}
+
+TAG = "pomo-bench-suite"
+
+STATUSLINE = "from pomo.statusline import cli\ncli()\n"
+
+PROBE = "import sys\n" + STATUSLINE + "print(' '.join(sorted(sys.modules)))\n"
+
+
+def run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env.pop("POMO_DATABASE_URL", None)
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+
+def wall_time(code: str, runs: int) -> float:
+    """Median wall time of a fresh interpreter running code, in ms."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_python(code)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_cold_start(runs: int) -> dict:
+    """Cold start and import graph of ``pomo`` without a subcommand."""
+    interpreter = wall_time("pass", runs)
+    statusline = wall_time(STATUSLINE, runs)
+
+    modules = set(run_python(PROBE).stdout.splitlines()[-1].split())
+    baseline_modules = set(run_python("import sys; print(' '.join(sys.modules))").stdout.split())
+
+    # -X importtime reports "self | cumulative | name" in microseconds, with
+    # nested imports indented; sum the top-level pomo imports
+    import_us = 0
+    for line in run_python(STATUSLINE, "-X", "importtime").stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[2].startswith(" pomo"):
+            import_us += int(fields[1])
+
+    return {
+        "cold_start_ms": statusline - interpreter,
+        "import_ms": import_us / 1000,
+        "modules": len(modules - baseline_modules),
+        "heavy_modules": sorted(
+            name for name in modules if name in HEAVY_MODULES or name.split(".")[0] in HEAVY_MODULES
+        ),
+    }
+
+
+def per_call(func, number: int) -> float:
+    """Best per-call time of func over a few repeats, in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def uncached_read_status() -> Status:
+    pomo.status._status_cache = None
+    return read_status()
+
+
+def uncached_get_config() -> Config:
+    pomo.config._config = None
+    return get_config()
+
+
+def bench_calls(number: int) -> dict:
+    """Per-call cost of the functions on the statusline and CLI paths."""
+    from pomo.main import parse_duration
+
+    status = Status(duration_seconds=25 * 60, notes="Writing blog post")
+    write_status(status)
+    config = get_config()
+
+    return {
+        "read_status_us": per_call(uncached_read_status, number),
+        "write_status_us": per_call(lambda: write_status(status), max(number // 20, 1)),
+        "get_config_us": per_call(uncached_get_config, number),
+        "format_duration_us": per_call(lambda: format_duration(5025), number),
+        "get_emoji_us": per_call(lambda: get_emoji(config, status, 300), number),
+        "parse_duration_us": per_call(lambda: parse_duration("1h30m"), number),
+    }
+
+
+def bench_sync(rows: int) -> dict:
+    """sync_session latency against POMO_DATABASE_URL."""
+    from pomo.db import connection, init_db, sync_session
+
+    if not init_db():
+        sys.exit("POMO_DATABASE_URL must point at a reachable scratch database")
+
+    base = datetime(2001, 1, 1, tzinfo=timezone.utc)
+    samples = []
+    try:
+        for i in range(rows):
+            started_at = base + timedelta(minutes=30 * i)
+            start = time.perf_counter()
+            sync_session(
+                "focus", started_at, started_at + timedelta(minutes=25), 25 * 60, True, TAG
+            )
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM pomodoro_sessions WHERE notes = %s", (TAG,))
+
+    samples.sort()
+    return {
+        "sync_session_p50_ms": samples[len(samples) // 2],
+        "sync_session_p95_ms": samples[int(len(samples) * 0.95)],
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare results with a baseline.
+
+    Returns:
+        One message per regression
+    """
+    failures = []
+    for name, base in baseline["metrics"].items():
+        value = results.get(name)
+        if value is None or name == "heavy_modules":
+            continue
+        if name == "modules":
+            if value > base:
+                failures.append(f"{name}: {value} imported, baseline {base}")
+            continue
+        limit = base * (1 + NOISY_THRESHOLDS.get(name, threshold))
+        if value > limit:
+            failures.append(f"{name}: {value:.2f}, baseline {base:.2f} (limit {limit:.2f})")
+    if results.get("heavy_modules"):
+        failures.append(f"heavy modules imported: {', '.join(results['heavy_modules'])}")
+    return failures
+
+
+def report(results: dict, baseline: dict | None) -> None:
+    for name, value in results.items():
+        if isinstance(value, list):
+            print(f"{name:<24} {', '.join(value) or '-'}")
+            continue
+        line = f"{name:<24} {value:10.2f}" if isinstance(value, float) else f"{name:<24} {value:10}"
+        base = (baseline or {}).get("metrics", {}).get(name)
+        if isinstance(base, (int, float)) and base:
+            line += f"   baseline {base:10.2f}  {(value - base) / base:+7.1%}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=20, help="cold start runs")
+    parser.add_argument("--number", type=int, default=20000, help="calls per micro timing")
+    parser.add_argument("--sync-rows", type=int, default=200, help="sync_session calls")
+    parser.add_argument("--save", type=Path, help="write the results as a baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown"
+    )
+    args = parser.parse_args()
+
+    results = bench_cold_start(args.runs)
+    results.update(bench_calls(args.number))
+    if os.getenv("POMO_DATABASE_URL"):
+        results.update(bench_sync(args.sync_rows))
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report(results, baseline)
+
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.node(),
+                    "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "metrics": results,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"Saved baseline to {args.save}")
+
+    if baseline is not None:
+        failures = compare(results, baseline, args.threshold)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
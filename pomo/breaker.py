@@ -0,0 +1,110 @@
+"""Circuit breaker for database connections.
+
+The breaker state lives in ``db_breaker.json`` in the config directory, so that
+short-lived CLI invocations share it. Other endpoints, such as the read
+replica, get breakers of their own under another name. After a few consecutive
+connection failures the breaker opens and connection attempts are skipped until
+a backoff window has passed. Then a single process gets to try again
+(half-open); its result closes the breaker or opens it for a longer window.
+"""
+
+import json
+import time
+from pathlib import Path
+
+from pomo.config import get_config_dir
+from pomo.locking import locked
+
+# Consecutive connection failures before the breaker opens
+FAILURE_THRESHOLD = 3
+
+# Open window: 30s, doubling on every failed trial, capped at 30 minutes
+OPEN_BASE = 30
+OPEN_MAX = 30 * 60
+
+# How long a half-open trial may take before another process may try
+TRIAL_TIMEOUT = 30
+
+
+def get_breaker_path(name: str = "db") -> Path:
+    """Get the state file path of a circuit breaker."""
+    return get_config_dir() / f"{name}_breaker.json"
+
+
+def _lock(name: str):
+    return locked(get_config_dir() / f"{name}_breaker.lock")
+
+
+def _read_state(name: str) -> dict:
+    try:
+        with open(get_breaker_path(name)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_state(name: str, state: dict) -> None:
+    with open(get_breaker_path(name), "w") as f:
+        json.dump(state, f)
+
+
+def allow(name: str = "db") -> bool:
+    """
+    Check if a connection attempt may be made now.
+
+    Returns:
+        False while the breaker is open, or while another process runs the
+        half-open trial
+    """
+    # Fast path: no failures recorded
+    if not get_breaker_path(name).exists():
+        return True
+
+    with _lock(name):
+        state = _read_state(name)
+        if state.get("failures", 0) < FAILURE_THRESHOLD:
+            return True
+
+        now = time.time()
+        if now < state.get("open_until", 0) or now < state.get("trial_until", 0):
+            return False
+
+        # Half-open: this process runs the trial, the others keep skipping
+        state["trial_until"] = now + TRIAL_TIMEOUT
+        _write_state(name, state)
+        return True
+
+
+def record_success(name: str = "db") -> None:
+    """Close the breaker after a successful connection."""
+    if not get_breaker_path(name).exists():
+        return
+
+    with _lock(name):
+        get_breaker_path(name).unlink(missing_ok=True)
+
+
+def record_failure(name: str = "db") -> None:
+    """Count a failed connection and open the breaker past the threshold."""
+    get_config_dir().mkdir(parents=True, exist_ok=True)
+
+    with _lock(name):
+        state = _read_state(name)
+        failures = state.get("failures", 0) + 1
+        state = {"failures": failures}
+
+        if failures >= FAILURE_THRESHOLD:
+            trips = failures - FAILURE_THRESHOLD
+            window = min(OPEN_BASE * 2**trips, OPEN_MAX)
+            state["open_until"] = time.time() + window
+
+        _write_state(name, state)
+
+
+def is_open(name: str = "db") -> bool:
+    """Check if the breaker currently blocks connection attempts."""
+    state = _read_state(name)
+    return (
+        state.get("failures", 0) >= FAILURE_THRESHOLD
+        and time.time() < state.get("open_until", 0)
+    )
@@ -0,0 +1,225 @@
+"""On-disk cache of read query results.
+
+Results of ``pomo list`` and ``pomo stats`` are kept as JSON files in the
+``cache`` directory of the config directory, keyed by a hash of the query
+and its parameters. An entry younger than the TTL (``POMO_CACHE_TTL``
+seconds, 0 disables the cache) is served without touching the database. An
+older entry is revalidated with the backend's cheap ``max(created_at)``
+probe and served again if nothing was written since.
+
+Every write through pomo invalidates the cache by replacing a generation
+token; entries of an older generation are never served. Entries are evicted
+least recently used first once the directory grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+from pomo.config import get_config_dir
+from pomo.locking import locked
+
+T = TypeVar("T")
+
+# Seconds an entry is served without asking the database
+DEFAULT_TTL = 30
+
+# Total size of the entries before the least recently used are evicted
+MAX_CACHE_BYTES = 1024 * 1024
+
+COUNTERS = ("hits", "revalidated", "misses", "invalidations", "evictions")
+
+
+def get_cache_dir() -> Path:
+    """Get the query cache directory."""
+    return get_config_dir() / "cache"
+
+
+def get_ttl() -> int:
+    """Get the cache TTL in seconds from POMO_CACHE_TTL."""
+    try:
+        return int(os.getenv("POMO_CACHE_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"cannot cache {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def cache_key(parts: list) -> str:
+    """Hash a query name and its parameters into an entry name."""
+    text = json.dumps(parts, default=_encode, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def _generation() -> str:
+    try:
+        return (get_cache_dir() / "generation").read_text()
+    except FileNotFoundError:
+        return ""
+
+
+def invalidate() -> None:
+    """Invalidate every entry; called after each write."""
+    cache_dir = get_cache_dir()
+    if not cache_dir.exists():
+        return
+    tmp_path = cache_dir / f"generation.{os.getpid()}.tmp"
+    tmp_path.write_text(uuid.uuid4().hex)
+    os.replace(tmp_path, cache_dir / "generation")
+    count("invalidations")
+
+
+def get_stats_path() -> Path:
+    """Get the path of the hit and miss counters."""
+    return get_cache_dir() / "stats.json"
+
+
+def read_stats() -> dict[str, int]:
+    """Read the cache counters."""
+    try:
+        with open(get_stats_path()) as f:
+            stats = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        stats = {}
+    return {name: stats.get(name, 0) for name in COUNTERS}
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to one of the cache counters."""
+    path = get_stats_path()
+    with locked(get_cache_dir() / "stats.lock"):
+        stats = read_stats()
+        stats[name] += amount
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(stats))
+        os.replace(tmp_path, path)
+
+
+def entries() -> list[Path]:
+    """Get the entry files, least recently used first."""
+    try:
+        paths = list(get_cache_dir().glob("*.json"))
+    except OSError:
+        return []
+    paths = [path for path in paths if path != get_stats_path()]
+    return sorted(paths, key=lambda path: path.stat().st_mtime_ns)
+
+
+def _evict(max_bytes: int) -> None:
+    paths = entries()
+    total = sum(path.stat().st_size for path in paths)
+    evicted = 0
+    for path in paths:
+        if total <= max_bytes:
+            break
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+        evicted += 1
+    if evicted:
+        count("evictions", evicted)
+
+
+def clear() -> int:
+    """
+    Remove every entry and reset the counters.
+
+    Returns:
+        Number of entries removed
+    """
+    paths = entries()
+    for path in paths:
+        path.unlink(missing_ok=True)
+    get_stats_path().unlink(missing_ok=True)
+    return len(paths)
+
+
+def _read_entry(path: Path) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f, object_hook=_decode)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(path: Path, entry: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f, default=_encode)
+    os.replace(tmp_path, path)
+
+
+def cached(
+    parts: list,
+    probe: Callable[[], Optional[str]],
+    compute: Callable[[], Optional[T]],
+) -> Optional[T]:
+    """
+    Serve a query result from the cache, or compute and store it.
+
+    Args:
+        parts: Query name and parameters; the cache key
+        probe: Returns the backend's latest created_at as text ("" when
+            empty), or None if the backend is unavailable
+        compute: Runs the query; None means it failed and is not stored
+
+    Returns:
+        The cached or computed result
+    """
+    ttl = get_ttl()
+    if ttl <= 0:
+        return compute()
+
+    path = get_cache_dir() / f"{cache_key(parts)}.json"
+    generation = _generation()
+    entry = _read_entry(path)
+    if entry is not None and entry.get("generation") == generation:
+        if time.time() - entry["stored"] < ttl:
+            os.utime(path)
+            count("hits")
+            return entry["result"]
+        marker = probe()
+        if marker is not None and marker == entry["probe"]:
+            entry["stored"] = time.time()
+            _write_entry(path, entry)
+            count("revalidated")
+            return entry["result"]
+    else:
+        marker = probe()
+
+    count("misses")
+    result = compute()
+    # Skip storing if the backend is down or a write happened meanwhile
+    if result is None or marker is None or _generation() != generation:
+        return result
+
+    _write_entry(
+        path,
+        {
+            "generation": generation,
+            "probe": marker,
+            "stored": time.time(),
+            "result": result,
+        },
+    )
+    _evict(MAX_CACHE_BYTES)
+    return result
@@ -0,0 +1,75 @@
+"""Thin client for the optional pomod daemon.
+
+Every helper falls back to the file-based status store when the daemon is not
+running, so callers never have to care whether pomod is up. Like the
+statusline, this module only uses the stdlib.
+"""
+
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Optional
+
+from pomo.config import get_config_dir
+from pomo.profile import traced
+from pomo.status import Status, read_status, status_from_dict, status_to_dict, write_status
+
+# How long to wait for the daemon before falling back to the files
+TIMEOUT = 0.5
+
+
+def get_socket_path() -> Path:
+    """Get the daemon socket path."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "pomo" / "pomod.sock"
+    return get_config_dir() / "pomod.sock"
+
+
+def request(
+    message: dict,
+    timeout: float = TIMEOUT,
+    path: Optional[Path] = None,
+) -> Optional[dict]:
+    """
+    Send a request to the daemon.
+
+    Returns:
+        The decoded response, or None if the daemon is not running or the
+        request failed
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path or get_socket_path()))
+            sock.sendall(json.dumps(message).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except OSError:
+        return None
+
+    try:
+        response = json.loads(line)
+    except ValueError:
+        return None
+
+    if not isinstance(response, dict) or not response.get("ok"):
+        return None
+    return response
+
+
+@traced("load_status")
+def load_status() -> Status:
+    """Get the current status from the daemon, or from file."""
+    response = request({"cmd": "status"})
+    if response is None:
+        return read_status()
+    return status_from_dict(response["status"])
+
+
+@traced("save_status")
+def save_status(status: Status) -> None:
+    """Store a new status through the daemon, or write it to file."""
+    if request({"cmd": "set", "status": status_to_dict(status)}) is None:
+        write_status(status)
@@ -1,8 +1,16 @@
-"""Configuration management for pomo."""
+"""Configuration management for pomo.
+
+config.json is validated once per change: the resolved Config is cached with
+marshal in config.snapshot, keyed by the file's mtime and size, so a
+statusline tick costs a stat and a small unmarshal.
+"""
 
 import json
+import marshal
 import os
-from dataclasses import dataclass, field
+import re
+import sys
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -33,6 +41,9 @@ class Notifications:
     enabled: bool = True
     urgency: str = "normal"  # low, normal, critical
     icon: Optional[str] = None
+    backend: str = "auto"  # auto, notify-send, dbus, command, webhook
+    command: Optional[list[str]] = None  # argv for the command backend
+    webhook: Optional[str] = None  # URL for the webhook backend
 
 
 @dataclass
@@ -50,7 +61,7 @@ def get_config_dir() -> Path:
     xdg_config = os.environ.get("XDG_CONFIG_HOME")
     if xdg_config:
         return Path(xdg_config) / "pomo"
-    return Path.home() / ".config" / "pomo"
+    return Path(os.path.expanduser("~/.config/pomo"))
 
 
 def get_config_path() -> Path:
@@ -58,83 +69,356 @@ def get_config_path() -> Path:
     return get_config_dir() / "config.json"
 
 
+def get_snapshot_path() -> Path:
+    """Get the path of the resolved config snapshot."""
+    return get_config_dir() / "config.snapshot"
+
+
 _config: Optional[Config] = None
 
 
+class ConfigError(ValueError):
+    """An invalid config file, with every problem found in it."""
+
+    def __init__(self, path: Path, problems: list[str]):
+        self.path = path
+        self.problems = problems
+        super().__init__(f"{path}: " + "; ".join(problems))
+
+
+# Bump when the resolved form of Config or its validation changes, to ignore
+# older snapshots
+SNAPSHOT_VERSION = 2
+
+URGENCIES = ("low", "normal", "critical")
+
+NOTIFICATION_BACKENDS = ("auto", "notify-send", "dbus", "command", "webhook")
+
+# Placeholders filled in the arguments of the command backend
+COMMAND_FIELDS = ("title", "body", "urgency", "icon")
+
+DURATION_PATTERN = re.compile(r"(\d+)([hms])")
+_DURATION_FULL = re.compile(r"(?:\d+[hms])+")
+
+_UNIT_SECONDS = {"h": 3600, "m": 60, "s": 1}
+
+# Known keys of each section, with the Config attribute they set
+_SECTIONS = {
+    "durations": {"focus": "focus", "break": "break_", "deep": "deep"},
+    "emojis": {"focus": "focus", "break": "break_", "deep": "deep", "warn": "warn"},
+    "notifications": {
+        "enabled": "enabled",
+        "urgency": "urgency",
+        "icon": "icon",
+        "backend": "backend",
+        "command": "command",
+        "webhook": "webhook",
+    },
+}
+
+
+def _check_placeholders(arg: str) -> Optional[str]:
+    """Check that a command argument only uses the COMMAND_FIELDS placeholders."""
+    from string import Formatter
+
+    try:
+        fields = [
+            (name, spec, conversion)
+            for _, name, spec, conversion in Formatter().parse(arg)
+            if name is not None
+        ]
+    except ValueError:
+        return "unbalanced braces (write literal braces as {{ and }})"
+    for name, spec, conversion in fields:
+        if name not in COMMAND_FIELDS:
+            return (
+                f"unknown placeholder {{{name}}}, expected "
+                f"{', '.join(f'{{{f}}}' for f in COMMAND_FIELDS)} "
+                "(write literal braces as {{ and }})"
+            )
+        if spec or conversion:
+            return f"placeholder {{{name}}} takes no format spec or conversion"
+    return None
+
+
+def _check_value(section: str, key: str, value) -> Optional[str]:
+    """Check one setting, returning a problem description if it is invalid."""
+    if section == "emojis":
+        if key == "warn":
+            if not value or not isinstance(value, list) or not all(
+                isinstance(v, str) for v in value
+            ):
+                return "expected a non-empty list of strings"
+        elif not isinstance(value, str):
+            return "expected a string"
+    elif section == "notifications":
+        if key == "enabled" and not isinstance(value, bool):
+            return "expected true or false"
+        if key == "urgency" and value not in URGENCIES:
+            return f"expected one of {', '.join(URGENCIES)}, got {value!r}"
+        if key == "backend" and value not in NOTIFICATION_BACKENDS:
+            return f"expected one of {', '.join(NOTIFICATION_BACKENDS)}, got {value!r}"
+        if key == "command" and value is not None:
+            if not value or not isinstance(value, list) or not all(
+                isinstance(v, str) for v in value
+            ):
+                return "expected a non-empty list of strings (the command's argv)"
+            for arg in value:
+                problem = _check_placeholders(arg)
+                if problem:
+                    return f"{problem} in {arg!r}"
+        if key in ("icon", "webhook") and value is not None and not isinstance(value, str):
+            return "expected a string"
+    return None
+
+
+def parse_config(
+    data, warnings: Optional[list[str]] = None, path: Optional[Path] = None
+) -> Config:
+    """
+    Validate parsed config.json data and resolve it into a Config.
+
+    Args:
+        data: The parsed JSON document
+        warnings: If given, unknown keys are appended to it; they are
+            ignored otherwise
+        path: File the data came from, for errors; config.json by default
+
+    Returns:
+        The resolved configuration
+
+    Raises:
+        ConfigError: If any setting is invalid, listing all of them
+    """
+    path = path or get_config_path()
+    problems = []
+    config = Config()
+    if not isinstance(data, dict):
+        raise ConfigError(path, ["expected a JSON object at the top level"])
+
+    for name, section in data.items():
+        if name == "sound":
+            if isinstance(section, str):
+                config.sound = section
+            else:
+                problems.append("sound: expected a string")
+            continue
+        if name not in _SECTIONS:
+            if warnings is not None:
+                warnings.append(f"{name}: unknown setting, ignored")
+            continue
+        if not isinstance(section, dict):
+            problems.append(f"{name}: expected an object")
+            continue
+
+        target = getattr(config, name)
+        for key, value in section.items():
+            attribute = _SECTIONS[name].get(key)
+            if attribute is None:
+                if warnings is not None:
+                    warnings.append(f"{name}.{key}: unknown setting, ignored")
+                continue
+            if name == "durations":
+                try:
+                    value = parse_duration_config(value)
+                except ValueError as e:
+                    problems.append(f"{name}.{key}: {e}")
+                    continue
+            else:
+                problem = _check_value(name, key, value)
+                if problem:
+                    problems.append(f"{name}.{key}: {problem}")
+                    continue
+            setattr(target, attribute, value)
+
+    notifications = config.notifications
+    if notifications.backend == "command" and not notifications.command:
+        problems.append('notifications.command: required by the "command" backend')
+    if notifications.backend == "webhook" and not notifications.webhook:
+        problems.append('notifications.webhook: required by the "webhook" backend')
+
+    if problems:
+        raise ConfigError(path, problems)
+    return config
+
+
+def read_config_file(path: Path, warnings: Optional[list[str]] = None) -> Config:
+    """
+    Read and validate a config file, without the snapshot.
+
+    Raises:
+        ConfigError: If the file is not valid JSON or a setting is invalid
+        OSError: If the file cannot be read
+    """
+    try:
+        with open(path, "rb") as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ConfigError(path, [f"invalid JSON at line {e.lineno}, column {e.colno}: {e.msg}"])
+    except UnicodeDecodeError:
+        raise ConfigError(path, ["not UTF-8 text"])
+    return parse_config(data, warnings, path)
+
+
+def config_to_dict(config: Config) -> dict:
+    """Convert a Config to plain data for the snapshot."""
+    return asdict(config)
+
+
+def config_from_dict(data: dict) -> Config:
+    """Rebuild a Config from config_to_dict data."""
+    return Config(
+        durations=Durations(**data["durations"]),
+        emojis=Emojis(**data["emojis"]),
+        notifications=Notifications(**data["notifications"]),
+        sound=data["sound"],
+    )
+
+
+def _read_snapshot(
+    path: Path, key: tuple[int, int]
+) -> Optional[tuple[Optional[dict], list[str]]]:
+    """Read the snapshot if it was made from the config file with this key."""
+    try:
+        with open(path, "rb") as f:
+            # One read and loads; marshal.load on a file reads in small chunks
+            version, mtime_ns, size, data, problems = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != SNAPSHOT_VERSION or (mtime_ns, size) != key:
+        return None
+    return data, problems
+
+
+def _write_snapshot(
+    path: Path, key: tuple[int, int], data: Optional[dict], problems: list[str]
+) -> None:
+    """Atomically replace the snapshot; a read-only config dir is fine."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            marshal.dump((SNAPSHOT_VERSION, *key, data, problems), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_config() -> Config:
+    """
+    Load the configuration, through the snapshot when config.json is unchanged.
+
+    The first load after config.json changes validates it and stores the
+    resolved result with marshal in config.snapshot, keyed by the file's
+    mtime and size. Later loads only stat the file and unmarshal the
+    snapshot.
+
+    Returns:
+        The configuration; the defaults if there is no config file
+
+    Raises:
+        ConfigError: If the config file is invalid
+    """
+    directory = get_config_dir()
+    path = directory / "config.json"
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return Config()
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    snapshot_path = directory / "config.snapshot"
+    snapshot = _read_snapshot(snapshot_path, key)
+    if snapshot is None:
+        try:
+            data, problems = config_to_dict(read_config_file(path)), []
+        except ConfigError as e:
+            data, problems = None, e.problems
+        except OSError as e:
+            data, problems = None, [f"cannot be read: {e.strerror}"]
+        _write_snapshot(snapshot_path, key, data, problems)
+    else:
+        data, problems = snapshot
+
+    if problems:
+        raise ConfigError(path, problems)
+    return config_from_dict(data)
+
+
 def get_config() -> Config:
-    """Load and return the configuration."""
+    """
+    Load and return the configuration.
+
+    An invalid config file is reported on stderr and the defaults are used;
+    ``pomo config check`` lists the problems.
+    """
     global _config
 
     if _config is not None:
         return _config
 
-    config = Config()
-    config_path = get_config_path()
-
-    if config_path.exists():
-        try:
-            with open(config_path) as f:
-                data = json.load(f)
-
-            if "durations" in data:
-                if "focus" in data["durations"]:
-                    config.durations.focus = parse_duration_config(data["durations"]["focus"])
-                if "break" in data["durations"]:
-                    config.durations.break_ = parse_duration_config(data["durations"]["break"])
-                if "deep" in data["durations"]:
-                    config.durations.deep = parse_duration_config(data["durations"]["deep"])
-
-            if "emojis" in data:
-                if "focus" in data["emojis"]:
-                    config.emojis.focus = data["emojis"]["focus"]
-                if "break" in data["emojis"]:
-                    config.emojis.break_ = data["emojis"]["break"]
-                if "deep" in data["emojis"]:
-                    config.emojis.deep = data["emojis"]["deep"]
-                if "warn" in data["emojis"]:
-                    config.emojis.warn = data["emojis"]["warn"]
-
-            if "sound" in data:
-                config.sound = data["sound"]
-
-            if "notifications" in data:
-                if "enabled" in data["notifications"]:
-                    config.notifications.enabled = data["notifications"]["enabled"]
-                if "urgency" in data["notifications"]:
-                    config.notifications.urgency = data["notifications"]["urgency"]
-                if "icon" in data["notifications"]:
-                    config.notifications.icon = data["notifications"]["icon"]
-
-        except (json.JSONDecodeError, KeyError):
-            pass  # Use defaults on error
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(
+            f"pomo: {e.path} is invalid, using defaults (run 'pomo config check')",
+            file=sys.stderr,
+        )
+        config = Config()
 
     _config = config
     return config
 
 
-def parse_duration_config(value: str | int) -> int:
-    """Parse a duration from config (e.g., '25m' or 1500)."""
-    if isinstance(value, int):
-        return value
+def reload_config() -> bool:
+    """
+    Load config.json again and swap it in for get_config().
 
-    import re
+    The new Config replaces the cached one in a single assignment, so readers
+    never take a lock and always see either the old or the new config. An
+    invalid file keeps the current config.
 
-    total_seconds = 0
-    pattern = r"(\d+)([hms])"
-    matches = re.findall(pattern, value.lower())
+    Returns:
+        True if the new config was swapped in, False if the file was invalid
+    """
+    global _config
 
-    if not matches:
-        try:
-            return int(value) * 60  # Assume minutes
-        except ValueError:
-            return 25 * 60  # Default
-
-    for num, unit in matches:
-        if unit == "h":
-            total_seconds += int(num) * 3600
-        elif unit == "m":
-            total_seconds += int(num) * 60
-        elif unit == "s":
-            total_seconds += int(num)
-
-    return total_seconds
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(
+            f"pomo: {e.path} is invalid, keeping the previous config "
+            "(run 'pomo config check')",
+            file=sys.stderr,
+        )
+        return False
+
+    _config = config
+    return True
+
+
+def parse_duration_config(value: str | int) -> int:
+    """
+    Parse a duration from config (e.g., '25m', '1h30m', '90' minutes or 1500 seconds).
+
+    Raises:
+        ValueError: If the value is not a positive duration
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"expected seconds or a duration like '25m', got {value!r}")
+
+    if isinstance(value, int):
+        seconds = value
+    else:
+        text = value.lower().replace(" ", "")
+        if text.isdigit():
+            seconds = int(text) * 60  # Assume minutes
+        elif _DURATION_FULL.fullmatch(text):
+            seconds = sum(
+                int(num) * _UNIT_SECONDS[unit] for num, unit in DURATION_PATTERN.findall(text)
+            )
+        else:
+            raise ValueError(f"invalid duration {value!r}, expected e.g. '25m' or '1h30m'")
+
+    if seconds <= 0:
+        raise ValueError(f"duration must be positive, got {value!r}")
+    return seconds
@@ -0,0 +1,166 @@
+"""Optional long-running daemon that serves pomo status over a Unix socket.
+
+The daemon keeps the configuration and the current status in memory, so a
+statusline refresh is a socket round trip instead of an interpreter start.
+Changes made by other processes are picked up through the stat-keyed cache of
+read_status, and config.json is reloaded when it changes.
+
+Protocol: the client sends one JSON object per line and receives one JSON
+object per line in return. Every response has an ``ok`` field.
+
+    {"cmd": "render"}                -> {"ok": true, "text": "... 12m00s"}
+    {"cmd": "status"}                -> {"ok": true, "status": {...}}
+    {"cmd": "set", "status": {...}}  -> {"ok": true}
+    {"cmd": "ping"}                  -> {"ok": true, "pid": 1234}
+    {"cmd": "notify", "payload": {...}} -> {"ok": true}
+
+``text`` is null when there is no active session. ``status`` uses the same
+layout as ``status.json``. ``notify`` delivers a D-Bus or webhook notification
+(see pomo.notify.deliver) in the background, so the session bus connection is
+opened once and reused.
+"""
+
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Optional
+
+from pomo import metrics, notify
+from pomo.client import get_socket_path, request
+from pomo.config import get_config
+from pomo.status import (
+    claim_completion,
+    read_status,
+    status_from_dict,
+    status_to_dict,
+    write_status,
+)
+from pomo.statusline import complete_session, needs_completion, render
+from pomo.timer import get_remaining
+from pomo.watch import ConfigWatcher
+
+
+class StatusDaemon:
+    """In-memory status store shared by all client connections."""
+
+    def __init__(self) -> None:
+        self.status = read_status()
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        """Pick up status changes made by other processes."""
+        # read_status only re-parses the file when its stat() changes
+        self.status = read_status()
+
+    def handle(self, message: dict) -> dict:
+        """Handle a single protocol request."""
+        cmd = message.get("cmd")
+
+        if cmd == "notify":
+            payload = message["payload"]
+            threading.Thread(target=notify.deliver, args=(payload,), daemon=True).start()
+            return {"ok": True}
+
+        with self._lock:
+            self._refresh()
+
+            if cmd == "render":
+                if self.status.end is None:
+                    return {"ok": True, "text": None}
+                # The config watcher swaps in a new config when it changes
+                config = get_config()
+                remaining = get_remaining(self.status)
+                text = render(config, self.status, remaining)
+                if needs_completion(self.status, remaining) and claim_completion(self.status):
+                    threading.Thread(
+                        target=complete_session,
+                        args=(config, replace(self.status)),
+                        daemon=True,
+                    ).start()
+                return {"ok": True, "text": text}
+
+            if cmd == "status":
+                return {"ok": True, "status": status_to_dict(self.status)}
+
+            if cmd == "set":
+                self.status = status_from_dict(message["status"])
+                write_status(self.status)
+                return {"ok": True}
+
+            if cmd == "ping":
+                return {"ok": True, "pid": os.getpid()}
+
+        return {"ok": False, "error": f"unknown command: {cmd}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON requests on one connection."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                response = self.server.pomo.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+            # Completions run (and are counted) in the daemon, so flush them here;
+            # clients observe their own render latency with path="daemon"
+            metrics.flush_if_due()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, pomo: StatusDaemon) -> None:
+        self.pomo = pomo
+        super().__init__(str(path), _RequestHandler)
+
+
+def create_server(path: Optional[Path] = None) -> socketserver.BaseServer:
+    """Bind the daemon socket, replacing a stale socket file if needed."""
+    path = path or get_socket_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if path.exists():
+        if request({"cmd": "ping"}, path=path) is not None:
+            raise RuntimeError(f"pomod is already running on {path}")
+        path.unlink()
+
+    server = _Server(path, StatusDaemon())
+    os.chmod(path, 0o600)
+    return server
+
+
+def main() -> None:
+    """Run the daemon in the foreground (``pomod``)."""
+    try:
+        server = create_server()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    notify.run_resident()
+    path = Path(server.server_address)
+    config_watcher = ConfigWatcher().start()
+    try:
+        server.serve_forever()
+    finally:
+        config_watcher.stop()
+        server.server_close()
+        path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,924 @@
-"""Database operations for pomo session tracking."""
+"""Database operations for pomo session tracking.
+
+Writes always go to the primary in POMO_DATABASE_URL. Read-only queries go to
+the replica in POMO_DATABASE_READ_URL when one is set, and fall back to the
+primary when it is unreachable or has not replayed this machine's last write
+yet (see read_connection).
+"""
 
 import os
-from datetime import datetime
-from typing import Optional
+import sys
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterator, NamedTuple, Optional
 
 import psycopg
 
+from pomo import breaker, cache, metrics
+from pomo.config import get_config_dir
+from pomo.locking import locked
+from pomo.profile import traced
+from pomo.export import EXPORT_BATCH_SIZE, EXPORT_COLUMNS
+from pomo.queries import export_query, list_query
+
+# Seconds to wait for a connection before giving up
+DEFAULT_CONNECT_TIMEOUT = 5
+
+# Milliseconds a single statement may run before the server cancels it
+DEFAULT_STATEMENT_TIMEOUT = 30_000
+
+_pool = None
+
+
+# Invalid timeout values already warned about, by variable name
+_warned_timeouts: dict[str, str] = {}
+
+
+def _get_timeout(name: str, default: int) -> int:
+    """
+    Read a non-negative integer timeout from the environment.
+
+    An invalid value is replaced by the default, with a warning on stderr,
+    because this runs when a finished session is synced and must not lose it.
+
+    Args:
+        name: Environment variable
+        default: Value used when the variable is unset or invalid
+
+    Returns:
+        The timeout
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        timeout = int(value)
+    except ValueError:
+        timeout = -1
+    if timeout < 0:
+        if _warned_timeouts.get(name) != value:
+            print(
+                f"pomo: invalid {name} '{value}', using {default} "
+                "(expected a non-negative integer)",
+                file=sys.stderr,
+            )
+            _warned_timeouts[name] = value
+        return default
+    return timeout
+
 
+def get_connect_timeout() -> int:
+    """Get the connect timeout from POMO_DB_CONNECT_TIMEOUT (seconds)."""
+    return _get_timeout("POMO_DB_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+
+
+def get_statement_timeout() -> int:
+    """Get the statement timeout from POMO_DB_STATEMENT_TIMEOUT (milliseconds)."""
+    return _get_timeout("POMO_DB_STATEMENT_TIMEOUT", DEFAULT_STATEMENT_TIMEOUT)
+
+
+def connect_kwargs() -> dict:
+    """Connection options shared by direct and pooled connections."""
+    statement_timeout = get_statement_timeout()
+    return {
+        "connect_timeout": get_connect_timeout(),
+        "options": f"-c statement_timeout={statement_timeout}",
+    }
+
+
+@traced("db.get_connection", "db")
 def get_connection() -> Optional[psycopg.Connection]:
-    """Get DB connection from POMO_DATABASE_URL env var."""
+    """
+    Get DB connection from POMO_DATABASE_URL env var.
+
+    Returns None without trying while the circuit breaker is open.
+    """
     url = os.getenv("POMO_DATABASE_URL")
     if not url:
         return None
+    if not breaker.allow():
+        return None
     try:
-        return psycopg.connect(url)
+        conn = psycopg.connect(url, **connect_kwargs())
     except psycopg.Error:
+        breaker.record_failure()
         return None
+    breaker.record_success()
+    return conn
 
 
-def init_db() -> bool:
-    """Create the pomodoro_sessions table."""
-    conn = get_connection()
-    if not conn:
+# Name of the read replica's circuit breaker, kept apart from the primary's
+REPLICA_BREAKER = "db_replica"
+
+# WAL position of the primary just after a commit
+CURRENT_LSN_SQL = "SELECT pg_current_wal_lsn()::text"
+
+# Whether a server has everything up to a WAL position. A standby compares
+# what it replayed; a primary (e.g. another database on the same server, as
+# in tests) compares what it wrote.
+CAUGHT_UP_SQL = """
+    SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+                ELSE pg_current_wal_lsn() END >= %s::pg_lsn
+"""
+
+
+def get_read_url() -> Optional[str]:
+    """Get the read replica URL from POMO_DATABASE_READ_URL."""
+    return os.getenv("POMO_DATABASE_READ_URL") or None
+
+
+def is_read_your_writes() -> bool:
+    """
+    Check if reads must see this machine's own writes (POMO_READ_YOUR_WRITES).
+
+    On by default; set it to 0 to read from a lagging replica anyway.
+    """
+    return os.getenv("POMO_READ_YOUR_WRITES", "1") != "0"
+
+
+def get_lsn_path() -> Path:
+    """Get the path of the WAL position of the last write to the primary."""
+    return get_config_dir() / "db_last_write.lsn"
+
+
+def lsn_value(lsn: str) -> int:
+    """Convert a pg_lsn text ("16/B374D848") to a comparable integer."""
+    high, low = lsn.split("/")
+    return int(high, 16) << 32 | int(low, 16)
+
+
+def get_last_write_lsn() -> Optional[str]:
+    """Get the WAL position of the last write from this machine, if known."""
+    try:
+        lsn = get_lsn_path().read_text().strip()
+        lsn_value(lsn)
+        return lsn
+    except (OSError, ValueError):
+        return None
+
+
+def record_write_lsn(lsn: str) -> None:
+    """Remember a WAL position of the primary, keeping the newest one."""
+    path = get_lsn_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with locked(path.with_suffix(".lock")):
+        last = get_last_write_lsn()
+        if last is not None and lsn_value(last) >= lsn_value(lsn):
+            return
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(lsn)
+        os.replace(tmp_path, path)
+
+
+def remember_write(conn: psycopg.Connection) -> None:
+    """
+    Invalidate cached query results after a committed write, and record the
+    primary's WAL position when a read replica is configured.
+
+    Failures are ignored: the write itself is already committed.
+    """
+    cache.invalidate()
+    if get_read_url() is None:
+        return
+    try:
+        record_write_lsn(conn.execute(CURRENT_LSN_SQL).fetchone()[0])
+    except (psycopg.Error, OSError, ValueError):
+        pass
+
+
+# Errors that mean the database predates this version of pomo
+SCHEMA_ERRORS = (psycopg.errors.UndefinedTable, psycopg.errors.UndefinedColumn)
+
+
+def get_schema_error_path() -> Path:
+    """Get the path where the last schema error from a sync is kept."""
+    return get_config_dir() / "db_schema_error"
+
+
+def record_schema_error(error: psycopg.Error) -> None:
+    """Remember that a write failed because the schema is out of date."""
+    message = str(error).strip() or type(error).__name__
+    path = get_schema_error_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(message.splitlines()[0])
+    except OSError:
+        pass
+
+
+def get_schema_error() -> Optional[str]:
+    """
+    Get the schema error of the last failed sync, if any.
+
+    Returns:
+        The database's message, or None if writes have not failed on the
+        schema since the last successful sync or pomo init
+    """
+    try:
+        return get_schema_error_path().read_text()
+    except OSError:
+        return None
+
+
+def clear_schema_error() -> None:
+    """Forget a recorded schema error."""
+    get_schema_error_path().unlink(missing_ok=True)
+
+
+@traced("db.get_replica_connection", "db")
+def get_replica_connection(min_lsn: Optional[str] = None) -> Optional[psycopg.Connection]:
+    """
+    Connect to the read replica from POMO_DATABASE_READ_URL.
+
+    Args:
+        min_lsn: WAL position the replica must have replayed
+
+    Returns:
+        The connection, or None if no replica is configured, it is
+        unreachable, its breaker is open or it lags behind min_lsn
+    """
+    url = get_read_url()
+    if url is None or not breaker.allow(REPLICA_BREAKER):
+        return None
+    try:
+        conn = psycopg.connect(url, **connect_kwargs())
+    except psycopg.Error:
+        breaker.record_failure(REPLICA_BREAKER)
+        return None
+    breaker.record_success(REPLICA_BREAKER)
+
+    if min_lsn is not None:
+        try:
+            caught_up = conn.execute(CAUGHT_UP_SQL, (min_lsn,)).fetchone()[0]
+        except psycopg.Error:
+            caught_up = False
+        if not caught_up:
+            conn.close()
+            return None
+    return conn
+
+
+@contextmanager
+def read_connection(
+    read_your_writes: Optional[bool] = None,
+) -> Iterator[Optional[psycopg.Connection]]:
+    """
+    Get a connection for read-only queries.
+
+    Uses the read replica when it is reachable and, for read-your-writes,
+    has replayed the last write made from this machine; otherwise the
+    primary, like connection().
+
+    Args:
+        read_your_writes: Require the replica to be caught up; defaults to
+            POMO_READ_YOUR_WRITES
+    """
+    if read_your_writes is None:
+        read_your_writes = is_read_your_writes()
+    min_lsn = get_last_write_lsn() if read_your_writes else None
+
+    conn = get_replica_connection(min_lsn)
+    if conn is None:
+        with connection() as conn:
+            yield conn
+        return
+    with conn:
+        yield conn
+
+
+def enable_pool(min_size: int = 1, max_size: int = 4) -> bool:
+    """
+    Serve connections from a pool, for long-lived processes.
+
+    Requires the optional psycopg_pool package.
+
+    Returns:
+        True if the pool is active, False if no database is configured or
+        psycopg_pool is not installed
+    """
+    global _pool
+
+    if _pool is not None:
+        return True
+
+    url = os.getenv("POMO_DATABASE_URL")
+    if not url:
         return False
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:
+        return False
+
+    _pool = ConnectionPool(
+        url,
+        min_size=min_size,
+        max_size=max_size,
+        kwargs=connect_kwargs(),
+        timeout=get_connect_timeout(),
+        open=True,
+    )
+    return True
+
+
+def close_pool() -> None:
+    """Close the connection pool, if one is active."""
+    global _pool
+
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+@contextmanager
+def connection() -> Iterator[Optional[psycopg.Connection]]:
+    """
+    Get a connection for one unit of work.
+
+    Commits when the block succeeds and rolls back when it raises. Pooled
+    connections are returned to the pool, direct ones are closed. Yields None
+    if no database is configured or reachable.
+    """
+    with ExitStack() as stack:
+        conn = None
+        if _pool is not None:
+            if breaker.allow():
+                from psycopg_pool import PoolTimeout
+
+                try:
+                    conn = stack.enter_context(_pool.connection())
+                    breaker.record_success()
+                except PoolTimeout:
+                    breaker.record_failure()
+        else:
+            conn = get_connection()
+            if conn is not None:
+                stack.enter_context(conn)
+        yield conn
+
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS pomodoro_sessions (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        session_type VARCHAR(10) NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL,
+        ended_at TIMESTAMPTZ,
+        planned_duration_seconds INT NOT NULL,
+        actual_duration_seconds INT,
+        completed BOOLEAN DEFAULT FALSE,
+        notes TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_pomo_sessions_started_at
+    ON pomodoro_sessions(started_at)
+    """,
+    # Serves type-filtered lists and the import duplicate check
+    """
+    CREATE INDEX IF NOT EXISTS idx_pomo_sessions_type_started_at
+    ON pomodoro_sessions(session_type, started_at)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pomodoro_daily_rollups (
+        day DATE NOT NULL,
+        session_type VARCHAR(10) NOT NULL,
+        sessions INT NOT NULL,
+        completed INT NOT NULL,
+        seconds BIGINT NOT NULL,
+        PRIMARY KEY (day, session_type)
+    )
+    """,
+]
+
+# Daily rollups are keyed by UTC day. Writers recompute the days they touch
+# from the sessions table, which keeps retried upserts idempotent. One
+# advisory lock per day serializes concurrent recomputes of the same day
+# while writers of other days proceed; days are locked in order, so two
+# writers cannot deadlock.
+LOCK_ROLLUPS_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('pomodoro_daily_rollups'), day - DATE '2000-01-01')
+    FROM (SELECT day FROM unnest(%s::date[]) AS d(day) ORDER BY day) AS days
+"""
+
+# A full rebuild excludes every writer instead
+LOCK_ALL_ROLLUPS_SQL = "LOCK TABLE pomodoro_daily_rollups IN SHARE ROW EXCLUSIVE MODE"
+
+DELETE_ROLLUPS_SQL = "DELETE FROM pomodoro_daily_rollups WHERE day = ANY(%s)"
+
+REFRESH_ROLLUPS_SQL = """
+    INSERT INTO pomodoro_daily_rollups
+    (day, session_type, sessions, completed, seconds)
+    SELECT d.day, s.session_type, count(*), count(*) FILTER (WHERE s.completed),
+           sum(coalesce(s.actual_duration_seconds, s.planned_duration_seconds))
+    FROM unnest(%s::date[]) AS d(day)
+    JOIN pomodoro_sessions s
+      ON s.started_at >= d.day::timestamp AT TIME ZONE 'UTC'
+     AND s.started_at < (d.day + 1)::timestamp AT TIME ZONE 'UTC'
+    GROUP BY d.day, s.session_type
+"""
+
+REBUILD_ROLLUPS_SQL = [
+    "DELETE FROM pomodoro_daily_rollups",
+    """
+    INSERT INTO pomodoro_daily_rollups
+    (day, session_type, sessions, completed, seconds)
+    SELECT (started_at AT TIME ZONE 'UTC')::date, session_type, count(*),
+           count(*) FILTER (WHERE completed),
+           sum(coalesce(actual_duration_seconds, planned_duration_seconds))
+    FROM pomodoro_sessions
+    GROUP BY 1, 2
+    """,
+]
+
+SELECT_STATS_SQL = """
+    SELECT date_trunc(%s, day::timestamp)::date, session_type,
+           sum(sessions)::int, sum(completed)::int, sum(seconds)::bigint
+    FROM pomodoro_daily_rollups
+    WHERE day >= %s AND day <= %s
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+SELECT_SESSIONS_SQL = """
+    SELECT session_type, started_at, ended_at,
+           planned_duration_seconds, actual_duration_seconds,
+           completed, notes, id
+    FROM pomodoro_sessions
+    ORDER BY started_at DESC, id DESC
+    LIMIT %s
+"""
+
+
+def session_from_row(row: tuple) -> dict:
+    """Convert a pomodoro_sessions row (LIST_COLUMNS) to a session dict."""
+    return {
+        "session_type": row[0],
+        "started_at": row[1],
+        "ended_at": row[2],
+        "planned_seconds": row[3],
+        "actual_seconds": row[4],
+        "completed": row[5],
+        "notes": row[6],
+        "id": str(row[7]),
+    }
+
+
+def stats_from_row(row: tuple) -> dict:
+    """Convert a stats row to a dict."""
+    return {
+        "period": row[0],
+        "session_type": row[1],
+        "sessions": row[2],
+        "completed": row[3],
+        "seconds": row[4],
+    }
+
+
+def rollup_days(params: list[tuple]) -> list[date]:
+    """Get the UTC days touched by a batch of INSERT parameters."""
+    return sorted(
+        {
+            row[2].astimezone(timezone.utc).date()
+            for row in params
+            if isinstance(row[2], datetime)
+        }
+    )
+
+
+@traced("db.init_db", "db")
+def init_db() -> bool:
+    """
+    Apply pending schema migrations, create upcoming partitions and rebuild
+    the daily rollups.
+    """
+    from pomo.migrations import (
+        PARTITION_MONTHS_AHEAD,
+        create_upcoming_partitions,
+        migrate,
+    )
 
     try:
-        with conn:
+        with connection() as conn:
+            if conn is None:
+                return False
+            migrate(conn)
             with conn.cursor() as cur:
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS pomodoro_sessions (
-                        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                        session_type VARCHAR(10) NOT NULL,
-                        started_at TIMESTAMPTZ NOT NULL,
-                        ended_at TIMESTAMPTZ,
-                        planned_duration_seconds INT NOT NULL,
-                        actual_duration_seconds INT,
-                        completed BOOLEAN DEFAULT FALSE,
-                        notes TEXT,
-                        created_at TIMESTAMPTZ DEFAULT NOW()
-                    )
-                """)
-                cur.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_pomo_sessions_started_at
-                    ON pomodoro_sessions(started_at)
-                """)
+                create_upcoming_partitions(cur, PARTITION_MONTHS_AHEAD)
+                cur.execute(LOCK_ALL_ROLLUPS_SQL)
+                for sql in REBUILD_ROLLUPS_SQL:
+                    cur.execute(sql)
+        clear_schema_error()
         return True
     except psycopg.Error:
         return False
-    finally:
-        conn.close()
 
 
+@traced("db.get_sessions", "db")
 def get_sessions(limit: int = 10) -> list[dict]:
     """Fetch recent sessions from the database."""
-    conn = get_connection()
-    if not conn:
+    try:
+        with read_connection() as conn:
+            if conn is None:
+                return []
+            with conn.cursor() as cur:
+                cur.execute(SELECT_SESSIONS_SQL, (limit,))
+                return [session_from_row(row) for row in cur.fetchall()]
+    except psycopg.Error:
         return []
 
+
+# Ids are minted by the client, so retried or duplicated writes of the
+# same session collapse into one row. The key is (id, started_at) once the
+# table is partitioned; a session keeps its started_at, so that is still
+# one row per id.
+INSERT_SESSION_SQL = """
+    INSERT INTO pomodoro_sessions
+    (id, session_type, started_at, ended_at, planned_duration_seconds,
+     actual_duration_seconds, completed, notes)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT ON CONSTRAINT pomodoro_sessions_pkey DO UPDATE SET
+        session_type = EXCLUDED.session_type,
+        started_at = EXCLUDED.started_at,
+        ended_at = EXCLUDED.ended_at,
+        planned_duration_seconds = EXCLUDED.planned_duration_seconds,
+        actual_duration_seconds = EXCLUDED.actual_duration_seconds,
+        completed = EXCLUDED.completed,
+        notes = EXCLUDED.notes
+"""
+
+
+def session_params(session: dict) -> tuple:
+    """Build INSERT parameters from a session dict."""
+    started_at = session["started_at"]
+    ended_at = session.get("ended_at")
+
+    actual_seconds = None
+    if ended_at:
+        actual_seconds = int((ended_at - started_at).total_seconds())
+
+    return (
+        session.get("id") or str(uuid.uuid4()),
+        session["session_type"],
+        started_at,
+        ended_at,
+        session["planned_seconds"],
+        actual_seconds,
+        session["completed"],
+        session.get("notes"),
+    )
+
+
+# Rows fetched per round trip while listing; small, so the first rows show
+# up quickly
+LIST_BATCH_SIZE = 100
+
+
+@traced("db.list_sessions", "db")
+def list_sessions(
+    emit: Callable[[dict], None],
+    limit: int = 10,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    session_type: Optional[str] = None,
+    completed: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+    after_id: Optional[str] = None,
+) -> int:
+    """
+    Stream a page of sessions to a callback as they are fetched.
+
+    Args:
+        emit: Called with each session dict
+        limit, before, after, session_type, completed, since, until,
+            before_id, after_id: See pomo.queries.list_query
+
+    Returns:
+        Number of sessions emitted, or -1 if the database is unavailable
+    """
+    sql, params = list_query(
+        limit, before, after, session_type, completed, since, until, before_id, after_id
+    )
+
+    total = 0
     try:
-        with conn:
+        with read_connection() as conn:
+            if conn is None:
+                return -1
+            with conn.cursor(name="pomo_list") as cur:
+                cur.itersize = LIST_BATCH_SIZE
+                cur.execute(sql, params)
+                for row in cur:
+                    emit(session_from_row(row))
+                    total += 1
+        return total
+    except psycopg.Error:
+        return -1
+
+
+@traced("db.export_sessions", "db")
+def export_sessions(
+    write_batch: Callable[[list[tuple]], None],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """
+    Stream sessions in started_at order, in constant memory.
+
+    Rows are read through a named server-side cursor, so only one batch is
+    held in memory at a time.
+
+    Args:
+        write_batch: Called with each batch of rows, in EXPORT_COLUMNS order
+        since: Earliest started_at to include
+        until: started_at must be before this
+        batch_size: Rows per batch
+
+    Returns:
+        Number of rows exported, or -1 if the database is unavailable
+    """
+    # Ids are UUIDs; export them as text
+    sql, params = export_query(since, until, columns=("id::text", *EXPORT_COLUMNS[1:]))
+
+    total = 0
+    try:
+        with read_connection() as conn:
+            if conn is None:
+                return -1
+            with conn.cursor(name="pomo_export") as cur:
+                cur.itersize = batch_size
+                cur.execute(sql, params)
+                while rows := cur.fetchmany(batch_size):
+                    write_batch(rows)
+                    total += len(rows)
+        return total
+    except psycopg.Error:
+        return -1
+
+
+# Import batches are copied into a staging table first, then inserted with
+# one statement that skips sessions already stored under the same
+# (started_at, session_type), including duplicates within the batch
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS pomo_import_staging (
+        id UUID NOT NULL,
+        session_type VARCHAR(10) NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL,
+        ended_at TIMESTAMPTZ,
+        planned_duration_seconds INT NOT NULL,
+        actual_duration_seconds INT,
+        completed BOOLEAN NOT NULL,
+        notes TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+COPY_STAGING_SQL = """
+    COPY pomo_import_staging
+    (id, session_type, started_at, ended_at, planned_duration_seconds,
+     actual_duration_seconds, completed, notes)
+    FROM STDIN
+"""
+
+INSERT_FROM_STAGING_SQL = """
+    INSERT INTO pomodoro_sessions
+    (id, session_type, started_at, ended_at, planned_duration_seconds,
+     actual_duration_seconds, completed, notes)
+    SELECT DISTINCT ON (s.started_at, s.session_type)
+           s.id, s.session_type, s.started_at, s.ended_at,
+           s.planned_duration_seconds, s.actual_duration_seconds,
+           s.completed, s.notes
+    FROM pomo_import_staging s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM pomodoro_sessions p
+        WHERE p.started_at = s.started_at AND p.session_type = s.session_type
+    )
+    ORDER BY s.started_at, s.session_type
+    ON CONFLICT ON CONSTRAINT pomodoro_sessions_pkey DO NOTHING
+"""
+
+
+@traced("db.import_sessions", "db")
+def import_sessions(sessions: list[dict]) -> int:
+    """
+    Bulk load sessions, skipping ones that are already stored.
+
+    The batch is streamed into a temporary staging table with COPY and moved
+    over with a single INSERT ... SELECT, in one transaction together with
+    the rollups of the touched days.
+
+    Args:
+        sessions: Validated dicts with the keyword arguments of sync_session
+
+    Returns:
+        Number of sessions inserted, or -1 if the database is unavailable
+    """
+    if not sessions:
+        return 0
+
+    params = [session_params(session) for session in sessions]
+    try:
+        with connection() as conn:
+            if conn is None:
+                return -1
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute(CREATE_STAGING_SQL)
+                with cur.copy(COPY_STAGING_SQL) as copy:
+                    for row in params:
+                        copy.write_row(row)
+                cur.execute(INSERT_FROM_STAGING_SQL)
+                inserted = cur.rowcount
+                for step in rollup_steps(params):
+                    cur.execute(step.sql, step.params)
+            remember_write(conn)
+            return inserted
+    except psycopg.Error:
+        return -1
+
+
+LAST_CREATED_SQL = "SELECT max(created_at) FROM pomodoro_sessions"
+
+
+@traced("db.get_last_created", "db")
+def get_last_created() -> Optional[str]:
+    """
+    Get the newest created_at, a cheap probe for new sessions.
+
+    Served by idx_pomo_sessions_created_at.
+
+    Returns:
+        The timestamp as text, "" if there are no sessions, or None if the
+        database is unavailable
+    """
+    try:
+        with read_connection() as conn:
+            if conn is None:
+                return None
+            value = conn.execute(LAST_CREATED_SQL).fetchone()[0]
+        return value.isoformat() if value else ""
+    except psycopg.Error:
+        return None
+
+
+@traced("db.get_stats", "db")
+def get_stats(period: str, since: date, until: date) -> list[dict]:
+    """
+    Aggregate sessions per period and session type from the daily rollups.
+
+    Args:
+        period: "day", "week" or "month"
+        since: First day to include (UTC)
+        until: Last day to include (UTC)
+
+    Returns:
+        Dicts with period, session_type, sessions, completed and seconds,
+        ordered by period
+    """
+    try:
+        with read_connection() as conn:
+            if conn is None:
+                return []
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT session_type, started_at, ended_at,
-                           planned_duration_seconds, actual_duration_seconds,
-                           completed, notes
-                    FROM pomodoro_sessions
-                    ORDER BY started_at DESC
-                    LIMIT %s
-                    """,
-                    (limit,),
-                )
-                rows = cur.fetchall()
-                return [
-                    {
-                        "session_type": row[0],
-                        "started_at": row[1],
-                        "ended_at": row[2],
-                        "planned_seconds": row[3],
-                        "actual_seconds": row[4],
-                        "completed": row[5],
-                        "notes": row[6],
-                    }
-                    for row in rows
-                ]
+                cur.execute(SELECT_STATS_SQL, (period, since, until))
+                return [stats_from_row(row) for row in cur.fetchall()]
+    except SCHEMA_ERRORS as e:
+        record_schema_error(e)
+        return []
     except psycopg.Error:
         return []
-    finally:
-        conn.close()
+
+
+class Step(NamedTuple):
+    """One statement of a planned write transaction."""
+
+    sql: str
+    params: Any = None
+    # params is a list of rows, sent with executemany
+    many: bool = False
+    # Run under a savepoint, so a rejected row does not abort the transaction
+    savepoint: bool = False
+
+
+def rollup_steps(params: list[tuple]) -> list[Step]:
+    """Plan the recompute of the daily rollups a batch of sessions touches."""
+    days = rollup_days(params)
+    return [
+        Step(LOCK_ROLLUPS_SQL, (days,)),
+        Step(DELETE_ROLLUPS_SQL, (days,)),
+        Step(REFRESH_ROLLUPS_SQL, (days,)),
+    ]
+
+
+WritePlan = Generator[list[Step], Optional[list[bool]], list[Optional[bool]]]
+
+
+def write_batch_plan(params: list[tuple]) -> WritePlan:
+    """
+    Plan the transactions that write one batch of sessions.
+
+    This is the per-batch logic shared by sync_sessions and pomo.db_async,
+    which only differ in how they run a transaction. The generator yields the
+    steps of each transaction. The driver sends back one result per step
+    (False for a savepoint step the database rejected), or None if the
+    database rejected the transaction as a whole.
+
+    Args:
+        params: INSERT parameters, from session_params
+
+    Returns:
+        One result per session, as for sync_sessions
+    """
+    outcome = yield [Step(INSERT_SESSION_SQL, params, many=True), *rollup_steps(params)]
+    if outcome is not None:
+        return [True] * len(params)
+
+    # Some row was rejected; retry row by row so only the bad rows fail
+    rows = [Step(INSERT_SESSION_SQL, row, savepoint=True) for row in params]
+    outcome = yield [*rows, *rollup_steps(params)]
+    if outcome is None:
+        return [None] * len(params)
+    return outcome[: len(params)]
+
+
+def _run_transaction(conn: psycopg.Connection, steps: list[Step]) -> Optional[list[bool]]:
+    results = []
+    try:
+        with conn.transaction(), conn.cursor() as cur:
+            for step in steps:
+                if step.savepoint:
+                    try:
+                        with conn.transaction():
+                            cur.execute(step.sql, step.params)
+                        results.append(True)
+                    except (psycopg.DataError, psycopg.IntegrityError):
+                        results.append(False)
+                elif step.many:
+                    cur.executemany(step.sql, step.params)
+                    results.append(True)
+                else:
+                    cur.execute(step.sql, step.params)
+                    results.append(True)
+    except (psycopg.DataError, psycopg.IntegrityError):
+        return None
+    remember_write(conn)
+    return results
+
+
+@traced("db.sync_sessions", "db")
+def sync_sessions(sessions: list[dict]) -> list[Optional[bool]]:
+    """
+    Sync many sessions to the database over a single connection.
+
+    Rows are sent with executemany, which psycopg pipelines into a single
+    round trip. If any row is rejected, the batch is retried row by row
+    inside savepoints so that only the bad rows fail. The daily rollups of
+    the touched days are recomputed in the same transaction.
+
+    Args:
+        sessions: Dicts with the keyword arguments of sync_session
+
+    Returns:
+        One result per session, in order: True if stored, False if the
+        database rejected the row, None if it could not be attempted
+    """
+    if not sessions:
+        return []
+
+    start = time.perf_counter()
+    results = _sync_sessions(sessions)
+    metrics.record_sync(results, time.perf_counter() - start)
+    if True in results:
+        clear_schema_error()
+    return results
+
+
+def _sync_sessions(sessions: list[dict]) -> list[Optional[bool]]:
+    params = [session_params(session) for session in sessions]
+
+    try:
+        with connection() as conn:
+            if conn is None:
+                return [None] * len(sessions)
+
+            plan = write_batch_plan(params)
+            outcome = None
+            while True:
+                try:
+                    steps = plan.send(outcome)
+                except StopIteration as done:
+                    return done.value
+                outcome = _run_transaction(conn, steps)
+    except SCHEMA_ERRORS as e:
+        # Not a network problem: retrying cannot help until pomo init runs
+        record_schema_error(e)
+        return [None] * len(sessions)
+    except psycopg.Error:
+        return [None] * len(sessions)
 
 
 def sync_session(
@@ -97,38 +928,16 @@ def sync_session(
     planned_seconds: int,
     completed: bool,
     notes: Optional[str] = None,
+    session_id: Optional[str] = None,
 ) -> bool:
     """Sync a completed session to the database."""
-    conn = get_connection()
-    if not conn:
-        return False
-
-    actual_seconds = None
-    if ended_at:
-        actual_seconds = int((ended_at - started_at).total_seconds())
-
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO pomodoro_sessions
-                    (session_type, started_at, ended_at, planned_duration_seconds,
-                     actual_duration_seconds, completed, notes)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        session_type,
-                        started_at,
-                        ended_at,
-                        planned_seconds,
-                        actual_seconds,
-                        completed,
-                        notes,
-                    ),
-                )
-        return True
-    except psycopg.Error:
-        return False
-    finally:
-        conn.close()
+    session = {
+        "id": session_id,
+        "session_type": session_type,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "planned_seconds": planned_seconds,
+        "completed": completed,
+        "notes": notes,
+    }
+    return sync_sessions([session])[0] is True
@@ -0,0 +1,333 @@
+"""Asyncio database operations for pomo session tracking.
+
+The asyncio counterpart of pomo.db, built on psycopg.AsyncConnection, for
+processes that have to keep rendering while a sync is in flight. It shares the
+SQL, row mapping, timeouts, circuit breaker, replica routing and the plan of
+each batch write (pomo.db.write_batch_plan) with pomo.db, which remains the
+synchronous API for the CLI. The breaker, the query cache and the WAL position
+are small files behind flocks, so they are touched from a worker thread to
+keep the event loop free.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+import psycopg
+
+from pomo import breaker, cache, db, metrics
+from pomo.db import (
+    CAUGHT_UP_SQL,
+    CURRENT_LSN_SQL,
+    REPLICA_BREAKER,
+    SCHEMA_ERRORS,
+    SELECT_SESSIONS_SQL,
+    Step,
+    clear_schema_error,
+    connect_kwargs,
+    get_connect_timeout,
+    get_last_write_lsn,
+    get_read_url,
+    is_read_your_writes,
+    record_schema_error,
+    record_write_lsn,
+    session_from_row,
+    session_params,
+    write_batch_plan,
+)
+
+BATCH_SIZE = 500
+
+# Batches written at the same time, each on its own connection
+MAX_CONCURRENCY = 4
+
+_pool = None
+
+
+async def get_connection() -> Optional[psycopg.AsyncConnection]:
+    """Get an async DB connection from POMO_DATABASE_URL."""
+    url = os.getenv("POMO_DATABASE_URL")
+    if not url:
+        return None
+    if not await asyncio.to_thread(breaker.allow):
+        return None
+    try:
+        conn = await psycopg.AsyncConnection.connect(url, **connect_kwargs())
+    except psycopg.Error:
+        await asyncio.to_thread(breaker.record_failure)
+        return None
+    await asyncio.to_thread(breaker.record_success)
+    return conn
+
+
+async def get_replica_connection(
+    min_lsn: Optional[str] = None,
+) -> Optional[psycopg.AsyncConnection]:
+    """Connect to the read replica; see pomo.db.get_replica_connection."""
+    url = get_read_url()
+    if url is None or not await asyncio.to_thread(breaker.allow, REPLICA_BREAKER):
+        return None
+    try:
+        conn = await psycopg.AsyncConnection.connect(url, **connect_kwargs())
+    except psycopg.Error:
+        await asyncio.to_thread(breaker.record_failure, REPLICA_BREAKER)
+        return None
+    await asyncio.to_thread(breaker.record_success, REPLICA_BREAKER)
+
+    if min_lsn is not None:
+        try:
+            cur = await conn.execute(CAUGHT_UP_SQL, (min_lsn,))
+            caught_up = (await cur.fetchone())[0]
+        except psycopg.Error:
+            caught_up = False
+        if not caught_up:
+            await conn.close()
+            return None
+    return conn
+
+
+async def enable_pool(min_size: int = 1, max_size: int = MAX_CONCURRENCY) -> bool:
+    """
+    Serve connections from an async pool.
+
+    Requires the optional psycopg_pool package.
+
+    Returns:
+        True if the pool is active, False if no database is configured or
+        psycopg_pool is not installed
+    """
+    global _pool
+
+    if _pool is not None:
+        return True
+
+    url = os.getenv("POMO_DATABASE_URL")
+    if not url:
+        return False
+    try:
+        from psycopg_pool import AsyncConnectionPool
+    except ImportError:
+        return False
+
+    pool = AsyncConnectionPool(
+        url,
+        min_size=min_size,
+        max_size=max_size,
+        kwargs=connect_kwargs(),
+        timeout=get_connect_timeout(),
+        open=False,
+    )
+    await pool.open()
+    _pool = pool
+    return True
+
+
+async def close_pool() -> None:
+    """Close the async connection pool, if one is active."""
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def connection() -> AsyncIterator[Optional[psycopg.AsyncConnection]]:
+    """
+    Get an async connection for one unit of work.
+
+    Commits when the block succeeds and rolls back when it raises. Yields None
+    if no database is configured or reachable.
+    """
+    async with AsyncExitStack() as stack:
+        conn = None
+        if _pool is not None:
+            if await asyncio.to_thread(breaker.allow):
+                from psycopg_pool import PoolTimeout
+
+                try:
+                    conn = await stack.enter_async_context(_pool.connection())
+                    await asyncio.to_thread(breaker.record_success)
+                except PoolTimeout:
+                    await asyncio.to_thread(breaker.record_failure)
+        else:
+            conn = await get_connection()
+            if conn is not None:
+                await stack.enter_async_context(conn)
+        yield conn
+
+
+@asynccontextmanager
+async def read_connection(
+    read_your_writes: Optional[bool] = None,
+) -> AsyncIterator[Optional[psycopg.AsyncConnection]]:
+    """
+    Get an async connection for read-only queries.
+
+    Routes like pomo.db.read_connection: the replica when it is reachable and
+    caught up, otherwise the primary.
+    """
+    if read_your_writes is None:
+        read_your_writes = is_read_your_writes()
+    min_lsn = await asyncio.to_thread(get_last_write_lsn) if read_your_writes else None
+
+    conn = await get_replica_connection(min_lsn)
+    if conn is None:
+        async with connection() as conn:
+            yield conn
+        return
+    async with conn:
+        yield conn
+
+
+async def init_db() -> bool:
+    """
+    Apply schema migrations and rebuild the daily rollups.
+
+    Migrations are written against the synchronous driver and run once per
+    install, so they run in a worker thread through pomo.db.
+    """
+    return await asyncio.to_thread(db.init_db)
+
+
+async def get_sessions(limit: int = 10) -> list[dict]:
+    """Fetch recent sessions from the database."""
+    try:
+        async with read_connection() as conn:
+            if conn is None:
+                return []
+            async with conn.cursor() as cur:
+                await cur.execute(SELECT_SESSIONS_SQL, (limit,))
+                return [session_from_row(row) for row in await cur.fetchall()]
+    except psycopg.Error:
+        return []
+
+
+async def _remember_write(conn: psycopg.AsyncConnection) -> None:
+    """Note a committed write; see pomo.db.remember_write."""
+    await asyncio.to_thread(cache.invalidate)
+    if get_read_url() is None:
+        return
+    try:
+        cur = await conn.execute(CURRENT_LSN_SQL)
+        await asyncio.to_thread(record_write_lsn, (await cur.fetchone())[0])
+    except (psycopg.Error, OSError, ValueError):
+        pass
+
+
+async def _run_transaction(
+    conn: psycopg.AsyncConnection, steps: list[Step]
+) -> Optional[list[bool]]:
+    """Run one transaction of a write plan; see pomo.db.write_batch_plan."""
+    results = []
+    try:
+        async with conn.transaction(), conn.cursor() as cur:
+            for step in steps:
+                if step.savepoint:
+                    try:
+                        async with conn.transaction():
+                            await cur.execute(step.sql, step.params)
+                        results.append(True)
+                    except (psycopg.DataError, psycopg.IntegrityError):
+                        results.append(False)
+                elif step.many:
+                    await cur.executemany(step.sql, step.params)
+                    results.append(True)
+                else:
+                    await cur.execute(step.sql, step.params)
+                    results.append(True)
+    except (psycopg.DataError, psycopg.IntegrityError):
+        return None
+    await _remember_write(conn)
+    return results
+
+
+async def _sync_batch(params: list[tuple]) -> list[Optional[bool]]:
+    """Write one batch on its own connection; see pomo.db.sync_sessions."""
+    try:
+        async with connection() as conn:
+            if conn is None:
+                return [None] * len(params)
+
+            plan = write_batch_plan(params)
+            outcome = None
+            while True:
+                try:
+                    steps = plan.send(outcome)
+                except StopIteration as done:
+                    return done.value
+                outcome = await _run_transaction(conn, steps)
+    except SCHEMA_ERRORS as e:
+        await asyncio.to_thread(record_schema_error, e)
+        return [None] * len(params)
+    except psycopg.Error:
+        return [None] * len(params)
+
+
+async def sync_sessions(
+    sessions: list[dict],
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = MAX_CONCURRENCY,
+    deadline: Optional[float] = None,
+) -> list[Optional[bool]]:
+    """
+    Sync many sessions, writing several batches concurrently.
+
+    Args:
+        sessions: Dicts with the keyword arguments of pomo.db.sync_session
+        batch_size: Sessions per batch
+        concurrency: Batches in flight at the same time
+        deadline: Seconds after which unfinished batches are cancelled
+
+    Returns:
+        One result per session, in order: True if stored, False if the
+        database rejected the row, None if it was not written (no database,
+        unreachable, or cut off by the deadline)
+    """
+    start = time.perf_counter()
+    results: list[Optional[bool]] = [None] * len(sessions)
+    params = [session_params(session) for session in sessions]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(offset: int) -> None:
+        async with semaphore:
+            batch = params[offset : offset + batch_size]
+            results[offset : offset + len(batch)] = await _sync_batch(batch)
+
+    try:
+        async with asyncio.timeout(deadline):
+            await asyncio.gather(*(run(i) for i in range(0, len(params), batch_size)))
+    except TimeoutError:
+        # Finished batches keep their results; upserts make a retry safe
+        pass
+    metrics.record_sync(results, time.perf_counter() - start)
+    if True in results:
+        await asyncio.to_thread(clear_schema_error)
+    return results
+
+
+async def sync_session(
+    session_type: str,
+    started_at: datetime,
+    ended_at: Optional[datetime],
+    planned_seconds: int,
+    completed: bool,
+    notes: Optional[str] = None,
+    session_id: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> bool:
+    """Sync a completed session to the database."""
+    session = {
+        "id": session_id,
+        "session_type": session_type,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "planned_seconds": planned_seconds,
+        "completed": completed,
+        "notes": notes,
+    }
+    results = await sync_sessions([session], deadline=deadline)
+    return results[0] is True
@@ -0,0 +1,162 @@
+"""Streaming session export.
+
+Backends stream rows in batches (see pomo.db.export_sessions) and the writers
+here turn each batch into output as it arrives, so memory use does not grow
+with the size of the history. CSV and JSONL only need the stdlib; Parquet and
+Arrow IPC need the optional pyarrow package.
+"""
+
+import csv
+import json
+from datetime import datetime
+from typing import IO, Optional
+
+# Rows fetched per round trip and written per batch
+EXPORT_BATCH_SIZE = 10_000
+
+# Columns written by pomo export, in order
+EXPORT_COLUMNS = (
+    "id",
+    "session_type",
+    "started_at",
+    "ended_at",
+    "planned_duration_seconds",
+    "actual_duration_seconds",
+    "completed",
+    "notes",
+    "created_at",
+)
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet", "arrow")
+
+# Formats that are written to a file rather than a text stream
+BINARY_FORMATS = ("parquet", "arrow")
+
+
+def is_arrow_available() -> bool:
+    """Check if pyarrow is installed for Parquet and Arrow output."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class CsvWriter:
+    """Write batches as CSV with a header row."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._writer = csv.writer(stream)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write_batch(self, rows: list[tuple]) -> None:
+        """Write one batch of rows."""
+        self._writer.writerows([[_text(value) for value in row] for row in rows])
+
+    def close(self) -> None:
+        """Finish the output."""
+
+
+class JsonlWriter:
+    """Write batches as one JSON object per line."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._stream = stream
+
+    def write_batch(self, rows: list[tuple]) -> None:
+        """Write one batch of rows."""
+        self._stream.writelines(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_text) + "\n"
+            for row in rows
+        )
+
+    def close(self) -> None:
+        """Finish the output."""
+
+
+def arrow_schema():
+    """Get the pyarrow schema of exported sessions."""
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("session_type", pa.string()),
+            ("started_at", timestamp),
+            ("ended_at", timestamp),
+            ("planned_duration_seconds", pa.int32()),
+            ("actual_duration_seconds", pa.int32()),
+            ("completed", pa.bool_()),
+            ("notes", pa.string()),
+            ("created_at", timestamp),
+        ]
+    )
+
+
+class ArrowWriter:
+    """Write batches as Parquet row groups or Arrow IPC record batches."""
+
+    def __init__(self, path: str, fmt: str) -> None:
+        import pyarrow as pa
+
+        self._pa = pa
+        self._schema = arrow_schema()
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self._schema)
+        else:
+            self._writer = pa.ipc.new_file(path, self._schema)
+
+    def write_batch(self, rows: list[tuple]) -> None:
+        """Write one batch of rows as a record batch."""
+        columns = [list(column) for column in zip(*rows)]
+        batch = self._pa.RecordBatch.from_arrays(
+            [
+                self._pa.array(values, type=field.type)
+                for values, field in zip(columns, self._schema)
+            ],
+            schema=self._schema,
+        )
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        """Write the file footer."""
+        self._writer.close()
+
+
+def open_writer(fmt: str, stream: Optional[IO[str]] = None, path: Optional[str] = None):
+    """
+    Create a writer for an export format.
+
+    Args:
+        fmt: One of EXPORT_FORMATS
+        stream: Text stream for CSV and JSONL
+        path: Output file for Parquet and Arrow
+
+    Returns:
+        A writer with write_batch(rows) and close()
+
+    Raises:
+        ValueError: If the format is unknown or needs a path that is missing
+        ImportError: If the format needs pyarrow and it is not installed
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt in BINARY_FORMATS:
+        if path is None:
+            raise ValueError(f"{fmt} output needs a file")
+        return ArrowWriter(path, fmt)
+    if fmt == "csv":
+        return CsvWriter(stream)
+    return JsonlWriter(stream)
+
@@ -0,0 +1,270 @@
+"""Bulk session import.
+
+Files are parsed as a stream: rows are read one at a time, mapped to session
+dicts, validated against the pomodoro_sessions schema and handed to the
+backends in large batches. Backends load each batch through a staging table
+(COPY on Postgres) and insert only sessions whose (started_at, session_type)
+is not stored yet, so importing the same file twice is harmless.
+"""
+
+import csv
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import IO, Callable, Iterator, Optional
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+IMPORT_BATCH_SIZE = 10_000
+
+SESSION_TYPES = ("focus", "deep", "break")
+
+# Largest value of an INT column
+MAX_SECONDS = 2**31 - 1
+
+# Invalid rows reported in detail; the rest are only counted
+MAX_ERRORS = 20
+
+
+@dataclass
+class ImportStats:
+    """Progress of an import."""
+
+    read: int = 0
+    invalid: int = 0
+    inserted: dict[str, int] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def valid(self) -> int:
+        """Rows that passed validation."""
+        return self.read - self.invalid
+
+    @property
+    def seconds(self) -> float:
+        """Time since the import started."""
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        """Rows read per second."""
+        return self.read / self.seconds if self.seconds > 0 else 0.0
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[dict]:
+    """
+    Read raw records from a CSV or JSONL stream, one at a time.
+
+    Blank JSONL lines are skipped; lines that are not JSON objects are yielded
+    as empty records, so that they fail validation with their line number.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else {}
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp; naive times are taken as local time."""
+    if value in (None, ""):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"invalid timestamp {value!r}")
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"invalid timestamp {value!r}") from None
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
+def parse_bool(value) -> bool:
+    """Parse a boolean from JSON or from CSV text."""
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    text = str(value).strip().lower()
+    if text in ("true", "t", "yes", "y", "1"):
+        return True
+    if text in ("false", "f", "no", "n", "0", ""):
+        return False
+    raise ValueError(f"invalid boolean {value!r}")
+
+
+def parse_int(value) -> Optional[int]:
+    """Parse an integer from JSON or from CSV text."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"invalid integer {value!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid integer {value!r}") from None
+
+
+def parse_clock(value: str) -> int:
+    """Parse an HH:MM:SS duration into seconds."""
+    try:
+        hours, minutes, seconds = (int(part) for part in value.split(":"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"invalid duration {value!r}") from None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def map_pomo(record: dict) -> dict:
+    """Map a record in pomo's own export format (pomo export)."""
+    started_at = parse_timestamp(record.get("started_at"))
+    ended_at = parse_timestamp(record.get("ended_at"))
+    planned = parse_int(
+        record.get("planned_duration_seconds", record.get("planned_seconds"))
+    )
+    if planned is None and started_at and ended_at:
+        planned = int((ended_at - started_at).total_seconds())
+    session_type = record.get("session_type")
+    if isinstance(session_type, str):
+        session_type = session_type.strip().lower()
+
+    return {
+        "id": record.get("id") or None,
+        "session_type": session_type,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "planned_seconds": planned,
+        "completed": parse_bool(record.get("completed")),
+        "notes": record.get("notes") or None,
+    }
+
+
+def map_toggl(record: dict) -> dict:
+    """
+    Map a row of a Toggl Track detailed report (CSV).
+
+    Entries become completed focus sessions, unless a tag names another
+    session type. Times without an offset are taken as local time.
+    """
+    start = f"{record.get('Start date', '')}T{record.get('Start time', '')}"
+    end = f"{record.get('End date', '')}T{record.get('End time', '')}"
+    started_at = parse_timestamp(start)
+    ended_at = parse_timestamp(end) if record.get("End date") else None
+    duration = parse_clock(record.get("Duration", ""))
+    if ended_at is None and started_at is not None:
+        ended_at = started_at + timedelta(seconds=duration)
+
+    tags = {tag.strip().lower() for tag in (record.get("Tags") or "").split(",")}
+    session_type = next((t for t in SESSION_TYPES if t in tags), "focus")
+
+    return {
+        "id": None,
+        "session_type": session_type,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "planned_seconds": duration,
+        "completed": True,
+        "notes": record.get("Description") or None,
+    }
+
+
+MAPPINGS: dict[str, Callable[[dict], dict]] = {
+    "pomo": map_pomo,
+    "toggl": map_toggl,
+}
+
+
+def validate(session: dict) -> dict:
+    """
+    Check a mapped session against the pomodoro_sessions schema.
+
+    Sessions without an id get one here, so every backend stores the
+    session under the same id.
+
+    Raises:
+        ValueError: Describing the first problem found
+    """
+    if session["id"] is None:
+        session["id"] = str(uuid.uuid4())
+    else:
+        try:
+            session["id"] = str(uuid.UUID(str(session["id"])))
+        except ValueError:
+            raise ValueError(f"invalid id {session['id']!r}") from None
+    if session["session_type"] not in SESSION_TYPES:
+        raise ValueError(f"invalid session_type {session['session_type']!r}")
+    if session["started_at"] is None:
+        raise ValueError("missing started_at")
+    ended_at = session["ended_at"]
+    if ended_at is not None and ended_at < session["started_at"]:
+        raise ValueError("ended_at is before started_at")
+    planned = session["planned_seconds"]
+    if planned is None or not 0 <= planned <= MAX_SECONDS:
+        raise ValueError(f"invalid planned duration {planned!r}")
+    if ended_at is not None:
+        if (ended_at - session["started_at"]).total_seconds() > MAX_SECONDS:
+            raise ValueError("actual duration out of range")
+    if session["notes"] is not None and not isinstance(session["notes"], str):
+        raise ValueError("notes must be text")
+    return session
+
+
+def import_sessions(
+    records: Iterator[dict],
+    mapping: str,
+    backends: dict[str, Callable[[list[dict]], int]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> Optional[ImportStats]:
+    """
+    Map, validate and load records in batches.
+
+    Args:
+        records: Raw records, e.g. from read_records
+        mapping: Name of the record mapping (see MAPPINGS)
+        backends: import_sessions functions of the target backends, by name
+        batch_size: Sessions per batch
+        progress: Called after every batch
+
+    Returns:
+        The import statistics, or None if a backend could not be written;
+        batches loaded before that stay loaded
+    """
+    map_record = MAPPINGS[mapping]
+    stats = ImportStats(inserted={name: 0 for name in backends})
+    batch: list[dict] = []
+
+    def flush() -> bool:
+        for name, load in backends.items():
+            inserted = load(batch)
+            if inserted < 0:
+                return False
+            stats.inserted[name] += inserted
+        batch.clear()
+        if progress is not None:
+            progress(stats)
+        return True
+
+    for number, record in enumerate(records, start=1):
+        stats.read += 1
+        try:
+            batch.append(validate(map_record(record)))
+        except ValueError as e:
+            stats.invalid += 1
+            if len(stats.errors) < MAX_ERRORS:
+                stats.errors.append(f"record {number}: {e}")
+            continue
+        if len(batch) >= batch_size and not flush():
+            return None
+
+    if batch and not flush():
+        return None
+    return stats
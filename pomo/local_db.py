@@ -0,0 +1,464 @@
+"""Local SQLite session store.
+
+Sessions are kept in ``sessions.db`` in the config directory, with the same
+columns and the same function signatures as pomo.db, so listing and analytics
+work offline and without a network round trip. The database runs in WAL mode,
+so readers never block the writer. Timestamps are stored as fixed-width UTC
+ISO 8601 strings, which sort chronologically and can use the started_at index.
+"""
+
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from pomo import cache
+from pomo.config import get_config_dir
+from pomo.export import EXPORT_BATCH_SIZE
+from pomo.profile import traced
+from pomo.queries import export_query, list_query
+
+# Milliseconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 5000
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS pomodoro_sessions (
+        id TEXT PRIMARY KEY,
+        session_type TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        ended_at TEXT,
+        planned_duration_seconds INTEGER NOT NULL,
+        actual_duration_seconds INTEGER,
+        completed INTEGER NOT NULL DEFAULT 0,
+        notes TEXT,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    )
+    """,
+    # id breaks ties between sessions that started at the same time, so
+    # list pages can be ordered and walked from the index alone
+    """
+    CREATE INDEX IF NOT EXISTS idx_pomo_sessions_started_at_id
+    ON pomodoro_sessions(started_at, id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_pomo_sessions_type_started_at_id
+    ON pomodoro_sessions(session_type, started_at, id)
+    """,
+    # Superseded by the indexes above
+    "DROP INDEX IF EXISTS idx_pomo_sessions_started_at",
+    "DROP INDEX IF EXISTS idx_pomo_sessions_type_started_at",
+    """
+    CREATE INDEX IF NOT EXISTS idx_pomo_sessions_created_at
+    ON pomodoro_sessions(created_at)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pomodoro_daily_rollups (
+        day TEXT NOT NULL,
+        session_type TEXT NOT NULL,
+        sessions INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        seconds INTEGER NOT NULL,
+        PRIMARY KEY (day, session_type)
+    ) WITHOUT ROWID
+    """,
+]
+
+# Daily rollups, keyed by UTC day, recomputed for every day a write touches
+DELETE_ROLLUPS_SQL = "DELETE FROM pomodoro_daily_rollups WHERE day = ?"
+
+REFRESH_ROLLUPS_SQL = """
+    INSERT INTO pomodoro_daily_rollups
+    (day, session_type, sessions, completed, seconds)
+    SELECT ?, session_type, count(*), sum(completed),
+           sum(coalesce(actual_duration_seconds, planned_duration_seconds))
+    FROM pomodoro_sessions
+    WHERE started_at >= ? AND started_at < ?
+    GROUP BY session_type
+"""
+
+REBUILD_ROLLUPS_SQL = [
+    "DELETE FROM pomodoro_daily_rollups",
+    """
+    INSERT INTO pomodoro_daily_rollups
+    (day, session_type, sessions, completed, seconds)
+    SELECT substr(started_at, 1, 10), session_type, count(*), sum(completed),
+           sum(coalesce(actual_duration_seconds, planned_duration_seconds))
+    FROM pomodoro_sessions
+    GROUP BY 1, 2
+    """,
+]
+
+# SQLite has no date_trunc; weeks start on Monday as in Postgres
+SELECT_STATS_SQL = """
+    SELECT CASE ?1
+               WHEN 'day' THEN day
+               WHEN 'week' THEN date(day, 'weekday 0', '-6 days')
+               ELSE date(day, 'start of month')
+           END,
+           session_type, sum(sessions), sum(completed), sum(seconds)
+    FROM pomodoro_daily_rollups
+    WHERE day >= ?2 AND day <= ?3
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+SELECT_SESSIONS_SQL = """
+    SELECT session_type, started_at, ended_at,
+           planned_duration_seconds, actual_duration_seconds,
+           completed, notes, id
+    FROM pomodoro_sessions
+    ORDER BY started_at DESC, id DESC
+    LIMIT ?
+"""
+
+# Same upsert semantics as pomo.db, so a mirror and Postgres agree on ids
+INSERT_SESSION_SQL = """
+    INSERT INTO pomodoro_sessions
+    (id, session_type, started_at, ended_at, planned_duration_seconds,
+     actual_duration_seconds, completed, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        session_type = excluded.session_type,
+        started_at = excluded.started_at,
+        ended_at = excluded.ended_at,
+        planned_duration_seconds = excluded.planned_duration_seconds,
+        actual_duration_seconds = excluded.actual_duration_seconds,
+        completed = excluded.completed,
+        notes = excluded.notes
+"""
+
+LAST_CREATED_SQL = "SELECT max(created_at) FROM pomodoro_sessions"
+
+# sqlite3 connections may only be used by the thread that opened them
+_local = threading.local()
+
+
+def get_local_db_path() -> Path:
+    """Get the SQLite session database path."""
+    return get_config_dir() / "sessions.db"
+
+
+def _open(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL is still crash-safe; only the last commit may be lost
+    # on power failure
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        for sql in SCHEMA_SQL:
+            conn.execute(sql)
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's connection to the session database.
+
+    Connections are kept open, so that sqlite3's statement cache serves the
+    prepared statements on every later call.
+    """
+    path = get_local_db_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _open(path)
+    return conn
+
+
+def close() -> None:
+    """Close this thread's connections."""
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a datetime as a fixed-width UTC string."""
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def session_from_row(row: tuple) -> dict:
+    """Convert a pomodoro_sessions row to a session dict."""
+    return {
+        "session_type": row[0],
+        "started_at": datetime.fromisoformat(row[1]),
+        "ended_at": datetime.fromisoformat(row[2]) if row[2] else None,
+        "planned_seconds": row[3],
+        "actual_seconds": row[4],
+        "completed": bool(row[5]),
+        "notes": row[6],
+        "id": row[7],
+    }
+
+
+def session_params(session: dict) -> tuple:
+    """Build INSERT parameters from a session dict."""
+    started_at = session["started_at"]
+    ended_at = session.get("ended_at")
+
+    actual_seconds = None
+    if ended_at:
+        actual_seconds = int((ended_at - started_at).total_seconds())
+
+    return (
+        session.get("id") or str(uuid.uuid4()),
+        session["session_type"],
+        _timestamp(started_at),
+        _timestamp(ended_at),
+        session["planned_seconds"],
+        actual_seconds,
+        session["completed"],
+        session.get("notes"),
+    )
+
+
+def _day_bounds(day: str) -> tuple[str, str]:
+    """Get the started_at range of a UTC day."""
+    start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+    return _timestamp(start), _timestamp(start + timedelta(days=1))
+
+
+def _refresh_rollups(conn: sqlite3.Connection, params: list[tuple]) -> None:
+    days = sorted({row[2][:10] for row in params if row[2]})
+    conn.executemany(DELETE_ROLLUPS_SQL, [(day,) for day in days])
+    conn.executemany(REFRESH_ROLLUPS_SQL, [(day, *_day_bounds(day)) for day in days])
+
+
+@traced("sqlite.init_db", "db")
+def init_db() -> bool:
+    """Create the local session database and rebuild the daily rollups."""
+    try:
+        conn = get_connection()
+        with conn:
+            for sql in REBUILD_ROLLUPS_SQL:
+                conn.execute(sql)
+        return True
+    except sqlite3.Error:
+        return False
+
+
+@traced("sqlite.get_sessions", "db")
+def get_sessions(limit: int = 10) -> list[dict]:
+    """Fetch recent sessions from the local database."""
+    try:
+        rows = get_connection().execute(SELECT_SESSIONS_SQL, (limit,)).fetchall()
+    except sqlite3.Error:
+        return []
+    return [session_from_row(row) for row in rows]
+
+
+@traced("sqlite.get_last_created", "db")
+def get_last_created() -> Optional[str]:
+    """Get the newest created_at; see pomo.db.get_last_created."""
+    try:
+        row = get_connection().execute(LAST_CREATED_SQL).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] or ""
+
+
+@traced("sqlite.get_stats", "db")
+def get_stats(period: str, since: date, until: date) -> list[dict]:
+    """Aggregate sessions per period from the daily rollups; see pomo.db.get_stats."""
+    try:
+        rows = get_connection().execute(
+            SELECT_STATS_SQL, (period, since.isoformat(), until.isoformat())
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    return [
+        {
+            "period": date.fromisoformat(row[0]),
+            "session_type": row[1],
+            "sessions": row[2],
+            "completed": row[3],
+            "seconds": row[4],
+        }
+        for row in rows
+    ]
+
+
+def _export_row(row: tuple) -> tuple:
+    """Convert stored text columns back to Python values."""
+    return (
+        row[0],
+        row[1],
+        datetime.fromisoformat(row[2]),
+        datetime.fromisoformat(row[3]) if row[3] else None,
+        row[4],
+        row[5],
+        bool(row[6]),
+        row[7],
+        datetime.fromisoformat(row[8]),
+    )
+
+
+def _param(value):
+    """Convert a query parameter to its stored representation."""
+    return _timestamp(value) if isinstance(value, datetime) else value
+
+
+@traced("sqlite.list_sessions", "db")
+def list_sessions(
+    emit: Callable[[dict], None],
+    limit: int = 10,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    session_type: Optional[str] = None,
+    completed: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+    after_id: Optional[str] = None,
+) -> int:
+    """Stream a page of sessions to a callback; see pomo.db.list_sessions."""
+    sql, params = list_query(
+        limit,
+        before,
+        after,
+        session_type,
+        completed,
+        since,
+        until,
+        before_id,
+        after_id,
+        placeholder="?",
+    )
+
+    total = 0
+    try:
+        for row in get_connection().execute(sql, [_param(value) for value in params]):
+            emit(session_from_row(row))
+            total += 1
+        return total
+    except sqlite3.Error:
+        return -1
+
+
+@traced("sqlite.export_sessions", "db")
+def export_sessions(
+    write_batch: Callable[[list[tuple]], None],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """Stream sessions in started_at order; see pomo.db.export_sessions."""
+    sql, params = export_query(since, until, placeholder="?")
+
+    total = 0
+    try:
+        cur = get_connection().execute(sql, [_param(value) for value in params])
+        while rows := cur.fetchmany(batch_size):
+            write_batch([_export_row(row) for row in rows])
+            total += len(rows)
+        return total
+    except sqlite3.Error:
+        return -1
+
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS pomo_import_staging (
+        id TEXT NOT NULL,
+        session_type TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        ended_at TEXT,
+        planned_duration_seconds INTEGER NOT NULL,
+        actual_duration_seconds INTEGER,
+        completed INTEGER NOT NULL,
+        notes TEXT
+    )
+"""
+
+INSERT_STAGING_SQL = "INSERT INTO pomo_import_staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+# The first row of each (started_at, session_type) that is not stored yet
+INSERT_FROM_STAGING_SQL = """
+    INSERT OR IGNORE INTO pomodoro_sessions
+    (id, session_type, started_at, ended_at, planned_duration_seconds,
+     actual_duration_seconds, completed, notes)
+    SELECT id, session_type, started_at, ended_at, planned_duration_seconds,
+           actual_duration_seconds, completed, notes
+    FROM pomo_import_staging s
+    WHERE s.rowid IN (
+        SELECT min(rowid) FROM pomo_import_staging
+        GROUP BY started_at, session_type
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM pomodoro_sessions p
+        WHERE p.started_at = s.started_at AND p.session_type = s.session_type
+    )
+    ORDER BY started_at
+"""
+
+
+@traced("sqlite.import_sessions", "db")
+def import_sessions(sessions: list[dict]) -> int:
+    """Bulk load sessions through a staging table; see pomo.db.import_sessions."""
+    if not sessions:
+        return 0
+
+    params = [session_params(session) for session in sessions]
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(CREATE_STAGING_SQL)
+            conn.executemany(INSERT_STAGING_SQL, params)
+            inserted = conn.execute(INSERT_FROM_STAGING_SQL).rowcount
+            conn.execute("DELETE FROM pomo_import_staging")
+            _refresh_rollups(conn, params)
+        cache.invalidate()
+        return inserted
+    except sqlite3.Error:
+        return -1
+
+
+@traced("sqlite.sync_sessions", "db")
+def sync_sessions(
+    sessions: list[dict], busy_timeout: Optional[int] = None
+) -> list[Optional[bool]]:
+    """
+    Store many sessions in one transaction, along with the daily rollups of
+    the days they touch.
+
+    Args:
+        sessions: Dicts with the keyword arguments of pomo.db.sync_session
+        busy_timeout: Milliseconds to wait for a lock held by another
+            process, instead of BUSY_TIMEOUT
+
+    Returns:
+        One result per session, in order: True if stored, False if the row
+        was rejected, None if the database could not be written
+    """
+    if not sessions:
+        return []
+
+    try:
+        conn = get_connection()
+        params = [session_params(session) for session in sessions]
+        results = []
+        if busy_timeout is not None:
+            conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        try:
+            with conn:
+                for row in params:
+                    try:
+                        conn.execute(INSERT_SESSION_SQL, row)
+                        results.append(True)
+                    except sqlite3.IntegrityError:
+                        results.append(False)
+                _refresh_rollups(conn, params)
+        finally:
+            if busy_timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+        cache.invalidate()
+        return results
+    except sqlite3.Error:
+        return [None] * len(sessions)
@@ -0,0 +1,33 @@
+"""Advisory file locks shared between pomo processes."""
+
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def locked(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold an exclusive flock on a lock file.
+
+    Args:
+        path: Lock file to create and lock
+        blocking: Wait for the lock instead of giving up immediately
+
+    Yields:
+        True if the lock is held, False if it was busy and blocking is False
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "a") as f:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,18 +1,44 @@
 """CLI entry point for pomo."""
 
-from datetime import datetime, timezone
+import sys
+import uuid
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
 import typer
 from typing_extensions import Annotated
 
 from pomo import __version__
+from pomo.client import load_status, save_status
 from pomo.config import get_config
-from pomo.db import init_db, sync_session, get_sessions
-from pomo.notify import send_notification
-from pomo.status import read_status, write_status, Status, SessionType
+from pomo.export import BINARY_FORMATS, EXPORT_FORMATS, is_arrow_available, open_writer
+from pomo.importer import (
+    IMPORT_FORMATS,
+    MAPPINGS,
+    SESSION_TYPES,
+    ImportStats,
+    import_sessions,
+    parse_timestamp,
+    read_records,
+)
+from pomo.outbox import drain, drain_local, is_sync_enabled, pending, pending_local
+from pomo.status import Status, SessionType
 from pomo.output import success, info, error
-from pomo.timer import get_remaining, format_duration, get_emoji
+from pomo.profile import enable as enable_profile, phase
+from pomo.statusline import main as show_statusline
+from pomo.storage import (
+    STATS_PERIODS,
+    get_backend,
+    get_read_backend,
+    get_stats,
+    get_write_backends,
+    init_storage,
+    list_sessions as storage_list_sessions,
+    record_session,
+    uses_remote,
+)
+from pomo.timer import get_remaining, format_duration
+from pomo.watch import watch_status
 
 app = typer.Typer(
     name="pomo",
@@ -22,49 +48,27 @@ app = typer.Typer(
 
 
 @app.callback(invoke_without_command=True)
-def main(ctx: typer.Context) -> None:
+def main(
+    ctx: typer.Context,
+    profile: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Write a timing trace to ~/.config/pomo/profiles (see POMO_PROFILE)",
+        ),
+    ] = False,
+) -> None:
     """
     Show the current pomodoro status.
 
     If no command is provided, displays the remaining time of the active session.
     """
+    if profile:
+        enable_profile()
     if ctx.invoked_subcommand is not None:
         return
 
-    current_status = read_status()
-
-    # No active session
-    if current_status.end is None:
-        return
-
-    config = get_config()
-    remaining = get_remaining(current_status)
-    emoji = get_emoji(config, current_status, remaining)
-    formatted = format_duration(remaining)
-
-    # Clean output only - just emoji + time for tmux
-    typer.echo(f"{emoji} {formatted}")
-
-    # Silent auto-sync when timer completes
-    if remaining <= 0 and not current_status.notified and current_status.start:
-        # Send desktop notification
-        if config.notifications.enabled:
-            send_notification(
-                current_status,
-                urgency=config.notifications.urgency,
-                icon=config.notifications.icon,
-            )
-
-        sync_session(
-            session_type=current_status.session_type.name.lower(),
-            started_at=current_status.start,
-            ended_at=current_status.end,
-            planned_seconds=current_status.duration_seconds,
-            completed=True,
-            notes=current_status.notes,
-        )
-        current_status.notified = True
-        write_status(current_status)
+    show_statusline()
 
 
 @app.command()
@@ -91,7 +95,7 @@ def start(
         duration_seconds=dur,
         notes=notes,
     )
-    write_status(status)
+    save_status(status)
     msg = f"Focus session started ({format_duration(dur)})"
     if notes:
         msg += f' - "{notes}"'
@@ -122,7 +126,7 @@ def deep(
         duration_seconds=dur,
         notes=notes,
     )
-    write_status(status)
+    save_status(status)
     msg = f"Deep work started ({format_duration(dur)})"
     if notes:
         msg += f' - "{notes}"'
@@ -148,37 +152,36 @@ def break_cmd(
         session_type=SessionType.BREAK,
         duration_seconds=dur,
     )
-    write_status(status)
+    save_status(status)
     success(f"Break started ({format_duration(dur)})")
 
 
 @app.command()
 def stop() -> None:
     """Stop the current session early."""
-    current_status = read_status()
+    current_status = load_status()
 
-    # Sync to database if there was an active session
+    # Record the session if there was an active one
     if current_status.start and not current_status.notified:
-        ended_at = datetime.now(timezone.utc)
-        synced = sync_session(
-            session_type=current_status.session_type.name.lower(),
-            started_at=current_status.start,
-            ended_at=ended_at,
-            planned_seconds=current_status.duration_seconds,
-            completed=False,  # Stopped early
-            notes=current_status.notes,
-        )
-        if synced:
-            info("Session synced to database (stopped early)")
+        with phase("record_session"):
+            recorded = record_session(
+                current_status,
+                ended_at=datetime.now(timezone.utc),
+                completed=False,  # Stopped early
+            )
+        if recorded and uses_remote():
+            info("Session queued for database sync (stopped early)")
+        elif recorded:
+            info("Session recorded (stopped early)")
 
-    write_status(Status())
+    save_status(Status())
     info("Session stopped")
 
 
 @app.command()
 def status() -> None:
     """Show detailed status of the current session."""
-    current_status = read_status()
+    current_status = load_status()
 
     if current_status.end is None:
         info("No active session")
@@ -195,41 +198,491 @@ def status() -> None:
         info(f"Started: {current_status.start.strftime('%H:%M')}")
 
 
+@app.command()
+def watch() -> None:
+    """
+    Print the status every time it changes.
+
+    Stays running and prints a new line only when the text changes, for
+    waybar/polybar tail mode or a tmux pipe.
+    """
+    try:
+        watch_status(typer.echo)
+    except KeyboardInterrupt:
+        pass
+
+
 @app.command()
 def init() -> None:
-    """Initialize database table for session tracking."""
-    if init_db():
+    """Initialize the session database (local SQLite and/or Postgres)."""
+    if init_storage():
         success("Database initialized successfully")
     else:
         error("Failed to initialize database. Check POMO_DATABASE_URL.")
         raise typer.Exit(code=1)
 
 
+def format_session_line(session: dict) -> str:
+    """Format one session for pomo list."""
+    session_type = session["session_type"].capitalize()
+    started = session["started_at"].strftime("%Y-%m-%d %H:%M")
+    completed = "+" if session["completed"] else "-"
+    duration = format_duration(session["actual_seconds"] or session["planned_seconds"])
+    notes = session["notes"] or ""
+
+    if notes:
+        return f"{completed} {started}  {session_type:5}  {duration:>7}  {notes}"
+    return f"{completed} {started}  {session_type:5}  {duration:>7}"
+
+
+def format_cursor(session: dict) -> str:
+    """Format the next-page cursor after a listed session: started_at,id."""
+    return f"{session['started_at'].isoformat()},{session['id']}"
+
+
+def parse_cursor(value: Optional[str]) -> tuple[Optional[datetime], Optional[str]]:
+    """
+    Parse a --before/--after cursor.
+
+    Accepts a timestamp (local time if naive) or a cursor printed by pomo
+    list, which adds the id of the last session to break ties.
+
+    Returns:
+        The timestamp and the id, each None if not given
+    """
+    if value is None:
+        return None, None
+    timestamp, _, session_id = value.partition(",")
+    try:
+        return parse_timestamp(timestamp), str(uuid.UUID(session_id)) if session_id else None
+    except ValueError:
+        error(f"Invalid cursor: {value} (use a timestamp like 2026-01-21T09:00:00+00:00)")
+        raise typer.Exit(code=1)
+
+
 @app.command(name="list")
 def list_sessions(
     limit: Annotated[
         int,
         typer.Argument(help="Number of sessions to show"),
     ] = 10,
+    before: Annotated[
+        Optional[str],
+        typer.Option("--before", help="Sessions started before this time (next page)"),
+    ] = None,
+    after: Annotated[
+        Optional[str],
+        typer.Option("--after", help="Sessions started after this time, oldest first"),
+    ] = None,
+    session_type: Annotated[
+        Optional[str],
+        typer.Option("--type", "-t", help="Only focus, deep or break sessions"),
+    ] = None,
+    completed: Annotated[
+        Optional[bool],
+        typer.Option("--completed/--stopped", help="Only completed or stopped sessions"),
+    ] = None,
+    since: Annotated[
+        Optional[datetime],
+        typer.Option("--since", help="First day (YYYY-MM-DD, UTC)", formats=["%Y-%m-%d"]),
+    ] = None,
+    until: Annotated[
+        Optional[datetime],
+        typer.Option("--until", help="Last day (YYYY-MM-DD, UTC)", formats=["%Y-%m-%d"]),
+    ] = None,
+) -> None:
+    """
+    List recent sessions, newest first.
+
+    Rows are printed as they are fetched. When a page is full, the command for
+    the next page is shown.
+    """
+    if session_type is not None and session_type not in SESSION_TYPES:
+        error(f"Invalid type: {session_type} (use {', '.join(SESSION_TYPES)})")
+        raise typer.Exit(code=1)
+
+    last: list[dict] = []
+
+    def emit(session: dict) -> None:
+        typer.echo(format_session_line(session))
+        last[:] = [session]
+
+    before_at, before_id = parse_cursor(before)
+    after_at, after_id = parse_cursor(after)
+    with phase("list_sessions", limit=limit):
+        shown = storage_list_sessions(
+            emit,
+            limit,
+            before=before_at,
+            after=after_at,
+            before_id=before_id,
+            after_id=after_id,
+            session_type=session_type,
+            completed=completed,
+            since=since.replace(tzinfo=timezone.utc) if since else None,
+            until=until.replace(tzinfo=timezone.utc) + timedelta(days=1) if until else None,
+        )
+
+    if shown < 0:
+        error("Could not read sessions. Check POMO_DATABASE_URL.")
+        raise typer.Exit(code=1)
+    if shown == 0:
+        info("No sessions found")
+    elif shown == limit:
+        cursor = format_cursor(last[0])
+        direction = "--after" if after is not None and before is None else "--before"
+        info(f"Next page: {direction} {cursor}")
+
+
+def default_since(period: str, today: date) -> date:
+    """Get the first day of the default stats window for a period."""
+    if period == "week":
+        return today - timedelta(days=today.weekday() + 21)
+    if period == "month":
+        month = today.year * 12 + today.month - 1 - 5
+        return date(month // 12, month % 12 + 1, 1)
+    if period == "range":
+        return today - timedelta(days=29)
+    return today - timedelta(days=6)
+
+
+def format_stats_line(label: str, row: dict) -> str:
+    """Format one aggregated stats row."""
+    rate = round(100 * row["completed"] / row["sessions"]) if row["sessions"] else 0
+    session_type = row["session_type"].capitalize()
+    return (
+        f"{label:10}  {session_type:5}  {row['sessions']:>4} sessions"
+        f"  {rate:>3}% completed  {format_duration(row['seconds']):>7}"
+    )
+
+
+@app.command()
+def stats(
+    period: Annotated[
+        str,
+        typer.Argument(help="Group by day, week or month, or range for totals only"),
+    ] = "day",
+    since: Annotated[
+        Optional[datetime],
+        typer.Option("--since", help="First day (YYYY-MM-DD, UTC)", formats=["%Y-%m-%d"]),
+    ] = None,
+    until: Annotated[
+        Optional[datetime],
+        typer.Option("--until", help="Last day (YYYY-MM-DD, UTC)", formats=["%Y-%m-%d"]),
+    ] = None,
+) -> None:
+    """
+    Show focus time and completion rates per period and session type.
+
+    Defaults to the last 7 days, 4 weeks or 6 months.
+    """
+    if period not in (*STATS_PERIODS, "range"):
+        error(f"Invalid period: {period} (use day, week, month or range)")
+        raise typer.Exit(code=1)
+
+    last = until.date() if until else datetime.now(timezone.utc).date()
+    first = since.date() if since else default_since(period, last)
+    rows = get_stats("day" if period == "range" else period, first, last)
+
+    if not rows:
+        info("No sessions found")
+        return
+
+    totals: dict[str, dict] = {}
+    for row in rows:
+        if period != "range":
+            typer.echo(format_stats_line(row["period"].isoformat(), row))
+        total = totals.setdefault(
+            row["session_type"],
+            {"session_type": row["session_type"], "sessions": 0, "completed": 0, "seconds": 0},
+        )
+        for key in ("sessions", "completed", "seconds"):
+            total[key] += row[key]
+
+    if period != "range":
+        typer.echo("")
+    info(f"{first.isoformat()} to {last.isoformat()}")
+    for session_type in sorted(totals):
+        typer.echo(format_stats_line("Total", totals[session_type]))
+
+
+@app.command()
+def export(
+    fmt: Annotated[
+        str,
+        typer.Option("--format", "-f", help="csv, jsonl, parquet or arrow"),
+    ] = "csv",
+    output: Annotated[
+        Optional[str],
+        typer.Option("--output", "-o", help="Output file (default: stdout)"),
+    ] = None,
+    since: Annotated[
+        Optional[datetime],
+        typer.Option("--since", help="First day (YYYY-MM-DD, UTC)", formats=["%Y-%m-%d"]),
+    ] = None,
+    until: Annotated[
+        Optional[datetime],
+        typer.Option("--until", help="Last day (YYYY-MM-DD, UTC)", formats=["%Y-%m-%d"]),
+    ] = None,
+    source: Annotated[
+        Optional[str],
+        typer.Option("--source", help="sqlite or postgres (default: the read backend)"),
+    ] = None,
+) -> None:
+    """
+    Export sessions for analysis, oldest first.
+
+    Rows are streamed in batches, so large histories export in constant memory.
+    """
+    if fmt not in EXPORT_FORMATS:
+        error(f"Invalid format: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+        raise typer.Exit(code=1)
+    if fmt in BINARY_FORMATS and not output:
+        error(f"{fmt} output needs --output")
+        raise typer.Exit(code=1)
+    if fmt in BINARY_FORMATS and not is_arrow_available():
+        error(f"{fmt} output needs pyarrow: pip install 'pomo[arrow]'")
+        raise typer.Exit(code=1)
+    if source not in (None, "sqlite", "postgres"):
+        error(f"Invalid source: {source} (use sqlite or postgres)")
+        raise typer.Exit(code=1)
+
+    backend = get_backend(source) if source else get_read_backend()
+    first = since.replace(tzinfo=timezone.utc) if since else None
+    end = until.replace(tzinfo=timezone.utc) + timedelta(days=1) if until else None
+
+    if fmt in BINARY_FORMATS:
+        writer = open_writer(fmt, path=output)
+        stream = None
+    else:
+        stream = open(output, "w", newline="") if output else None
+        writer = open_writer(fmt, stream=stream or sys.stdout)
+
+    try:
+        exported = backend.export_sessions(writer.write_batch, first, end)
+    finally:
+        writer.close()
+        if stream is not None:
+            stream.close()
+
+    if exported < 0:
+        error("Could not read sessions. Check POMO_DATABASE_URL.")
+        raise typer.Exit(code=1)
+    if output:
+        success(f"Exported {exported} sessions to {output}")
+
+
+@app.command(name="import")
+def import_cmd(
+    path: Annotated[
+        str,
+        typer.Argument(help="CSV or JSONL file, or - for stdin"),
+    ],
+    fmt: Annotated[
+        Optional[str],
+        typer.Option("--format", "-f", help="csv or jsonl (default: from the file name)"),
+    ] = None,
+    mapping: Annotated[
+        str,
+        typer.Option("--mapping", "-m", help="Record layout: pomo or toggl"),
+    ] = "pomo",
 ) -> None:
-    """List recent sessions from the database."""
-    sessions = get_sessions(limit)
+    """
+    Import sessions from a file, e.g. a pomo export or a Toggl Track report.
+
+    Sessions with the same start time and type as a stored one are skipped, so
+    a file can safely be imported again.
+    """
+    if fmt is None:
+        fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+    if fmt not in IMPORT_FORMATS:
+        error(f"Invalid format: {fmt} (use csv or jsonl)")
+        raise typer.Exit(code=1)
+    if mapping not in MAPPINGS:
+        error(f"Invalid mapping: {mapping} (use {', '.join(MAPPINGS)})")
+        raise typer.Exit(code=1)
 
-    if not sessions:
-        info("No sessions found (check POMO_DATABASE_URL)")
+    backends = {
+        name: backend.import_sessions for name, backend in get_write_backends().items()
+    }
+
+    def progress(stats: ImportStats) -> None:
+        typer.echo(
+            f"\r{stats.read} rows read ({stats.rate:.0f} rows/s)", nl=False, err=True
+        )
+
+    try:
+        stream = sys.stdin if path == "-" else open(path, newline="")
+    except OSError as e:
+        error(f"Cannot open {path}: {e.strerror}")
+        raise typer.Exit(code=1)
+    try:
+        records = read_records(stream, fmt)
+        stats = import_sessions(records, mapping, backends, progress=progress)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    typer.echo("", err=True)
+
+    if stats is None:
+        error("Import stopped: could not write to the database. Check POMO_DATABASE_URL.")
+        raise typer.Exit(code=1)
+
+    for message in stats.errors:
+        error(message)
+    inserted = ", ".join(f"{count} new in {name}" for name, count in stats.inserted.items())
+    success(
+        f"Loaded {stats.valid} sessions ({inserted}, duplicates skipped) "
+        f"in {stats.seconds:.1f}s, {stats.rate:.0f} rows/s"
+    )
+    if stats.invalid:
+        error(f"{stats.invalid} invalid records skipped")
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def sync() -> None:
+    """Sync queued sessions to the database now."""
+    queued_locally = pending_local()
+    if queued_locally:
+        stored = drain_local()
+        if stored < 0:
+            error(f"{queued_locally} sessions still queued (local database locked?)")
+            raise typer.Exit(code=1)
+        success(f"Stored {stored} queued sessions locally")
+
+    if not is_sync_enabled():
+        if queued_locally:
+            return
+        error("No database configured. Set POMO_DATABASE_URL.")
+        raise typer.Exit(code=1)
+
+    synced = drain(force=True)
+    if synced < 0:
+        info("Another sync is already running")
         return
 
-    for session in sessions:
-        session_type = session["session_type"].capitalize()
-        started = session["started_at"].strftime("%Y-%m-%d %H:%M")
-        completed = "+" if session["completed"] else "-"
-        duration = format_duration(session["actual_seconds"] or session["planned_seconds"])
-        notes = session["notes"] or ""
+    left = pending()
+    if left:
+        from pomo.db import get_schema_error
 
-        if notes:
-            typer.echo(f"{completed} {started}  {session_type:5}  {duration:>7}  {notes}")
+        problem = get_schema_error()
+        if problem:
+            error(
+                f"Synced {synced} sessions, {left} still queued: the database schema "
+                f"is out of date ({problem}). Run 'pomo init'."
+            )
         else:
-            typer.echo(f"{completed} {started}  {session_type:5}  {duration:>7}")
+            error(f"Synced {synced} sessions, {left} still queued (database unreachable?)")
+        raise typer.Exit(code=1)
+    success(f"Synced {synced} sessions")
+
+
+@app.command()
+def cache(
+    clear: Annotated[
+        bool, typer.Option("--clear", help="Remove cached results and reset counters")
+    ] = False,
+) -> None:
+    """Show query cache statistics."""
+    from pomo import cache as query_cache
+
+    if clear:
+        removed = query_cache.clear()
+        success(f"Removed {removed} cached results")
+        return
+
+    paths = query_cache.entries()
+    size = sum(path.stat().st_size for path in paths)
+    stats = query_cache.read_stats()
+    served = stats["hits"] + stats["revalidated"]
+    lookups = served + stats["misses"]
+    rate = f"{served / lookups:.0%}" if lookups else "-"
+
+    typer.echo(f"Entries: {len(paths)} ({size / 1024:.1f} KiB)")
+    typer.echo(f"TTL: {query_cache.get_ttl()}s")
+    typer.echo(
+        f"Hits: {stats['hits']} fresh, {stats['revalidated']} revalidated, "
+        f"{stats['misses']} misses ({rate} hit rate)"
+    )
+    typer.echo(
+        f"Invalidations: {stats['invalidations']}, evictions: {stats['evictions']}"
+    )
+
+
+config_app = typer.Typer(help="Inspect the configuration.")
+app.add_typer(config_app, name="config")
+
+
+@config_app.command("check")
+def config_check() -> None:
+    """Validate ~/.config/pomo/config.json and show the resolved settings."""
+    from pomo.config import ConfigError, get_config_path, load_config, read_config_file
+
+    path = get_config_path()
+    if not path.exists():
+        info(f"No config file at {path}, using the defaults")
+        return
+
+    warnings: list[str] = []
+    try:
+        config = read_config_file(path, warnings)
+    except ConfigError as e:
+        error(f"{path} is invalid:")
+        for problem in e.problems:
+            typer.echo(f"  {problem}", err=True)
+        raise typer.Exit(code=1)
+    except OSError as e:
+        error(f"Cannot read {path}: {e.strerror}")
+        raise typer.Exit(code=1)
+
+    for warning in warnings:
+        info(f"Warning: {warning}")
+    # Refresh the snapshot so the next statusline tick picks it up directly
+    load_config()
+
+    durations = config.durations
+    success(f"{path} is valid")
+    typer.echo(
+        f"Durations: focus {format_duration(durations.focus)}, "
+        f"break {format_duration(durations.break_)}, deep {format_duration(durations.deep)}"
+    )
+    notifications = config.notifications
+    state = notifications.backend if notifications.enabled else "off"
+    typer.echo(f"Notifications: {state} ({notifications.urgency})")
+
+
+@app.command()
+def metrics(
+    serve: Annotated[
+        bool, typer.Option("--serve", help="Serve the metrics over HTTP on /metrics")
+    ] = False,
+    host: Annotated[str, typer.Option("--host", help="Address to serve on")] = "127.0.0.1",
+    port: Annotated[int, typer.Option("--port", help="Port to serve on")] = 9464,
+    openmetrics: Annotated[
+        bool, typer.Option("--openmetrics", help="Print in OpenMetrics format")
+    ] = False,
+) -> None:
+    """Show the recorded metrics (POMO_METRICS=1), or serve them."""
+    from pomo import metrics as telemetry
+
+    if serve:
+        info(f"Serving metrics on http://{host}:{port}/metrics")
+        try:
+            telemetry.serve(host, port)
+        except OSError as e:
+            error(f"Could not serve metrics: {e}")
+            raise typer.Exit(code=1)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    telemetry.flush()
+    state = telemetry.read_state()
+    if not state:
+        info("No metrics recorded yet (set POMO_METRICS=1 to record them)")
+        return
+    typer.echo(telemetry.render(state, openmetrics=openmetrics), nl=False)
 
 
 @app.command()
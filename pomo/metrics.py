@@ -0,0 +1,291 @@
+"""Opt-in telemetry in the Prometheus / OpenMetrics text formats.
+
+With ``POMO_METRICS=1``, pomo counts syncs, notifications, renders and
+recorded sessions. Every process keeps its observations in memory and merges
+them into ``metrics.json`` in the config directory when it exits, under a file
+lock, so short-lived CLI invocations add up. After each merge the totals are
+rendered to a node_exporter textfile, ``metrics.prom`` in the config directory
+(or ``POMO_METRICS_TEXTFILE``), which is replaced atomically as the textfile
+collector requires.
+
+``pomo metrics --serve`` serves the merged totals on ``/metrics`` for direct
+scraping, in OpenMetrics format when the scraper asks for it.
+
+This module only uses the stdlib. When metrics are off every hook returns
+after one check.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from pomo.config import get_config_dir
+from pomo.locking import locked
+
+# Latency buckets in seconds, from a render to a slow database round trip
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help); counters are named without their _total suffix
+METRICS = {
+    "pomo_sync_duration_seconds": ("histogram", "Time to sync a batch of sessions to Postgres"),
+    "pomo_sync_sessions": ("counter", "Sessions synced to Postgres"),
+    "pomo_sync_failures": ("counter", "Sessions not synced, by reason"),
+    "pomo_notifications": ("counter", "Notifications sent, by backend and result"),
+    "pomo_outbox_depth": ("gauge", "Sessions waiting in the outbox after the last flush"),
+    "pomo_render_duration_seconds": ("histogram", "Time to render the statusline"),
+    "pomo_sessions_completed": ("counter", "Sessions that ran to completion, by type"),
+    "pomo_sessions_stopped": ("counter", "Sessions stopped early, by type"),
+}
+
+# Seconds between merges of long-running processes such as pomod
+FLUSH_INTERVAL = 15
+
+_enabled = os.environ.get("POMO_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_pending: dict = {}
+_last_flush = time.monotonic()
+_registered = False
+
+
+def is_enabled() -> bool:
+    """Check if metrics are being recorded (POMO_METRICS)."""
+    return _enabled
+
+
+def enable(enabled: bool = True) -> None:
+    """Turn recording on or off for this process."""
+    global _enabled
+    _enabled = enabled
+
+
+def get_state_path() -> Path:
+    """Get the path of the merged metric state."""
+    return get_config_dir() / "metrics.json"
+
+
+def get_textfile_path() -> Path:
+    """Get the node_exporter textfile path from POMO_METRICS_TEXTFILE."""
+    path = os.environ.get("POMO_METRICS_TEXTFILE")
+    return Path(path) if path else get_config_dir() / "metrics.prom"
+
+
+def _label_key(labels: dict) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+def _record(name: str, labels: dict, update) -> None:
+    global _registered
+
+    with _lock:
+        series = _pending.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = update(series.get(key))
+        if not _registered:
+            atexit.register(flush)
+            _registered = True
+
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """Add to a counter."""
+    if not _enabled:
+        return
+    _record(name, labels, lambda value: (value or 0) + amount)
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    """Set a gauge; the latest value from any process wins."""
+    if not _enabled:
+        return
+    _record(name, labels, lambda _: {"value": value, "at": time.time()})
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    """Add an observation to a histogram."""
+    if not _enabled:
+        return
+
+    def update(histogram: Optional[dict]) -> dict:
+        histogram = histogram or {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+        return histogram
+
+    _record(name, labels, update)
+
+
+def record_sync(results: list, seconds: float) -> None:
+    """
+    Record one sync of a batch of sessions.
+
+    Args:
+        results: Per-session results of sync_sessions: True if stored, False
+            if rejected, None if the database was not reached
+        seconds: How long the sync took
+    """
+    if not _enabled or not results:
+        return
+    observe("pomo_sync_duration_seconds", seconds)
+    inc("pomo_sync_sessions", results.count(True))
+    rejected = results.count(False)
+    if rejected:
+        inc("pomo_sync_failures", rejected, reason="rejected")
+    unavailable = results.count(None)
+    if unavailable:
+        inc("pomo_sync_failures", unavailable, reason="unavailable")
+
+
+def _merge(state: dict, pending: dict) -> None:
+    for name, series in pending.items():
+        kind = METRICS[name][0]
+        merged = state.setdefault(name, {})
+        for key, value in series.items():
+            old = merged.get(key)
+            if kind == "counter":
+                merged[key] = (old or 0) + value
+            elif kind == "gauge":
+                if old is None or value["at"] >= old["at"]:
+                    merged[key] = value
+            else:
+                if old is None:
+                    merged[key] = value
+                else:
+                    old["buckets"] = [a + b for a, b in zip(old["buckets"], value["buckets"])]
+                    old["sum"] += value["sum"]
+                    old["count"] += value["count"]
+
+
+def read_state() -> dict:
+    """Read the merged metric state."""
+    try:
+        with open(get_state_path()) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+def flush() -> bool:
+    """
+    Merge this process's observations into the shared state and rewrite the
+    textfile.
+
+    Returns:
+        True if there was something to merge and it was written
+    """
+    global _pending, _last_flush
+
+    with _lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+    if not pending:
+        return False
+
+    try:
+        get_config_dir().mkdir(parents=True, exist_ok=True)
+        with locked(get_config_dir() / "metrics.lock"):
+            state = read_state()
+            _merge(state, pending)
+            _write_atomic(get_state_path(), json.dumps(state))
+            _write_atomic(get_textfile_path(), render(state))
+    except OSError:
+        return False
+    return True
+
+
+def flush_if_due(interval: float = FLUSH_INTERVAL) -> None:
+    """Flush from a long-running process at most once per interval."""
+    if _enabled and time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def _format(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(key: str, extra: str = "") -> str:
+    inner = ",".join(part for part in (key, extra) if part)
+    return f"{{{inner}}}" if inner else ""
+
+
+def render(state: dict, openmetrics: bool = False) -> str:
+    """
+    Render merged state as exposition text.
+
+    Args:
+        state: Merged metric state, as from read_state
+        openmetrics: OpenMetrics 1.0 instead of the Prometheus 0.0.4 text
+            format that node_exporter's textfile collector reads
+    """
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = state.get(name)
+        if not series:
+            continue
+        family = name if openmetrics or kind != "counter" else f"{name}_total"
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for key, value in sorted(series.items()):
+            if kind == "counter":
+                lines.append(f"{name}_total{_labels(key)} {_format(value)}")
+            elif kind == "gauge":
+                lines.append(f"{name}{_labels(key)} {_format(value['value'])}")
+            else:
+                bounds = [*BUCKETS, "+Inf"]
+                for bound, count in zip(bounds, [*value["buckets"], value["count"]]):
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{_labels(key, le)} {count}")
+                lines.append(f"{name}_sum{_labels(key)} {_format(value['sum'])}")
+                lines.append(f"{name}_count{_labels(key)} {value['count']}")
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def create_server(host: str = "127.0.0.1", port: int = 9464):
+    """Create an HTTP server answering /metrics with the merged metrics."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            flush()
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            body = render(read_state(), openmetrics=openmetrics).encode()
+            content_type = (
+                "application/openmetrics-text; version=1.0.0; charset=utf-8"
+                if openmetrics
+                else "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(host: str = "127.0.0.1", port: int = 9464) -> None:
+    """Serve the merged metrics on /metrics until interrupted."""
+    with create_server(host, port) as server:
+        server.serve_forever()
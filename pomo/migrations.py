@@ -0,0 +1,298 @@
+"""Versioned schema migrations for the Postgres database.
+
+``pomo init`` applies every migration that is not recorded in
+``pomo_schema_migrations`` yet, each in its own transaction, under an advisory
+lock so that concurrent runs wait for each other. Migrations are never edited
+once released; schema changes are appended as new versions.
+
+Migration 2 turns pomodoro_sessions into a table partitioned by month on
+started_at. Queries that filter on started_at only touch the partitions in
+range, and old months can be vacuumed, detached or dropped on their own.
+Sessions outside the existing partitions land in a default partition until
+ensure_partitions() creates their month and moves them over.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Callable
+
+import psycopg
+from psycopg import sql
+
+from pomo.db import SCHEMA_SQL, connection
+
+# Months created ahead of the current one
+PARTITION_MONTHS_AHEAD = 3
+
+CREATE_MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS pomo_schema_migrations (
+        version INT PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+LOCK_MIGRATIONS_SQL = "SELECT pg_advisory_xact_lock(hashtext('pomo_schema_migrations'))"
+
+IS_PARTITIONED_SQL = """
+    SELECT c.relkind = 'p'
+    FROM pg_class c
+    WHERE c.oid = to_regclass('pomodoro_sessions')
+"""
+
+# The primary key of a partitioned table has to include the partition key.
+# Ids are minted when a session starts, so (id, started_at) is as unique as
+# id, and upserts name the constraint, which works before and after.
+CREATE_PARTITIONED_SQL = [
+    """
+    CREATE TABLE pomodoro_sessions (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        session_type VARCHAR(10) NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL,
+        ended_at TIMESTAMPTZ,
+        planned_duration_seconds INT NOT NULL,
+        actual_duration_seconds INT,
+        completed BOOLEAN DEFAULT FALSE,
+        notes TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW(),
+        CONSTRAINT pomodoro_sessions_pkey PRIMARY KEY (id, started_at)
+    ) PARTITION BY RANGE (started_at)
+    """,
+    """
+    CREATE INDEX idx_pomo_sessions_started_at
+    ON pomodoro_sessions(started_at)
+    """,
+    """
+    CREATE INDEX idx_pomo_sessions_type_started_at
+    ON pomodoro_sessions(session_type, started_at)
+    """,
+    # Tiny index for range scans over appended, time-ordered rows; the btree
+    # above still serves ordered LIMIT queries
+    """
+    CREATE INDEX idx_pomo_sessions_started_at_brin
+    ON pomodoro_sessions USING brin(started_at)
+    """,
+    """
+    CREATE TABLE pomodoro_sessions_default
+    PARTITION OF pomodoro_sessions DEFAULT
+    """,
+]
+
+SESSION_COLUMNS = """
+    id, session_type, started_at, ended_at, planned_duration_seconds,
+    actual_duration_seconds, completed, notes, created_at
+"""
+
+
+def month_start(value: date) -> date:
+    """Get the first day of the month of a date."""
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    """Get the first day of the following month."""
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Get the name of the partition holding a month."""
+    return f"pomodoro_sessions_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(cur: psycopg.Cursor) -> bool:
+    """Check if pomodoro_sessions is a partitioned table."""
+    cur.execute(IS_PARTITIONED_SQL)
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def create_partition(cur: psycopg.Cursor, month: date) -> bool:
+    """
+    Create the partition of one month, if it does not exist yet.
+
+    Sessions of that month that were stored in the default partition are
+    moved into the new partition before it is attached.
+
+    Returns:
+        True if the partition was created
+    """
+    name = partition_name(month)
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    if cur.fetchone()[0]:
+        return False
+
+    lower = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    upper_month = next_month(month)
+    upper = datetime(upper_month.year, upper_month.month, 1, tzinfo=timezone.utc)
+    table = sql.Identifier(name)
+
+    cur.execute(
+        sql.SQL("CREATE TABLE {} (LIKE pomodoro_sessions INCLUDING DEFAULTS)").format(table)
+    )
+    cur.execute(
+        sql.SQL(
+            """
+            WITH moved AS (
+                DELETE FROM pomodoro_sessions_default
+                WHERE started_at >= %s AND started_at < %s
+                RETURNING *
+            )
+            INSERT INTO {} SELECT * FROM moved
+            """
+        ).format(table),
+        (lower, upper),
+    )
+    cur.execute(
+        sql.SQL(
+            "ALTER TABLE pomodoro_sessions ATTACH PARTITION {} FOR VALUES FROM ({}) TO ({})"
+        ).format(table, sql.Literal(lower), sql.Literal(upper))
+    )
+    return True
+
+
+def create_partitions(cur: psycopg.Cursor, first: date, months_ahead: int) -> int:
+    """
+    Create monthly partitions from a month up to some months after today.
+
+    Returns:
+        Number of partitions created
+    """
+    last = month_start(datetime.now(timezone.utc).date())
+    for _ in range(months_ahead):
+        last = next_month(last)
+
+    created = 0
+    month = month_start(first)
+    while month <= last:
+        created += create_partition(cur, month)
+        month = next_month(month)
+    return created
+
+
+def create_upcoming_partitions(cur: psycopg.Cursor, months_ahead: int) -> int:
+    """
+    Create the partitions of the current and the next months.
+
+    Does nothing until the sessions table is partitioned.
+
+    Returns:
+        Number of partitions created
+    """
+    if not is_partitioned(cur):
+        return 0
+    cur.execute(LOCK_MIGRATIONS_SQL)
+    return create_partitions(cur, datetime.now(timezone.utc).date(), months_ahead)
+
+
+def _create_schema(cur: psycopg.Cursor) -> None:
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+
+
+def _partition_sessions(cur: psycopg.Cursor) -> None:
+    if is_partitioned(cur):
+        return
+
+    cur.execute("ALTER TABLE pomodoro_sessions RENAME TO pomodoro_sessions_unpartitioned")
+    cur.execute(
+        "ALTER TABLE pomodoro_sessions_unpartitioned"
+        " RENAME CONSTRAINT pomodoro_sessions_pkey TO pomodoro_sessions_unpartitioned_pkey"
+    )
+    cur.execute("DROP INDEX IF EXISTS idx_pomo_sessions_started_at")
+    cur.execute("DROP INDEX IF EXISTS idx_pomo_sessions_type_started_at")
+
+    for statement in CREATE_PARTITIONED_SQL:
+        cur.execute(statement)
+
+    cur.execute("SELECT min(started_at) FROM pomodoro_sessions_unpartitioned")
+    oldest = cur.fetchone()[0] or datetime.now(timezone.utc)
+    create_partitions(cur, oldest.astimezone(timezone.utc).date(), PARTITION_MONTHS_AHEAD)
+
+    cur.execute(
+        f"INSERT INTO pomodoro_sessions ({SESSION_COLUMNS})"
+        f" SELECT {SESSION_COLUMNS} FROM pomodoro_sessions_unpartitioned"
+    )
+    cur.execute("DROP TABLE pomodoro_sessions_unpartitioned")
+
+
+def _index_created_at(cur: psycopg.Cursor) -> None:
+    # Serves the max(created_at) probe of the query cache
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_pomo_sessions_created_at
+        ON pomodoro_sessions(created_at)
+        """
+    )
+
+
+def _index_started_at_id(cur: psycopg.Cursor) -> None:
+    # id breaks ties between sessions that started at the same time, so list
+    # pages are ordered and walked from the index alone; the old indexes are
+    # prefixes of the new ones
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_pomo_sessions_started_at_id
+        ON pomodoro_sessions(started_at, id)
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_pomo_sessions_type_started_at_id
+        ON pomodoro_sessions(session_type, started_at, id)
+        """
+    )
+    cur.execute("DROP INDEX IF EXISTS idx_pomo_sessions_started_at")
+    cur.execute("DROP INDEX IF EXISTS idx_pomo_sessions_type_started_at")
+
+
+# (version, name, apply), in order
+MIGRATIONS: list[tuple[int, str, Callable[[psycopg.Cursor], None]]] = [
+    (1, "create_schema", _create_schema),
+    (2, "partition_sessions_by_month", _partition_sessions),
+    (3, "index_created_at", _index_created_at),
+    (4, "index_started_at_id", _index_started_at_id),
+]
+
+
+def migrate(conn: psycopg.Connection) -> list[str]:
+    """
+    Apply pending migrations.
+
+    Returns:
+        Names of the migrations that were applied
+    """
+    applied = []
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(CREATE_MIGRATIONS_TABLE_SQL)
+
+    for version, name, apply in MIGRATIONS:
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(LOCK_MIGRATIONS_SQL)
+            cur.execute("SELECT 1 FROM pomo_schema_migrations WHERE version = %s", (version,))
+            if cur.fetchone():
+                continue
+            apply(cur)
+            cur.execute(
+                "INSERT INTO pomo_schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+            applied.append(name)
+    return applied
+
+
+def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Create upcoming partitions in a transaction of their own.
+
+    Returns:
+        Number of partitions created, or -1 if the database is unavailable
+    """
+    try:
+        with connection() as conn:
+            if conn is None:
+                return -1
+            with conn.transaction(), conn.cursor() as cur:
+                return create_upcoming_partitions(cur, months_ahead)
+    except psycopg.Error:
+        return -1
@@ -1,11 +1,38 @@
-"""Desktop notification support for pomo."""
+"""Desktop notification support for pomo.
 
+Notifications are delivered by one of several backends:
+
+- ``notify-send``: the libnotify command line tool
+- ``dbus``: a direct org.freedesktop.Notifications call over a cached session
+  bus connection (needs the optional ``jeepney`` package)
+- ``command``: a user-configured command
+- ``webhook``: a JSON POST to a (local) HTTP endpoint
+
+dispatch_notification is fire-and-forget, so a hung notification daemon never
+blocks the statusline. notify-send and commands run as detached processes. The
+Python backends (D-Bus and webhooks) are handed to ``pomod`` when it runs, which
+delivers them in a thread over its one cached session bus connection, and to a
+detached ``python -m pomo.notify`` child otherwise.
+"""
+
+import json
+import os
 import shutil
 import subprocess
-from typing import Optional
+import sys
+import threading
+from typing import Callable, Optional
 
+from pomo import metrics
+from pomo.client import request
+from pomo.config import NOTIFICATION_BACKENDS, Notifications
 from pomo.status import Status, SessionType
 
+# Timeout for a single delivery attempt, in seconds
+DELIVERY_TIMEOUT = 5
+
+URGENCY_LEVELS = {"low": 0, "normal": 1, "critical": 2}
+
 
 def is_notify_available() -> bool:
     """Check if notify-send is available on the system."""
@@ -54,6 +81,7 @@ def send_notification(
         True if notification was sent successfully, False otherwise
     """
     if not is_notify_available():
+        metrics.inc("pomo_notifications", backend="notify-send", result="unavailable")
         return False
 
     title = get_notification_title(status.session_type)
@@ -71,6 +99,258 @@ def send_notification(
 
     try:
         subprocess.run(cmd, check=True, timeout=5)
+        metrics.inc("pomo_notifications", backend="notify-send", result="sent")
         return True
     except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        metrics.inc("pomo_notifications", backend="notify-send", result="failed")
         return False
+
+
+_dbus_connection = None
+_dbus_lock = threading.Lock()
+
+# Set in pomod, which delivers the Python backends itself
+_resident = False
+
+
+def _get_dbus_connection():
+    """Open the session bus once and reuse it for later notifications."""
+    global _dbus_connection
+
+    if _dbus_connection is None:
+        from jeepney.io.blocking import open_dbus_connection
+
+        _dbus_connection = open_dbus_connection(bus="SESSION")
+    return _dbus_connection
+
+
+def _drop_dbus_connection() -> None:
+    """Forget a broken connection, so that the next delivery reconnects."""
+    global _dbus_connection
+
+    if _dbus_connection is not None:
+        try:
+            _dbus_connection.close()
+        except Exception:
+            pass
+        _dbus_connection = None
+
+
+def _deliver_dbus(
+    title: str, body: str, urgency: str, icon: Optional[str], settings: Notifications
+) -> bool:
+    try:
+        from jeepney import DBusAddress, new_method_call
+    except ImportError:
+        return False
+
+    address = DBusAddress(
+        "/org/freedesktop/Notifications",
+        bus_name="org.freedesktop.Notifications",
+        interface="org.freedesktop.Notifications",
+    )
+    message = new_method_call(
+        address,
+        "Notify",
+        "susssasa{sv}i",
+        (
+            "pomo",
+            0,
+            icon or "",
+            title,
+            body,
+            [],
+            {"urgency": ("y", URGENCY_LEVELS.get(urgency, 1))},
+            -1,
+        ),
+    )
+    # One blocking connection, shared by pomod's delivery threads
+    with _dbus_lock:
+        try:
+            _get_dbus_connection().send_and_get_reply(message, timeout=DELIVERY_TIMEOUT)
+            return True
+        except Exception:
+            _drop_dbus_connection()
+            return False
+
+
+def _command_argv(
+    title: str, body: str, urgency: str, icon: Optional[str], settings: Notifications
+) -> list[str]:
+    """
+    Expand {title}, {body}, {urgency} and {icon} in the configured command.
+
+    Returns:
+        The argv, or an empty list if an argument has placeholders that
+        cannot be filled (pomo.config rejects those, but settings can come
+        from elsewhere)
+    """
+    values = {"title": title, "body": body, "urgency": urgency, "icon": icon or ""}
+    try:
+        return [arg.format_map(values) for arg in settings.command or []]
+    except (KeyError, IndexError, ValueError):
+        return []
+
+
+def _deliver_webhook(
+    title: str, body: str, urgency: str, icon: Optional[str], settings: Notifications
+) -> bool:
+    import urllib.request
+
+    if not settings.webhook:
+        return False
+    payload = json.dumps({"title": title, "body": body, "urgency": urgency, "icon": icon})
+    request = urllib.request.Request(
+        settings.webhook,
+        data=payload.encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=DELIVERY_TIMEOUT) as response:
+            return 200 <= response.status < 300
+    except (OSError, ValueError):
+        return False
+
+
+Backend = Callable[[str, str, str, Optional[str], Notifications], bool]
+
+# Backends delivered from Python; notify-send and commands are spawned directly
+BACKENDS: dict[str, Backend] = {
+    "dbus": _deliver_dbus,
+    "webhook": _deliver_webhook,
+}
+
+# Resolved executables and backends, so PATH is searched once per process
+_which_cache: dict[str, Optional[str]] = {}
+_backend_cache: dict[str, Optional[str]] = {}
+
+
+def _which(name: str) -> Optional[str]:
+    if name not in _which_cache:
+        _which_cache[name] = shutil.which(name)
+    return _which_cache[name]
+
+
+def resolve_backend(settings: Notifications) -> Optional[str]:
+    """
+    Pick the backend to deliver notifications with.
+
+    "auto" prefers notify-send and falls back to D-Bus when jeepney is
+    installed. The result is cached for the lifetime of the process.
+    """
+    if settings.backend != "auto":
+        return settings.backend if settings.backend in NOTIFICATION_BACKENDS else None
+
+    if "auto" not in _backend_cache:
+        backend = None
+        if _which("notify-send"):
+            backend = "notify-send"
+        elif os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+            try:
+                import jeepney  # noqa: F401
+
+                backend = "dbus"
+            except ImportError:
+                pass
+        _backend_cache["auto"] = backend
+    return _backend_cache["auto"]
+
+
+def _spawn(argv: list[str]) -> None:
+    """Start a process detached from ours, without waiting for it."""
+    subprocess.Popen(
+        argv,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def run_resident() -> None:
+    """Deliver the Python backends in this process; called by pomod."""
+    global _resident
+    _resident = True
+
+
+def _hand_off(payload: dict) -> None:
+    """Deliver a Python backend without waiting for it."""
+    if _resident:
+        threading.Thread(target=deliver, args=(payload,), daemon=True).start()
+    elif request({"cmd": "notify", "payload": payload}) is None:
+        _spawn([sys.executable, "-m", "pomo.notify", json.dumps(payload)])
+
+
+def dispatch_notification(status: Status, settings: Notifications) -> bool:
+    """
+    Fire-and-forget a notification for a finished session.
+
+    notify-send and user commands are started directly as detached processes;
+    other backends are delivered by pomod if it runs, or by a detached
+    ``python -m pomo.notify`` child.
+
+    Returns:
+        True if a delivery was started, False if no backend is available
+    """
+    backend = resolve_backend(settings)
+    if backend is None:
+        metrics.inc("pomo_notifications", backend="none", result="unavailable")
+        return False
+
+    title = get_notification_title(status.session_type)
+    body = get_notification_body(status.session_type, status.notes)
+
+    try:
+        if backend == "notify-send":
+            argv = [_which("notify-send") or "notify-send", "--urgency", settings.urgency]
+            if settings.icon:
+                argv.extend(["--icon", settings.icon])
+            _spawn(argv + [title, body])
+        elif backend == "command":
+            argv = _command_argv(title, body, settings.urgency, settings.icon, settings)
+            if not argv:
+                metrics.inc("pomo_notifications", backend=backend, result="unavailable")
+                return False
+            _spawn(argv)
+        else:
+            payload = {
+                "backend": backend,
+                "title": title,
+                "body": body,
+                "urgency": settings.urgency,
+                "icon": settings.icon,
+                "webhook": settings.webhook,
+            }
+            _hand_off(payload)
+            # deliver() counts whether the delivery worked
+            return True
+    except OSError:
+        metrics.inc("pomo_notifications", backend=backend, result="failed")
+        return False
+    # Spawned commands are not waited for, so only their start is known
+    metrics.inc("pomo_notifications", backend=backend, result="dispatched")
+    return True
+
+
+def deliver(payload: dict) -> bool:
+    """Deliver a Python backend notification synchronously (pomod or a child)."""
+    settings = Notifications(backend=payload["backend"], webhook=payload.get("webhook"))
+    backend = BACKENDS.get(payload["backend"])
+    if backend is None:
+        metrics.inc("pomo_notifications", backend=payload["backend"], result="unavailable")
+        return False
+    sent = backend(
+        payload["title"],
+        payload["body"],
+        payload.get("urgency", "normal"),
+        payload.get("icon"),
+        settings,
+    )
+    result = "sent" if sent else "failed"
+    metrics.inc("pomo_notifications", backend=payload["backend"], result=result)
+    return sent
+
+
+if __name__ == "__main__":
+    sys.exit(0 if deliver(json.loads(sys.argv[1])) else 1)
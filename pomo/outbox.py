@@ -0,0 +1,346 @@
+"""Durable local outbox for session sync.
+
+Finished sessions are appended to ``outbox.jsonl`` in the config directory, one
+JSON record per line. Appending is a local, fsynced write, so the statusline
+never waits on the database. A detached flusher (``python -m pomo.outbox``) or
+``pomo sync`` drains the outbox in batches, backing off exponentially while the
+database is unreachable. Rows the database rejects outright are moved to
+``outbox.rejected.jsonl`` so they cannot block the queue.
+
+Sessions whose local SQLite write failed (for instance because another process
+held the database lock) wait in ``outbox.sqlite.jsonl`` the same way, and the
+flusher stores them with the full busy timeout (see drain_local).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from pomo import metrics
+from pomo.config import get_config_dir
+from pomo.locking import locked
+from pomo.status import Status
+
+BATCH_SIZE = 50
+
+# Backoff between failed flushes: 30s, 1m, 2m, ... capped at 1h
+BACKOFF_BASE = 30
+BACKOFF_MAX = 60 * 60
+
+# How often the flusher makes sure upcoming partitions exist
+MAINTENANCE_INTERVAL = 24 * 60 * 60
+
+
+def get_outbox_path() -> Path:
+    """Get the outbox file path."""
+    return get_config_dir() / "outbox.jsonl"
+
+
+def get_local_outbox_path() -> Path:
+    """Get the path of sessions waiting for the local SQLite store."""
+    return get_config_dir() / "outbox.sqlite.jsonl"
+
+
+def get_state_path() -> Path:
+    """Get the path of the flusher backoff state."""
+    return get_config_dir() / "outbox.state.json"
+
+
+def is_sync_enabled() -> bool:
+    """Check if there is a database to sync sessions to."""
+    return bool(os.getenv("POMO_DATABASE_URL"))
+
+
+def _locked(name: str, blocking: bool = True):
+    """Lock one of the outbox lock files in the config dir."""
+    return locked(get_config_dir() / name, blocking=blocking)
+
+
+def get_session_id(status: Status) -> str:
+    """
+    Get the database id of a session.
+
+    Status files written before sessions carried an id get one derived from
+    the start time, so that retries still map to the same row.
+    """
+    if status.session_id:
+        return status.session_id
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"pomo:{status.start.isoformat()}"))
+
+
+def session_record(
+    status: Status,
+    ended_at: Optional[datetime],
+    completed: bool,
+) -> dict:
+    """Build an outbox record for a session."""
+    return {
+        "id": get_session_id(status),
+        "session_type": status.session_type.name.lower(),
+        "started_at": status.start.isoformat() if status.start else None,
+        "ended_at": ended_at.isoformat() if ended_at else None,
+        "planned_seconds": status.duration_seconds,
+        "completed": completed,
+        "notes": status.notes,
+    }
+
+
+def append(record: dict, path: Optional[Path] = None) -> None:
+    """
+    Durably append a record to the outbox.
+
+    Args:
+        record: The session record
+        path: The queue to append to; defaults to the Postgres outbox
+    """
+    line = json.dumps(record) + "\n"
+    with _locked("outbox.lock"):
+        fd = os.open(path or get_outbox_path(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _read_records(path: Path) -> tuple[list[dict], int]:
+    """Read all complete records and return them with the bytes consumed."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+
+    # Ignore a trailing partial line left behind by a crash mid-append
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, end
+
+
+def pending() -> int:
+    """Count records waiting in the outbox."""
+    return len(_read_records(get_outbox_path())[0])
+
+
+def _rewrite(path: Path, remaining: list[dict], consumed: int) -> None:
+    """Replace a queue with unsent records plus anything appended since."""
+    with open(path, "rb") as f:
+        f.seek(consumed)
+        appended = f.read()
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        for record in remaining:
+            f.write(json.dumps(record).encode() + b"\n")
+        f.write(appended)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_state() -> dict:
+    try:
+        with open(get_state_path()) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_state(state: dict) -> None:
+    with open(get_state_path(), "w") as f:
+        json.dump(state, f)
+
+
+def get_rejected_path() -> Path:
+    """Get the path where rows rejected by the database are kept."""
+    return get_config_dir() / "outbox.rejected.jsonl"
+
+
+def to_session(record: dict) -> dict:
+    """Convert an outbox record to sync_sessions arguments."""
+    session = dict(record)
+    session["started_at"] = datetime.fromisoformat(record["started_at"])
+    if record["ended_at"]:
+        session["ended_at"] = datetime.fromisoformat(record["ended_at"])
+    return session
+
+
+def _reject(records: list[dict]) -> None:
+    """Move records the database refuses out of the way of the queue."""
+    with open(get_rejected_path(), "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def drain(force: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Sync queued sessions to the database.
+
+    Args:
+        force: Ignore the backoff window after earlier failures
+        batch_size: Number of records to sync per batch
+
+    Returns:
+        Number of sessions synced, or -1 if another flusher is running or the
+        backoff window has not passed yet
+    """
+    from pomo.db import sync_sessions
+
+    with _locked("outbox.flush.lock", blocking=False) as acquired:
+        if not acquired:
+            return -1
+
+        state = _read_state()
+        if not force and time.time() < state.get("next_attempt", 0):
+            record_depth()
+            return -1
+
+        with _locked("outbox.lock"):
+            records, consumed = _read_records(get_outbox_path())
+
+        synced = 0
+        processed = 0
+        failed = False
+        while processed < len(records):
+            batch = records[processed : processed + batch_size]
+            results = sync_sessions([to_session(record) for record in batch])
+            if None in results:
+                # The database could not be reached; retry the whole batch later
+                failed = True
+                break
+            _reject([record for record, ok in zip(batch, results) if not ok])
+            synced += results.count(True)
+            processed += len(batch)
+
+        if processed:
+            with _locked("outbox.lock"):
+                _rewrite(get_outbox_path(), records[processed:], consumed)
+
+        if failed:
+            failures = state.get("failures", 0) + 1
+            delay = min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_MAX)
+            _write_state({"failures": failures, "next_attempt": time.time() + delay})
+        elif state:
+            _write_state({})
+
+        record_depth()
+        return synced
+
+
+def pending_local() -> int:
+    """Count sessions waiting for the local SQLite store."""
+    return len(_read_records(get_local_outbox_path())[0])
+
+
+def drain_local() -> int:
+    """
+    Store sessions whose local SQLite write failed.
+
+    Returns:
+        Number of sessions stored, or -1 if another flusher is running or the
+        SQLite store still cannot be written
+    """
+    from pomo import local_db
+
+    with _locked("outbox.sqlite.flush.lock", blocking=False) as acquired:
+        if not acquired:
+            return -1
+
+        path = get_local_outbox_path()
+        with _locked("outbox.lock"):
+            records, consumed = _read_records(path)
+        if not records:
+            return 0
+
+        results = local_db.sync_sessions([to_session(record) for record in records])
+        if None in results:
+            return -1
+        _reject([record for record, ok in zip(records, results) if not ok])
+        with _locked("outbox.lock"):
+            _rewrite(path, [], consumed)
+        return results.count(True)
+
+
+def record_depth() -> None:
+    """Record the outbox depth for pomo.metrics, if metrics are on."""
+    if metrics.is_enabled():
+        metrics.set_gauge("pomo_outbox_depth", pending())
+
+
+def spawn_flusher() -> None:
+    """Start a detached background process that drains the outbox."""
+    subprocess.Popen(
+        [sys.executable, "-m", "pomo.outbox"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def queue_session(
+    status: Status,
+    ended_at: Optional[datetime],
+    completed: bool,
+) -> bool:
+    """
+    Queue a session for sync and kick off a background flush.
+
+    Returns:
+        True if the session was queued, False if no database is configured
+    """
+    if not is_sync_enabled():
+        return False
+
+    append(session_record(status, ended_at, completed))
+    spawn_flusher()
+    return True
+
+
+def queue_local(record: dict) -> None:
+    """Queue a session the SQLite store could not take right now."""
+    append(record, get_local_outbox_path())
+    spawn_flusher()
+
+
+def maintain() -> bool:
+    """
+    Create upcoming database partitions, at most once per interval.
+
+    Runs after a flush, so the database has just been reachable. A marker
+    file in the config directory records when it last succeeded.
+
+    Returns:
+        True if maintenance ran and succeeded
+    """
+    marker = get_config_dir() / "maintenance.stamp"
+    try:
+        if time.time() - marker.stat().st_mtime < MAINTENANCE_INTERVAL:
+            return False
+    except FileNotFoundError:
+        pass
+
+    from pomo.migrations import ensure_partitions
+
+    if ensure_partitions() < 0:
+        return False
+    marker.touch()
+    return True
+
+
+if __name__ == "__main__":
+    if get_local_outbox_path().exists():
+        drain_local()
+    if drain() > 0:
+        maintain()
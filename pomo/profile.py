@@ -0,0 +1,247 @@
+"""Opt-in phase timing for diagnosing slow commands.
+
+Set ``POMO_PROFILE`` (or pass ``--profile``) to record how long each phase of
+a pomo invocation takes: importing the CLI, reading config and status, the
+daemon round trip, notifications and database calls. The timings are written
+as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev) to
+the ``profiles`` directory of the config directory when the process exits.
+
+``POMO_PROFILE`` is a comma-separated list of:
+
+- ``1``: phase timings only
+- ``imports``: also time every module import, nested under its importer
+- ``cprofile``: also run cProfile; the stats are saved next to the trace as
+  ``.prof`` (read them with ``python -m pstats``)
+
+This module only uses the stdlib, and is imported first by the statusline so
+that imports can be timed. When profiling is off, phase() returns a shared
+no-op context manager, which costs one function call.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Optional
+
+# Traces kept in the profiles directory; older ones are deleted
+MAX_TRACES = 20
+
+_NULL = nullcontext()
+
+_trace: Optional["Trace"] = None
+
+
+class Trace:
+    """Timed events of one process, in Chrome trace event format."""
+
+    def __init__(self, cprofile: bool = False):
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.events: list[dict] = []
+        # CPU time spent before profiling began: interpreter start and imports
+        startup = time.process_time()
+        self.offset_us = startup * 1e6
+        self.add("startup until profiling (cpu)", "startup", 0, self.offset_us)
+        self.profiler = None
+        if cprofile:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def now_us(self) -> float:
+        """Microseconds since the trace started, after startup."""
+        return (time.perf_counter_ns() - self.origin) / 1000 + self.offset_us
+
+    def add(self, name: str, category: str, start_us: float, duration_us: float, **args) -> None:
+        """Record a complete event."""
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(start_us, 3),
+            "dur": round(duration_us, 3),
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+
+class _Phase:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name: str, category: str, args: dict):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self) -> "_Phase":
+        self.start = _trace.now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.args["error"] = exc_type.__name__
+        _trace.add(self.name, self.category, self.start, _trace.now_us() - self.start, **self.args)
+
+
+def phase(name: str, category: str = "phase", **args: Any):
+    """
+    Time a block as one phase of the trace.
+
+    Args:
+        name: Phase name, e.g. "read_status" or "db.connect"
+        category: Trace category, e.g. "phase", "db" or "import"
+        args: Extra details shown with the event
+    """
+    if _trace is None:
+        return _NULL
+    return _Phase(name, category, args)
+
+
+def traced(name: str, category: str = "phase"):
+    """Decorator timing every call of a function as a phase."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace is None:
+                return func(*args, **kwargs)
+            with _Phase(name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def is_enabled() -> bool:
+    """Check if this process is being profiled."""
+    return _trace is not None
+
+
+class _TimedLoader:
+    """Wraps a module loader to time the execution of the module."""
+
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        try:
+            with phase(self._name, "import"):
+                self._loader.exec_module(module)
+        finally:
+            # Hand the module its real loader back
+            module.__loader__ = self._loader
+            if module.__spec__ is not None:
+                module.__spec__.loader = self._loader
+
+
+class _ImportTimer:
+    """Meta path finder that times the modules found by the other finders."""
+
+    def find_spec(self, name: str, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, name)
+        return spec
+
+
+def enable(cprofile: bool = False, imports: bool = False) -> None:
+    """
+    Start profiling this process; the trace is written at exit.
+
+    Does nothing if profiling is already on.
+    """
+    global _trace
+
+    if _trace is not None:
+        return
+    _trace = Trace(cprofile=cprofile)
+    if imports:
+        sys.meta_path.insert(0, _ImportTimer())
+    atexit.register(finish)
+
+
+def enable_from_env() -> None:
+    """Enable profiling if POMO_PROFILE is set."""
+    value = os.environ.get("POMO_PROFILE", "")
+    if not value or value == "0":
+        return
+    options = {option.strip().lower() for option in value.split(",")}
+    enable(cprofile="cprofile" in options, imports="imports" in options)
+
+
+def finish() -> Optional[str]:
+    """
+    Stop profiling and write the trace.
+
+    Returns:
+        Path of the trace file, or None if profiling was off or the trace
+        could not be written
+    """
+    global _trace
+
+    trace = _trace
+    if trace is None:
+        return None
+    _trace = None
+    for finder in [f for f in sys.meta_path if isinstance(f, _ImportTimer)]:
+        sys.meta_path.remove(finder)
+
+    import json
+
+    from pomo.config import get_config_dir
+
+    directory = get_config_dir() / "profiles"
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    path = directory / f"pomo-{stamp}-{trace.pid}.json"
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        if trace.profiler is not None:
+            trace.profiler.disable()
+            trace.profiler.dump_stats(path.with_suffix(".prof"))
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": trace.events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {"argv": sys.argv, "python": sys.version.split()[0]},
+                },
+                f,
+                default=str,
+            )
+        _prune(directory)
+    except OSError:
+        return None
+    return str(path)
+
+
+def _prune(directory) -> None:
+    traces = sorted(directory.glob("pomo-*.json"), key=lambda p: p.stat().st_mtime_ns)
+    for old in traces[:-MAX_TRACES]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+enable_from_env()
@@ -0,0 +1,128 @@
+"""Read queries shared by the Postgres and SQLite backends.
+
+Both backends have the same pomodoro_sessions columns and indexes, so range
+and keyset queries are built once here, with the driver's placeholder style.
+Every range is a plain comparison on started_at, or on (started_at, id) for
+list cursors, which keeps the queries on idx_pomo_sessions_started_at_id, or
+on idx_pomo_sessions_type_started_at_id when filtering by session type.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from pomo.export import EXPORT_COLUMNS
+
+# Columns of a listed session, in session_from_row order
+LIST_COLUMNS = (
+    "session_type",
+    "started_at",
+    "ended_at",
+    "planned_duration_seconds",
+    "actual_duration_seconds",
+    "completed",
+    "notes",
+    "id",
+)
+
+
+def _where(conditions: list[str]) -> str:
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def export_query(
+    since: Optional[datetime],
+    until: Optional[datetime],
+    placeholder: str = "%s",
+    columns: tuple[str, ...] = EXPORT_COLUMNS,
+) -> tuple[str, list]:
+    """
+    Build the export query for an optional started_at range.
+
+    Args:
+        since: Earliest started_at to include
+        until: started_at must be before this
+        placeholder: Parameter placeholder of the driver
+        columns: Select expressions, one per EXPORT_COLUMNS entry
+
+    Returns:
+        The SQL and its parameters
+    """
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append(f"started_at >= {placeholder}")
+        params.append(since)
+    if until is not None:
+        conditions.append(f"started_at < {placeholder}")
+        params.append(until)
+
+    sql = f"SELECT {', '.join(columns)} FROM pomodoro_sessions{_where(conditions)}"
+    return sql + " ORDER BY started_at", params
+
+
+def list_query(
+    limit: int,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    session_type: Optional[str] = None,
+    completed: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+    after_id: Optional[str] = None,
+    placeholder: str = "%s",
+) -> tuple[str, list]:
+    """
+    Build a keyset-paginated list query.
+
+    Pages are walked with (started_at, id) cursors instead of OFFSET, so every
+    page is an index range scan no matter how far back it is, and sessions
+    that started at the same time are neither skipped nor repeated.
+
+    Args:
+        limit: Maximum number of rows
+        before: Only sessions started before this, newest first
+        after: Only sessions started after this, oldest first (unless before
+            is given too)
+        session_type: Only sessions of this type
+        completed: Only completed (True) or stopped (False) sessions
+        since: Earliest started_at to include
+        until: started_at must be before this
+        before_id: With before, the id of the last listed session; sessions
+            that started at before itself are then included if their id sorts
+            lower
+        after_id: The same for after
+        placeholder: Parameter placeholder of the driver
+
+    Returns:
+        The SQL and its parameters
+    """
+    conditions = []
+    params: list = []
+
+    if session_type is not None:
+        conditions.append(f"session_type = {placeholder}")
+        params.append(session_type)
+    if completed is not None:
+        conditions.append(f"completed = {placeholder}")
+        params.append(completed)
+    for operator, value in ((">=", since), ("<", until)):
+        if value is not None:
+            conditions.append(f"started_at {operator} {placeholder}")
+            params.append(value)
+    for operator, value, cursor_id in (("<", before, before_id), (">", after, after_id)):
+        if value is None:
+            continue
+        if cursor_id is None:
+            conditions.append(f"started_at {operator} {placeholder}")
+            params.append(value)
+        else:
+            conditions.append(f"(started_at, id) {operator} ({placeholder}, {placeholder})")
+            params += [value, cursor_id]
+
+    order = "ASC" if after is not None and before is None else "DESC"
+    sql = (
+        f"SELECT {', '.join(LIST_COLUMNS)} FROM pomodoro_sessions{_where(conditions)}"
+        f" ORDER BY started_at {order}, id {order} LIMIT {placeholder}"
+    )
+    return sql, params + [limit]
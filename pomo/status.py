@@ -1,13 +1,17 @@
 """Session status management for pomo."""
 
 import json
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import mmap
+import os
+import struct
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
 from enum import IntEnum
 from pathlib import Path
 from typing import Optional
 
 from pomo.config import get_config_dir
+from pomo.locking import locked
 
 
 class SessionType(IntEnum):
@@ -28,6 +32,7 @@ class Status:
     notified: bool = False
     duration_seconds: int = 0
     notes: Optional[str] = None
+    session_id: Optional[str] = None
 
     def __post_init__(self):
         """Set start and end time based on duration if not already set."""
@@ -35,8 +40,15 @@ class Status:
             now = datetime.now(timezone.utc).replace(microsecond=0)
             if self.start is None:
                 self.start = now
+                # A new session gets its database id up front, so syncs can be retried
+                if self.session_id is None:
+                    # Imported here: uuid imports platform, which adds ~10ms
+                    # to every statusline start, and renders never need an id
+                    import uuid
+
+                    self.session_id = str(uuid.uuid4())
             if self.end is None:
-                self.end = now + __import__("datetime").timedelta(seconds=self.duration_seconds)
+                self.end = now + timedelta(seconds=self.duration_seconds)
 
 
 def get_status_path() -> Path:
@@ -44,50 +56,319 @@ def get_status_path() -> Path:
     return get_config_dir() / "status.json"
 
 
-def write_status(status: Status) -> None:
-    """Write status to file."""
-    config_dir = get_config_dir()
-    config_dir.mkdir(parents=True, exist_ok=True)
-
-    data = {
+def status_to_dict(status: Status) -> dict:
+    """Serialize a status to a JSON-compatible dict."""
+    return {
         "type": int(status.session_type),
         "start": status.start.isoformat() if status.start else None,
         "end": status.end.isoformat() if status.end else None,
         "notified": status.notified,
         "duration_seconds": status.duration_seconds,
         "notes": status.notes,
+        "id": status.session_id,
     }
 
-    with open(get_status_path(), "w") as f:
-        json.dump(data, f)
+
+def status_from_dict(data: dict) -> Status:
+    """Deserialize a status from a dict produced by status_to_dict."""
+    start = None
+    if data.get("start"):
+        start = datetime.fromisoformat(data["start"])
+
+    end = None
+    if data.get("end"):
+        end = datetime.fromisoformat(data["end"])
+
+    return Status(
+        session_type=SessionType(data.get("type", 1)),
+        start=start,
+        end=end,
+        notified=data.get("notified", False),
+        duration_seconds=data.get("duration_seconds", 0),
+        notes=data.get("notes"),
+        session_id=data.get("id"),
+    )
+
+
+def get_compact_status_path() -> Path:
+    """Get the path of the compact binary status record."""
+    return get_config_dir() / "status.bin"
+
+
+# Fixed-layout record mirroring status.json for renderers (little-endian):
+#   magic, version, session type, flags (bit 0: notified), padding,
+#   start and end as epoch microseconds (-1 if unset), planned duration,
+#   session id (ASCII, NUL padded), device, inode, mtime (ns) and size of the
+#   status.json it mirrors, notes offset and length (UTF-8)
+COMPACT_MAGIC = b"POMO"
+COMPACT_VERSION = 2
+COMPACT_HEADER = struct.Struct("<4sBBBxqqi36sQQqQII")
+# Bytes read_compact_status reads; longer notes are read from status.json
+COMPACT_READ_SIZE = 4096
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _source_key(st: os.stat_result) -> tuple:
+    """Get the identity, mtime and size of status.json recorded in status.bin."""
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def pack_compact_status(status: Status, source: tuple) -> bytes:
+    """
+    Encode a status as a compact binary record.
+
+    Args:
+        status: The status to encode
+        source: _source_key of the status.json written for the same status
+    """
+    notes = status.notes.encode() if status.notes else b""
+    header = COMPACT_HEADER.pack(
+        COMPACT_MAGIC,
+        COMPACT_VERSION,
+        int(status.session_type),
+        1 if status.notified else 0,
+        (status.start - _EPOCH) // _MICROSECOND if status.start else -1,
+        (status.end - _EPOCH) // _MICROSECOND if status.end else -1,
+        status.duration_seconds,
+        (status.session_id or "").encode("ascii"),
+        *source,
+        COMPACT_HEADER.size,
+        len(notes),
+    )
+    return header + notes
+
+
+def unpack_compact_status(buf, source: tuple) -> Optional[Status]:
+    """
+    Decode a compact binary record.
+
+    Args:
+        buf: The record
+        source: _source_key of the current status.json
+
+    Returns:
+        The decoded status, or None if the record is invalid or was written
+        for a different status.json
+    """
+    if len(buf) < COMPACT_HEADER.size:
+        return None
+
+    (
+        magic,
+        version,
+        session_type,
+        flags,
+        start,
+        end,
+        duration_seconds,
+        session_id,
+        *record_source,
+        notes_offset,
+        notes_length,
+    ) = COMPACT_HEADER.unpack_from(buf)
+    if magic != COMPACT_MAGIC or version != COMPACT_VERSION:
+        return None
+    # status.json replaced by an older pomo, another tool or a hand edit
+    if tuple(record_source) != source:
+        return None
+
+    # Truncated by a short read; the caller falls back to status.json
+    if notes_offset + notes_length > len(buf):
+        return None
+
+    notes = None
+    if notes_length:
+        notes = bytes(buf[notes_offset : notes_offset + notes_length]).decode()
+
+    return Status(
+        session_type=SessionType(session_type),
+        start=_EPOCH + timedelta(microseconds=start) if start >= 0 else None,
+        end=_EPOCH + timedelta(microseconds=end) if end >= 0 else None,
+        notified=bool(flags & 1),
+        duration_seconds=duration_seconds,
+        notes=notes,
+        session_id=session_id.rstrip(b"\0").decode("ascii") or None,
+    )
+
+
+def read_compact_status(use_mmap: bool = False) -> Optional[Status]:
+    """
+    Read the compact status record.
+
+    The record is only trusted while status.json is the file it was written
+    with, which costs a stat() of status.json.
+
+    Args:
+        use_mmap: Map the record instead of reading it; for a record of about a
+            hundred bytes, setting up the mapping costs more than one read()
+
+    Returns:
+        The decoded status, or None if there is no valid, current record
+    """
+    # Plain strings: each Path join costs a few microseconds per render
+    config_dir = str(get_config_dir())
+    try:
+        source = _source_key(os.stat(os.path.join(config_dir, "status.json")))
+        fd = os.open(os.path.join(config_dir, "status.bin"), os.O_RDONLY)
+    except OSError:
+        return None
+
+    # Raw fd: no io.BufferedReader around a single small read
+    try:
+        if use_mmap:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as buf:
+                return unpack_compact_status(buf, source)
+        return unpack_compact_status(os.read(fd, COMPACT_READ_SIZE), source)
+    except (OSError, ValueError):
+        return None
+    finally:
+        os.close(fd)
+
+
+def read_status_fast() -> Status:
+    """Read the status for rendering, preferring a current compact record."""
+    status = read_compact_status()
+    if status is None:
+        return read_status()
+    return status
+
+
+def get_lock_path() -> Path:
+    """Get the path of the lock guarding status transitions."""
+    return get_config_dir() / "status.lock"
+
+
+# fsync policies for write_status:
+#   never - rely on the atomic rename only (default)
+#   file  - fsync the new file before renaming it into place
+#   full  - also fsync the directory so the rename itself survives a crash
+FSYNC_POLICIES = ("never", "file", "full")
+
+# Last decoded status, keyed by the identity, mtime and size of status.json
+_status_cache: Optional[tuple[tuple, Status]] = None
+
+
+def _stat_key(path: Path) -> Optional[tuple]:
+    """Get a key that changes whenever the file is replaced or modified."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (str(path), st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def claim_completion(status: Status) -> bool:
+    """
+    Atomically claim the completion of a finished session.
+
+    Several renderers can see the same session run out at once. Only the one
+    that wins the claim should notify and sync; the status is marked as
+    notified under the lock before any of that work starts.
+
+    Returns:
+        True if this process won the claim, False if another process already
+        handled the session or a different session has started since
+    """
+    with locked(get_lock_path()):
+        current = read_status()
+        if (
+            current.notified
+            or current.start != status.start
+            or current.session_id != status.session_id
+        ):
+            return False
+
+        current.notified = True
+        _write_status(current)
+
+    status.notified = True
+    return True
+
+
+def _replace_file(path: Path, data: bytes, fsync: str) -> None:
+    """Write data to a temporary file and rename it over path."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        if fsync != "never":
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _write_status(status: Status, fsync: Optional[str] = None) -> None:
+    """Atomically replace status.json and status.bin; the caller must hold the status lock."""
+    global _status_cache
+
+    fsync = fsync or os.environ.get("POMO_FSYNC", "never")
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"Invalid fsync policy: {fsync}")
+
+    status_path = get_status_path()
+    compact_path = get_compact_status_path()
+
+    _replace_file(status_path, json.dumps(status_to_dict(status)).encode(), fsync)
+    source = _source_key(os.stat(status_path))
+    _replace_file(compact_path, pack_compact_status(status, source), fsync)
+
+    if fsync == "full":
+        dir_fd = os.open(status_path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    _status_cache = (_stat_key(status_path), replace(status))
+
+
+def write_status(status: Status, fsync: Optional[str] = None) -> None:
+    """
+    Write status to file.
+
+    status.json and the compact status.bin are each written to a temporary
+    name and renamed into place, so readers never see a partially written
+    status. status.bin records which status.json it mirrors, so a reader
+    between the two renames falls back to status.json.
+
+    Args:
+        status: The status to store
+        fsync: One of FSYNC_POLICIES; defaults to $POMO_FSYNC or "never"
+    """
+    config_dir = get_config_dir()
+    config_dir.mkdir(parents=True, exist_ok=True)
+
+    with locked(get_lock_path()):
+        _write_status(status, fsync)
 
 
 def read_status() -> Status:
-    """Read status from file."""
+    """
+    Read status from file.
+
+    The decoded status is cached and reused as long as the file's inode, mtime
+    and size are unchanged, so long-lived processes only pay for a stat().
+    """
+    global _status_cache
+
     status_path = get_status_path()
+    key = _stat_key(status_path)
 
-    if not status_path.exists():
+    if key is None:
         return Status()
 
+    if _status_cache is not None and _status_cache[0] == key:
+        return replace(_status_cache[1])
+
     try:
         with open(status_path) as f:
             data = json.load(f)
 
-        start = None
-        if data.get("start"):
-            start = datetime.fromisoformat(data["start"])
-
-        end = None
-        if data.get("end"):
-            end = datetime.fromisoformat(data["end"])
-
-        return Status(
-            session_type=SessionType(data.get("type", 1)),
-            start=start,
-            end=end,
-            notified=data.get("notified", False),
-            duration_seconds=data.get("duration_seconds", 0),
-            notes=data.get("notes"),
-        )
+        status = status_from_dict(data)
     except (json.JSONDecodeError, KeyError, ValueError):
         return Status()
+
+    _status_cache = (key, replace(status))
+    return status
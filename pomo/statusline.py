@@ -0,0 +1,106 @@
+"""Fast statusline rendering for pomo.
+
+This module only depends on the stdlib-backed core modules (config, status,
+timer) so that a tmux refresh does not pay for importing typer or psycopg.
+Heavy modules are imported lazily, and only when a finished session has to be
+handled.
+"""
+
+import sys
+import time
+
+# First, so that POMO_PROFILE=imports can time the imports below
+from pomo.profile import enable, phase
+
+from pomo import metrics
+from pomo.client import request
+from pomo.config import Config, get_config
+from pomo.status import Status, claim_completion, read_status_fast
+from pomo.timer import format_duration, get_emoji, get_remaining
+
+
+def render(config: Config, status: Status, remaining: int) -> str:
+    """Render the statusline text for an active session."""
+    emoji = get_emoji(config, status, remaining)
+    return f"{emoji} {format_duration(remaining)}"
+
+
+def needs_completion(status: Status, remaining: int) -> bool:
+    """Check if a finished session still has to be notified and synced."""
+    return remaining <= 0 and not status.notified and status.start is not None
+
+
+def complete_session(config: Config, status: Status) -> None:
+    """Record a finished session, then send the notification."""
+    from pomo.notify import dispatch_notification
+    from pomo.storage import record_session
+
+    # First, since the session was claimed and is never completed again.
+    # Only local writes here; a detached flusher talks to the database
+    with phase("record_session"):
+        record_session(status, ended_at=status.end, completed=True)
+
+    # Fire-and-forget desktop notification; a failure must not escape into
+    # the statusline
+    if config.notifications.enabled:
+        with phase("notify"):
+            try:
+                dispatch_notification(status, config.notifications)
+            except Exception:
+                pass
+
+
+def handle_completion(config: Config, status: Status) -> None:
+    """Claim a finished session, then notify and sync it if the claim won."""
+    if claim_completion(status):
+        complete_session(config, status)
+
+
+def main() -> None:
+    """Print the remaining time of the active session (``pomo-status``)."""
+    start = time.perf_counter()
+
+    # Let a running pomod render (and complete) the session for us
+    with phase("daemon.request"):
+        response = request({"cmd": "render"})
+    if response is not None:
+        if response["text"]:
+            print(response["text"], flush=True)
+        metrics.observe("pomo_render_duration_seconds", time.perf_counter() - start, path="daemon")
+        return
+
+    with phase("read_status"):
+        current_status = read_status_fast()
+
+    # No active session
+    if current_status.end is None:
+        return
+
+    with phase("get_config"):
+        config = get_config()
+    remaining = get_remaining(current_status)
+
+    # Clean output only - just emoji + time for tmux
+    with phase("render"):
+        print(render(config, current_status, remaining), flush=True)
+    metrics.observe("pomo_render_duration_seconds", time.perf_counter() - start, path="direct")
+
+    # Silent auto-sync when timer completes
+    if needs_completion(current_status, remaining):
+        with phase("completion"):
+            handle_completion(config, current_status)
+
+
+def cli() -> None:
+    """Entry point for ``pomo``: fast path for a bare call, full CLI otherwise."""
+    if len(sys.argv) <= 1:
+        main()
+        return
+
+    if "--profile" in sys.argv[1:]:
+        enable()
+    with phase("import pomo.main"):
+        from pomo.main import app
+
+    with phase("command", argv=sys.argv[1:]):
+        app()
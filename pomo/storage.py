@@ -0,0 +1,333 @@
+"""Session storage backends.
+
+A backend is a module with the functions of pomo.db: ``init_db()``,
+``get_sessions(limit)``, ``list_sessions(emit, limit, ...)``,
+``get_stats(period, since, until)``,
+``export_sessions(write_batch, since, until)``, ``import_sessions(sessions)``
+and ``sync_sessions(sessions)``. Two exist:
+
+- ``sqlite``: the local store in pomo.local_db
+- ``postgres``: the database at ``POMO_DATABASE_URL`` in pomo.db, written
+  through the outbox
+
+``POMO_STORAGE`` picks which ones are used. The default, ``auto``, is
+``postgres`` when a database URL is set and ``sqlite`` otherwise. ``mirror``
+is opt-in: it writes every session to both, synchronously to SQLite and
+through the outbox to Postgres. Reads go to Postgres, with its replica routing
+and queries, and the local copy answers when Postgres is unreachable or has
+none of the requested sessions yet. ``pomo init`` backfills the local copy
+from Postgres, so turning on mirroring keeps the full history.
+
+Reads go through the query cache in pomo.cache, which uses each backend's
+``get_last_created()`` probe to tell whether a cached result is still valid.
+"""
+
+import os
+import sys
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from pomo.status import Status
+
+STORAGE_MODES = ("auto", "sqlite", "postgres", "mirror")
+
+STATS_PERIODS = ("day", "week", "month")
+
+# Milliseconds record_session waits for the SQLite lock before it queues the
+# session instead; it runs on the statusline
+RECORD_BUSY_TIMEOUT = 100
+
+# Largest list page kept in the query cache; a session is a few hundred bytes
+# as JSON, so bigger pages would not fit in cache.MAX_CACHE_BYTES anyway
+LIST_CACHE_MAX_ROWS = 2000
+
+
+_warned_mode: Optional[str] = None
+
+
+def get_storage_mode() -> str:
+    """
+    Get the storage mode from POMO_STORAGE.
+
+    An unknown mode is treated as "auto", with a warning on stderr, because
+    this runs after a finished session was claimed and must not lose it.
+
+    Returns:
+        One of "sqlite", "postgres" or "mirror", with "auto" resolved
+    """
+    global _warned_mode
+
+    mode = os.getenv("POMO_STORAGE", "auto").lower()
+    if mode not in STORAGE_MODES:
+        if _warned_mode != mode:
+            print(
+                f"pomo: unknown POMO_STORAGE '{mode}', using auto "
+                f"(expected one of {', '.join(STORAGE_MODES)})",
+                file=sys.stderr,
+            )
+            _warned_mode = mode
+        mode = "auto"
+    if mode == "auto":
+        return "postgres" if os.getenv("POMO_DATABASE_URL") else "sqlite"
+    return mode
+
+
+def uses_local() -> bool:
+    """Check if sessions are kept in the local SQLite store."""
+    return get_storage_mode() in ("sqlite", "mirror")
+
+
+def uses_remote() -> bool:
+    """Check if sessions are sent to Postgres."""
+    return get_storage_mode() in ("postgres", "mirror") and bool(
+        os.getenv("POMO_DATABASE_URL")
+    )
+
+
+def get_backend(name: str):
+    """
+    Get a backend module by name.
+
+    Args:
+        name: "sqlite" or "postgres"
+    """
+    if name == "sqlite":
+        from pomo import local_db
+
+        return local_db
+    if name == "postgres":
+        from pomo import db
+
+        return db
+    raise ValueError("backend must be sqlite or postgres")
+
+
+def get_write_backends() -> dict:
+    """Get the backends that are written directly, by name."""
+    backends = {}
+    if uses_remote():
+        backends["postgres"] = get_backend("postgres")
+    if uses_local():
+        backends["sqlite"] = get_backend("sqlite")
+    return backends
+
+
+def get_read_backend():
+    """Get the backend that serves reads: Postgres when in use, else SQLite."""
+    mode = get_storage_mode()
+    if mode == "postgres" or (mode == "mirror" and uses_remote()):
+        return get_backend("postgres")
+    return get_backend("sqlite")
+
+
+def _read_backends() -> list:
+    """Get the backends to read from, in order; mirrors fall back to SQLite."""
+    backend = get_read_backend()
+    if get_storage_mode() == "mirror" and backend.__name__ == "pomo.db":
+        return [backend, get_backend("sqlite")]
+    return [backend]
+
+
+def record_session(
+    status: Status,
+    ended_at: Optional[datetime],
+    completed: bool,
+) -> bool:
+    """
+    Record a finished or stopped session in every configured backend.
+
+    The SQLite write happens right away, waiting at most
+    RECORD_BUSY_TIMEOUT for another writer; if it fails the session is queued
+    for the background flusher. Postgres is only queued in the outbox, so
+    this never waits on the network.
+
+    Returns:
+        True if the session was stored or queued somewhere
+    """
+    from pomo import metrics
+    from pomo.outbox import queue_local, queue_session, session_record, to_session
+
+    name = "pomo_sessions_completed" if completed else "pomo_sessions_stopped"
+    metrics.inc(name, type=status.session_type.name.lower())
+
+    recorded = False
+    if uses_local():
+        from pomo import local_db
+
+        record = session_record(status, ended_at, completed)
+        results = local_db.sync_sessions(
+            [to_session(record)], busy_timeout=RECORD_BUSY_TIMEOUT
+        )
+        if results == [None]:
+            queue_local(record)
+        recorded = results != [False]
+    if uses_remote():
+        recorded = queue_session(status, ended_at, completed) or recorded
+    return recorded
+
+
+def init_storage() -> bool:
+    """
+    Create the tables of every configured backend.
+
+    In mirror mode, sessions already in Postgres are copied to SQLite too.
+    """
+    ok = True
+    if uses_local():
+        from pomo import local_db
+
+        ok = local_db.init_db() and ok
+    if get_storage_mode() in ("postgres", "mirror"):
+        from pomo import db
+
+        ok = db.init_db() and ok
+    if ok and get_storage_mode() == "mirror" and uses_remote():
+        ok = backfill_local() >= 0
+    return ok
+
+
+def backfill_local() -> int:
+    """
+    Copy the Postgres history into the local SQLite store.
+
+    Sessions that are already stored locally are skipped, so this is safe to
+    run again.
+
+    Returns:
+        Number of sessions copied, or -1 if either store is unavailable
+    """
+    from pomo import db, local_db
+
+    copied = 0
+    failed = False
+
+    def write_batch(rows: list[tuple]) -> None:
+        nonlocal copied, failed
+        sessions = [
+            {
+                "id": row[0],
+                "session_type": row[1],
+                "started_at": row[2],
+                "ended_at": row[3],
+                "planned_seconds": row[4],
+                "completed": row[6],
+                "notes": row[7],
+            }
+            for row in rows
+        ]
+        inserted = local_db.import_sessions(sessions)
+        if inserted < 0:
+            failed = True
+        else:
+            copied += inserted
+
+    if db.export_sessions(write_batch) < 0 or failed:
+        return -1
+    return copied
+
+
+def _cache_parts(backend, query: str, *params) -> list:
+    """Build the cache key of a read query."""
+    parts = [query, backend.__name__]
+    if backend.__name__ == "pomo.db":
+        parts.append(os.getenv("POMO_DATABASE_URL"))
+    return parts + list(params)
+
+
+def get_sessions(limit: int = 10) -> list[dict]:
+    """Fetch recent sessions from the read backend."""
+    from pomo import cache
+
+    sessions = []
+    for backend in _read_backends():
+        sessions = cache.cached(
+            _cache_parts(backend, "sessions", limit),
+            backend.get_last_created,
+            lambda: backend.get_sessions(limit),
+        )
+        if sessions:
+            break
+    return sessions
+
+
+def _list_from(backend, emit: Callable[[dict], None], limit: int, filters: dict) -> int:
+    from pomo import cache
+
+    # Stream big pages straight through rather than buffering them for an
+    # entry the cache would evict right away
+    if limit > LIST_CACHE_MAX_ROWS:
+        return backend.list_sessions(emit, limit, **filters)
+
+    streamed: list[dict] = []
+
+    def fetch() -> Optional[list[dict]]:
+        def collect(session: dict) -> None:
+            streamed.append(session)
+            emit(session)
+
+        if backend.list_sessions(collect, limit, **filters) < 0:
+            return None
+        return streamed
+
+    sessions = cache.cached(
+        _cache_parts(backend, "list", limit, filters), backend.get_last_created, fetch
+    )
+    if sessions is None:
+        return -1
+    if sessions is not streamed:
+        for session in sessions:
+            emit(session)
+    return len(sessions)
+
+
+def list_sessions(emit: Callable[[dict], None], limit: int = 10, **filters) -> int:
+    """
+    Stream a page of sessions from the read backend.
+
+    Args:
+        emit: Called with each session as it is fetched
+        limit: Maximum number of sessions
+        filters: before, after, session_type, completed, since and until; see
+            pomo.queries.list_query
+
+    Returns:
+        Number of sessions emitted, or -1 if the backend is unavailable
+    """
+    shown = -1
+    for backend in _read_backends():
+        emitted = 0
+
+        def counted(session: dict) -> None:
+            nonlocal emitted
+            emitted += 1
+            emit(session)
+
+        total = _list_from(backend, counted, limit, filters)
+        shown = max(shown, total)
+        # Only fall back if nothing was shown yet, so no session repeats
+        if emitted:
+            break
+    return shown
+
+
+def get_stats(period: str, since: date, until: date) -> list[dict]:
+    """
+    Aggregate sessions per period and session type from the read backend.
+
+    Raises:
+        ValueError: If period is not one of STATS_PERIODS
+    """
+    if period not in STATS_PERIODS:
+        raise ValueError(f"period must be one of {', '.join(STATS_PERIODS)}")
+    from pomo import cache
+
+    rows = []
+    for backend in _read_backends():
+        rows = cache.cached(
+            _cache_parts(backend, "stats", period, since, until),
+            backend.get_last_created,
+            lambda: backend.get_stats(period, since, until),
+        )
+        if rows:
+            break
+    return rows
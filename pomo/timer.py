@@ -1,6 +1,7 @@
 """Timer utilities for pomo."""
 
 from datetime import datetime, timezone
+from typing import Optional
 
 from pomo.config import Config
 from pomo.status import Status, SessionType
@@ -16,6 +17,28 @@ def get_remaining(status: Status) -> int:
     return int(remaining)
 
 
+def seconds_until_change(status: Status, now: Optional[datetime] = None) -> float:
+    """
+    Get the time until the rendered status next changes.
+
+    format_duration shows minutes above an hour and seconds below it, and the
+    warning emoji blinks every second once time is up, so the display only
+    needs to be refreshed at those boundaries.
+    """
+    if status.end is None:
+        return float("inf")
+
+    now = now or datetime.now(timezone.utc)
+    exact = (status.end - now).total_seconds()
+    remaining = int(exact)
+
+    if exact <= 0:
+        return exact - (remaining - 1)
+    if remaining >= 3600:
+        return exact - (remaining - remaining % 60)
+    return exact - remaining
+
+
 def format_duration(seconds: int) -> str:
     """Format seconds as a human-readable duration."""
     negative = seconds < 0
@@ -0,0 +1,251 @@
+"""Change-driven status streaming for pomo.
+
+``pomo watch`` stays resident and prints a new line only when the rendered
+status changes. Between changes it sleeps until the next display boundary, and
+wakes up early when ``status.json`` is replaced. File changes are detected with
+inotify on Linux, and by polling stat() elsewhere.
+
+Resident processes (``pomo watch`` and ``pomod``) also run a ConfigWatcher,
+which reloads ``config.json`` when it changes.
+"""
+
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from pomo.config import Config, get_config, get_config_dir, reload_config
+from pomo.status import read_status
+from pomo.statusline import handle_completion, needs_completion, render
+from pomo.timer import get_remaining, seconds_until_change
+
+# Wake up slightly after a display boundary so the new value is visible
+EPSILON = 0.01
+
+# Upper bound for a single sleep, which also covers suspend and clock changes
+MAX_WAIT = 60.0
+
+# inotify(7) constants
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Quiet time after a config change before reloading, so that an editor's
+# save (truncate, write, rename) is reloaded once and complete
+CONFIG_DEBOUNCE = 0.2
+
+# Longest a stream of changes can hold off a reload
+CONFIG_DEBOUNCE_MAX = 2.0
+
+# How often the config watcher checks whether it should stop
+STOP_CHECK_INTERVAL = 0.5
+
+
+def _load_inotify():
+    """Load libc's inotify functions, or return None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+
+    import ctypes
+    import ctypes.util
+
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return None
+    try:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """Wait for changes to a set of files in one directory."""
+
+    def __init__(self, directory: Path, names: set[str], poll_interval: float = 1.0) -> None:
+        self.directory = directory
+        self.names = names
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._stat_keys = self._stat_all()
+
+        directory.mkdir(parents=True, exist_ok=True)
+        libc = _load_inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                if libc.inotify_add_watch(fd, os.fsencode(directory), mask) >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are detected with inotify rather than polling."""
+        return self._fd is not None
+
+    def _stat_all(self) -> dict[str, Optional[tuple]]:
+        keys = {}
+        for name in self.names:
+            try:
+                st = os.stat(self.directory / name)
+                keys[name] = (st.st_ino, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                keys[name] = None
+        return keys
+
+    def _read_events(self) -> bool:
+        """Drain pending inotify events and check if a watched file changed."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if name in self.names:
+                    changed = True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a watched file changes or the timeout expires.
+
+        Returns:
+            True if a watched file changed, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            left = None if deadline is None else max(deadline - time.monotonic(), 0)
+
+            if self._fd is not None:
+                readable, _, _ = select.select([self._fd], [], [], left)
+                if readable and self._read_events():
+                    return True
+            else:
+                step = self.poll_interval if left is None else min(left, self.poll_interval)
+                time.sleep(step)
+                keys = self._stat_all()
+                if keys != self._stat_keys:
+                    self._stat_keys = keys
+                    return True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self) -> None:
+        """Release the inotify descriptor."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ConfigWatcher:
+    """
+    Reload the config in a background thread whenever config.json changes.
+
+    Reloads go through reload_config, which swaps the new Config in for
+    get_config() and keeps the last good one if the file is invalid.
+    """
+
+    def __init__(
+        self,
+        on_reload: Optional[Callable[[Config], None]] = None,
+        debounce: float = CONFIG_DEBOUNCE,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.on_reload = on_reload
+        self.debounce = debounce
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._files = FileWatcher(get_config_dir(), {"config.json"}, poll_interval)
+        self._thread = threading.Thread(target=self._run, name="pomo-config", daemon=True)
+
+    def start(self) -> "ConfigWatcher":
+        """Start watching; returns self."""
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                if not self._files.wait(STOP_CHECK_INTERVAL):
+                    continue
+                # Wait until the file has been quiet for the debounce time
+                deadline = time.monotonic() + CONFIG_DEBOUNCE_MAX
+                while time.monotonic() < deadline and self._files.wait(self.debounce):
+                    pass
+                if self._stop.is_set():
+                    break
+                if reload_config():
+                    self.reloads += 1
+                    if self.on_reload is not None:
+                        self.on_reload(get_config())
+        finally:
+            self._files.close()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the thread to finish."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def watch_status(
+    emit: Callable[[str], None],
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Emit the rendered status every time it changes.
+
+    An empty line is emitted when no session is active, so that bars clear
+    their text.
+
+    Args:
+        emit: Called with each new line of output
+        stop: Optional event that ends the loop at the next wake-up
+    """
+    watcher = FileWatcher(get_config_dir(), {"status.json"})
+    config_watcher = ConfigWatcher().start()
+    last = None
+
+    try:
+        while stop is None or not stop.is_set():
+            config = get_config()
+            status = read_status()
+
+            if status.end is None:
+                text = ""
+                timeout = MAX_WAIT
+            else:
+                remaining = get_remaining(status)
+                text = render(config, status, remaining)
+                if needs_completion(status, remaining):
+                    handle_completion(config, status)
+                timeout = min(seconds_until_change(status) + EPSILON, MAX_WAIT)
+
+            if text != last:
+                emit(text)
+                last = text
+
+            watcher.wait(timeout)
+    finally:
+        config_watcher.stop()
+        watcher.close()
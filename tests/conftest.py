@@ -0,0 +1,13 @@
+"""Shared fixtures for pomo tests."""
+
+import pytest
+
+import pomo.config
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Point pomo at an empty, isolated configuration directory."""
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    monkeypatch.setattr(pomo.config, "_config", None)
+    return tmp_path / "pomo"
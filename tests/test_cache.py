@@ -0,0 +1,205 @@
+"""Tests for the on-disk query cache."""
+
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from typer.testing import CliRunner
+
+from pomo import cache, local_db, storage
+from pomo.main import app
+
+runner = CliRunner()
+
+
+class Backend:
+    """A fake backend counting probes and queries."""
+
+    def __init__(self):
+        self.marker = "2026-01-01T09:00:00+00:00"
+        self.probes = 0
+        self.queries = 0
+
+    def probe(self):
+        self.probes += 1
+        return self.marker
+
+    def query(self):
+        self.queries += 1
+        return [{"started_at": datetime(2026, 1, 1, tzinfo=timezone.utc), "n": self.queries}]
+
+
+def age_entries(seconds: float) -> None:
+    for path in cache.entries():
+        entry = json.loads(path.read_text())
+        entry["stored"] -= seconds
+        path.write_text(json.dumps(entry))
+
+
+@pytest.fixture
+def backend(config_dir):
+    return Backend()
+
+
+class TestCached:
+    """Test lookups, revalidation and invalidation."""
+
+    def test_fresh_hit_skips_database(self, backend):
+        """A fresh entry should be served without probing."""
+        first = cache.cached(["q"], backend.probe, backend.query)
+        second = cache.cached(["q"], backend.probe, backend.query)
+
+        assert second == first
+        assert isinstance(second[0]["started_at"], datetime)
+        assert backend.queries == 1
+        assert backend.probes == 1
+        assert cache.read_stats()["hits"] == 1
+
+    def test_stale_entry_is_revalidated(self, backend):
+        """An expired entry should be served again if the probe is unchanged."""
+        cache.cached(["q"], backend.probe, backend.query)
+        age_entries(cache.DEFAULT_TTL + 1)
+
+        assert cache.cached(["q"], backend.probe, backend.query)[0]["n"] == 1
+        assert backend.probes == 2
+        assert cache.read_stats()["revalidated"] == 1
+
+    def test_new_rows_are_fetched(self, backend):
+        """An expired entry should be recomputed after new rows arrived."""
+        cache.cached(["q"], backend.probe, backend.query)
+        age_entries(cache.DEFAULT_TTL + 1)
+        backend.marker = "2026-01-02T09:00:00+00:00"
+
+        assert cache.cached(["q"], backend.probe, backend.query)[0]["n"] == 2
+
+    def test_writes_invalidate(self, backend):
+        """A write should make even fresh entries miss."""
+        cache.cached(["q"], backend.probe, backend.query)
+        cache.invalidate()
+
+        assert cache.cached(["q"], backend.probe, backend.query)[0]["n"] == 2
+        assert cache.read_stats()["invalidations"] == 1
+
+    def test_write_during_query_is_not_cached(self, backend):
+        """A result computed across a write should not be stored."""
+        cache.cached(["warm"], backend.probe, backend.query)
+
+        def query():
+            cache.invalidate()
+            return backend.query()
+
+        cache.cached(["q"], backend.probe, query)
+        cache.cached(["q"], backend.probe, backend.query)
+        assert backend.queries == 3
+
+    def test_unavailable_backend_is_not_cached(self, backend):
+        """Without a probe result nothing should be stored."""
+        cache.cached(["q"], lambda: None, backend.query)
+        assert cache.entries() == []
+
+    def test_disabled(self, backend, monkeypatch):
+        """POMO_CACHE_TTL=0 should bypass the cache."""
+        monkeypatch.setenv("POMO_CACHE_TTL", "0")
+        cache.cached(["q"], backend.probe, backend.query)
+        cache.cached(["q"], backend.probe, backend.query)
+        assert backend.queries == 2
+        assert backend.probes == 0
+
+    def test_lru_eviction(self, backend, monkeypatch):
+        """The least recently used entries should go first."""
+        cache.cached(["a"], backend.probe, backend.query)
+        size = cache.entries()[0].stat().st_size
+        monkeypatch.setattr(cache, "MAX_CACHE_BYTES", size * 5 // 2)
+        cache.cached(["b"], backend.probe, backend.query)
+        for path in cache.entries():
+            os.utime(path, (1, 1))  # Both long unused
+        cache.cached(["a"], backend.probe, backend.query)
+        cache.cached(["c"], backend.probe, backend.query)
+
+        assert len(cache.entries()) == 2
+        assert cache.read_stats()["evictions"] == 1
+        cache.cached(["a"], backend.probe, backend.query)
+        assert cache.read_stats()["hits"] == 2
+
+    def test_key_covers_parameters(self):
+        """Different parameters should be different entries."""
+        assert cache.cache_key(["stats", date(2026, 1, 1)]) != cache.cache_key(
+            ["stats", date(2026, 1, 2)]
+        )
+
+
+class TestStorageCache:
+    """Test caching of reads through pomo.storage."""
+
+    @pytest.fixture(autouse=True)
+    def sessions(self, config_dir, monkeypatch):
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        base = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+        local_db.sync_sessions(
+            [
+                {
+                    "session_type": "focus",
+                    "started_at": base + timedelta(hours=i),
+                    "ended_at": base + timedelta(hours=i, minutes=25),
+                    "planned_seconds": 25 * 60,
+                    "completed": True,
+                    "notes": f"session {i}",
+                }
+                for i in range(3)
+            ]
+        )
+
+    def test_list_is_served_from_cache(self):
+        """A repeated list should be a cache hit with the same rows."""
+        first, second = [], []
+        assert storage.list_sessions(first.append, limit=5) == 3
+        assert storage.list_sessions(second.append, limit=5) == 3
+
+        assert second == first
+        assert cache.read_stats()["hits"] == 1
+
+    def test_large_list_is_not_cached(self, monkeypatch):
+        """A page over the row budget should stream through uncached."""
+        monkeypatch.setattr(storage, "LIST_CACHE_MAX_ROWS", 2)
+
+        def no_cache(parts, probe, compute):
+            raise AssertionError("large page went through the cache")
+
+        monkeypatch.setattr(cache, "cached", no_cache)
+        seen = []
+        assert storage.list_sessions(seen.append, limit=5) == 3
+
+        assert len(seen) == 3
+        assert not list(cache.entries())
+
+    def test_local_write_invalidates(self):
+        """A recorded session should show up in the next list."""
+        storage.list_sessions(lambda s: None, limit=5)
+        local_db.sync_sessions(
+            [
+                {
+                    "session_type": "deep",
+                    "started_at": datetime(2026, 1, 2, tzinfo=timezone.utc),
+                    "ended_at": None,
+                    "planned_seconds": 90 * 60,
+                    "completed": False,
+                }
+            ]
+        )
+        seen = []
+        assert storage.list_sessions(seen.append, limit=5) == 4
+        assert seen[0]["session_type"] == "deep"
+
+    def test_cache_command(self):
+        """pomo cache should show the counters."""
+        storage.list_sessions(lambda s: None, limit=5)
+        storage.list_sessions(lambda s: None, limit=5)
+
+        result = runner.invoke(app, ["cache"])
+        assert result.exit_code == 0
+        assert "Entries: 1" in result.stdout
+        assert "1 misses (50% hit rate)" in result.stdout
+
+        result = runner.invoke(app, ["cache", "--clear"])
+        assert "Removed 1 cached results" in result.stdout
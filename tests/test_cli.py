@@ -135,6 +135,17 @@ class TestStatus:
         status = Status(duration_seconds=60, notes="Working on blog post")
         assert status.notes == "Working on blog post"
 
+    def test_new_status_gets_session_id(self):
+        """A new session should mint its own id."""
+        first = Status(duration_seconds=60)
+        second = Status(duration_seconds=60)
+        assert first.session_id is not None
+        assert first.session_id != second.session_id
+
+    def test_idle_status_has_no_session_id(self):
+        """An idle status should not have an id."""
+        assert Status().session_id is None
+
     def test_session_types(self):
         """Session types should be correct values."""
         assert SessionType.BREAK == 0
@@ -0,0 +1,170 @@
+"""Tests for configuration loading."""
+
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import pomo.config
+from pomo.config import (
+    ConfigError,
+    get_config,
+    get_snapshot_path,
+    load_config,
+    parse_config,
+    parse_duration_config,
+)
+from pomo.main import app
+
+runner = CliRunner()
+
+
+def write_config(config_dir, data) -> None:
+    config_dir.mkdir(parents=True, exist_ok=True)
+    text = data if isinstance(data, str) else json.dumps(data)
+    config_dir.joinpath("config.json").write_text(text)
+
+
+class TestParseDuration:
+    """Test duration settings."""
+
+    @pytest.mark.parametrize(
+        "value, seconds",
+        [(1500, 1500), ("25m", 1500), ("1h30m", 5400), ("1h 30m", 5400), ("90", 5400), ("45s", 45)],
+    )
+    def test_valid(self, value, seconds):
+        """Seconds, minutes and h/m/s strings should resolve to seconds."""
+        assert parse_duration_config(value) == seconds
+
+    @pytest.mark.parametrize("value", ["25x", "m", "", 0, -5, True, 2.5, "25m and more"])
+    def test_invalid(self, value):
+        """Anything else should be rejected instead of becoming 25 minutes."""
+        with pytest.raises(ValueError):
+            parse_duration_config(value)
+
+
+class TestParseConfig:
+    """Test validation of config.json data."""
+
+    def test_resolves_settings(self):
+        """Every section should end up in the Config."""
+        config = parse_config(
+            {
+                "durations": {"focus": "50m", "break": 600},
+                "emojis": {"warn": ["!"]},
+                "notifications": {"backend": "webhook", "webhook": "http://127.0.0.1:1/"},
+                "sound": "bell",
+            }
+        )
+        assert config.durations.focus == 50 * 60
+        assert config.durations.break_ == 600
+        assert config.durations.deep == 90 * 60
+        assert config.emojis.warn == ["!"]
+        assert config.notifications.webhook == "http://127.0.0.1:1/"
+        assert config.sound == "bell"
+
+    def test_lists_every_problem(self):
+        """All invalid settings should be reported at once, by key."""
+        with pytest.raises(ConfigError) as info:
+            parse_config(
+                {
+                    "durations": {"focus": "soon"},
+                    "notifications": {"urgency": "loud", "enabled": "yes"},
+                }
+            )
+        problems = info.value.problems
+        assert len(problems) == 3
+        assert problems[0].startswith("durations.focus: invalid duration 'soon'")
+        assert any(p.startswith("notifications.urgency: expected one of") for p in problems)
+
+    def test_backend_needs_its_setting(self):
+        """The command backend should require a command."""
+        with pytest.raises(ConfigError, match="notifications.command: required"):
+            parse_config({"notifications": {"backend": "command"}})
+
+    def test_command_placeholders(self):
+        """Unknown placeholders and stray braces should be rejected up front."""
+        with pytest.raises(ConfigError, match="unknown placeholder"):
+            parse_config(
+                {
+                    "notifications": {
+                        "backend": "command",
+                        "command": ["sh", "-c", "echo '{\"title\": \"{title}\"}'"],
+                    }
+                }
+            )
+        with pytest.raises(ConfigError, match="unbalanced braces"):
+            parse_config({"notifications": {"backend": "command", "command": ["echo", "{"]}})
+
+        escaped = ["sh", "-c", "echo '{{\"title\": \"{title}\"}}'"]
+        config = parse_config({"notifications": {"backend": "command", "command": escaped}})
+        assert config.notifications.command == escaped
+
+    def test_unknown_keys_are_warnings(self):
+        """Unknown keys should not invalidate the config."""
+        warnings = []
+        config = parse_config({"durations": {"fcous": "50m"}, "theme": "dark"}, warnings)
+        assert config.durations.focus == 25 * 60
+        assert warnings == [
+            "durations.fcous: unknown setting, ignored",
+            "theme: unknown setting, ignored",
+        ]
+
+
+class TestSnapshot:
+    """Test the resolved config snapshot."""
+
+    def test_snapshot_skips_parsing(self, config_dir, monkeypatch):
+        """An unchanged config.json should be loaded from the snapshot."""
+        write_config(config_dir, {"durations": {"focus": "50m"}})
+        assert load_config().durations.focus == 50 * 60
+        assert get_snapshot_path().exists()
+
+        def fail(*args):
+            raise AssertionError("config.json parsed again")
+
+        monkeypatch.setattr(pomo.config, "read_config_file", fail)
+        assert load_config().durations.focus == 50 * 60
+
+    def test_change_invalidates(self, config_dir):
+        """An edited config.json should be parsed again."""
+        write_config(config_dir, {"durations": {"focus": "50m"}})
+        load_config()
+        write_config(config_dir, {"durations": {"focus": "45m", "deep": "2h"}})
+        assert load_config().durations.focus == 45 * 60
+
+    def test_invalid_config_uses_defaults(self, config_dir, capsys):
+        """get_config should fall back to the defaults and point at the check."""
+        write_config(config_dir, "{not json")
+
+        assert get_config().durations.focus == 25 * 60
+        assert "pomo config check" in capsys.readouterr().err
+        with pytest.raises(ConfigError, match="invalid JSON at line 1"):
+            load_config()
+
+    def test_no_config_file(self, config_dir):
+        """Without a config file the defaults should be used and nothing written."""
+        assert load_config() == pomo.config.Config()
+        assert not get_snapshot_path().exists()
+
+
+class TestConfigCheck:
+    """Test pomo config check."""
+
+    def test_valid(self, config_dir):
+        """A valid config should be summarized, with warnings for unknown keys."""
+        write_config(config_dir, {"durations": {"deep": "2h"}, "colour": "red"})
+
+        result = runner.invoke(app, ["config", "check"])
+        assert result.exit_code == 0
+        assert "is valid" in result.stdout
+        assert "deep 2h00m" in result.stdout
+        assert "Warning: colour: unknown setting, ignored" in result.stdout
+
+    def test_invalid(self, config_dir):
+        """An invalid config should list its problems and fail."""
+        write_config(config_dir, {"notifications": {"backend": "pigeon"}})
+
+        result = runner.invoke(app, ["config", "check"])
+        assert result.exit_code == 1
+        assert "notifications.backend: expected one of" in result.stderr
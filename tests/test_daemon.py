@@ -0,0 +1,90 @@
+"""Tests for the pomod daemon and its thin client."""
+
+import threading
+
+import pytest
+
+from pomo import notify
+from pomo.client import get_socket_path, load_status, request, save_status
+from pomo.daemon import create_server
+from pomo.status import SessionType, Status, read_status, write_status
+
+
+@pytest.fixture
+def daemon(config_dir, monkeypatch):
+    """Run a daemon on a socket inside the isolated config dir."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    server = create_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestProtocol:
+    """Test the request/response protocol."""
+
+    def test_ping(self, daemon):
+        """Ping should answer with the daemon pid."""
+        response = request({"cmd": "ping"})
+        assert response is not None
+        assert "pid" in response
+
+    def test_render_idle(self, daemon):
+        """Render should return no text without an active session."""
+        assert request({"cmd": "render"}) == {"ok": True, "text": None}
+
+    def test_render_active(self, daemon):
+        """Render should pick up a session written by another process."""
+        write_status(Status(session_type=SessionType.BREAK, duration_seconds=600))
+        response = request({"cmd": "render"})
+        assert response["text"].startswith("\U0001F942 ")
+
+    def test_notify(self, daemon, monkeypatch):
+        """Notify should deliver the payload in the background."""
+        delivered = threading.Event()
+        monkeypatch.setitem(notify.BACKENDS, "fake", lambda *args: delivered.set() or True)
+
+        payload = {"backend": "fake", "title": "t", "body": "b"}
+        assert request({"cmd": "notify", "payload": payload}) == {"ok": True}
+        assert delivered.wait(5)
+
+    def test_unknown_command(self, daemon):
+        """Unknown commands should be rejected."""
+        assert request({"cmd": "bogus"}) is None
+
+
+class TestClient:
+    """Test the client helpers with and without a daemon."""
+
+    def test_save_through_daemon(self, daemon):
+        """Saving through the daemon should also update status.json."""
+        save_status(Status(duration_seconds=300, notes="via daemon"))
+        assert load_status().notes == "via daemon"
+        assert read_status().notes == "via daemon"
+
+    def test_fallback_without_daemon(self, config_dir, monkeypatch):
+        """Without a daemon the client should use the status file."""
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        assert not get_socket_path().exists()
+
+        status = Status(duration_seconds=300, notes="offline")
+        save_status(status)
+        assert read_status().notes == "offline"
+        assert load_status().session_id == status.session_id
+
+    def test_stale_socket_is_replaced(self, config_dir, monkeypatch):
+        """A leftover socket file should not block a new daemon."""
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        path = get_socket_path()
+        path.parent.mkdir(parents=True)
+        path.touch()
+
+        server = create_server()
+        server.server_close()
+
+    def test_refuses_second_daemon(self, daemon):
+        """Starting a second daemon on the same socket should fail."""
+        with pytest.raises(RuntimeError):
+            create_server()
@@ -0,0 +1,360 @@
+"""Tests for pomo database operations."""
+
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import psycopg
+import pytest
+
+from pomo import breaker, db
+from pomo.db import (
+    INSERT_SESSION_SQL,
+    REFRESH_ROLLUPS_SQL,
+    REPLICA_BREAKER,
+    get_connection,
+    get_last_write_lsn,
+    read_connection,
+    record_write_lsn,
+    rollup_days,
+    sync_session,
+    sync_sessions,
+    write_batch_plan,
+)
+
+TEST_DATABASE_URL = os.getenv("POMO_TEST_DATABASE_URL")
+TEST_READ_DATABASE_URL = os.getenv("POMO_TEST_READ_DATABASE_URL")
+
+PRIMARY_URL = "postgresql://primary/pomo"
+REPLICA_URL = "postgresql://replica/pomo"
+
+
+def make_session(notes: str) -> dict:
+    started_at = datetime(2026, 1, 21, 9, 0, tzinfo=timezone.utc)
+    return {
+        "session_type": "focus",
+        "started_at": started_at,
+        "ended_at": started_at + timedelta(minutes=25),
+        "planned_seconds": 25 * 60,
+        "completed": True,
+        "notes": notes,
+    }
+
+
+class TestGetConnection:
+    """Test connection setup and the circuit breaker."""
+
+    @patch("pomo.db.psycopg.connect")
+    def test_timeouts_are_set(self, mock_connect, config_dir, monkeypatch):
+        """Connections should use connect and statement timeouts."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://db/pomo")
+        monkeypatch.setenv("POMO_DB_CONNECT_TIMEOUT", "2")
+
+        get_connection()
+
+        kwargs = mock_connect.call_args[1]
+        assert kwargs["connect_timeout"] == 2
+        assert "statement_timeout=30000" in kwargs["options"]
+
+    @patch("pomo.db.psycopg.connect")
+    def test_invalid_timeouts_fall_back(self, mock_connect, config_dir, monkeypatch, capsys):
+        """Unparsable or negative timeouts should warn once and use the defaults."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://db/pomo")
+        monkeypatch.setenv("POMO_DB_CONNECT_TIMEOUT", "5s")
+        monkeypatch.setenv("POMO_DB_STATEMENT_TIMEOUT", "-1")
+        monkeypatch.setattr(db, "_warned_timeouts", {})
+
+        assert get_connection() is not None
+        get_connection()
+
+        kwargs = mock_connect.call_args[1]
+        assert kwargs["connect_timeout"] == db.DEFAULT_CONNECT_TIMEOUT
+        assert f"statement_timeout={db.DEFAULT_STATEMENT_TIMEOUT}" in kwargs["options"]
+        err = capsys.readouterr().err
+        assert err.count("invalid POMO_DB_CONNECT_TIMEOUT '5s'") == 1
+        assert err.count("invalid POMO_DB_STATEMENT_TIMEOUT '-1'") == 1
+
+    @patch("pomo.db.psycopg.connect")
+    def test_breaker_skips_connects(self, mock_connect, config_dir, monkeypatch):
+        """After repeated failures no further connects should be attempted."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://db/pomo")
+        mock_connect.side_effect = psycopg.OperationalError("unreachable")
+
+        for _ in range(breaker.FAILURE_THRESHOLD):
+            assert get_connection() is None
+        assert mock_connect.call_count == breaker.FAILURE_THRESHOLD
+        assert breaker.is_open()
+
+        assert get_connection() is None
+        assert mock_connect.call_count == breaker.FAILURE_THRESHOLD
+
+    @patch("pomo.db.psycopg.connect")
+    def test_half_open_trial_closes_breaker(self, mock_connect, config_dir, monkeypatch):
+        """A successful trial after the open window should close the breaker."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://db/pomo")
+        for _ in range(breaker.FAILURE_THRESHOLD):
+            breaker.record_failure()
+
+        state = json.loads(breaker.get_breaker_path().read_text())
+        state["open_until"] = time.time() - 1
+        breaker.get_breaker_path().write_text(json.dumps(state))
+
+        assert get_connection() is not None
+        assert not breaker.get_breaker_path().exists()
+
+    def test_half_open_allows_one_trial(self, config_dir):
+        """Only one caller should get to run the half-open trial."""
+        for _ in range(breaker.FAILURE_THRESHOLD):
+            breaker.record_failure()
+
+        state = json.loads(breaker.get_breaker_path().read_text())
+        state["open_until"] = time.time() - 1
+        breaker.get_breaker_path().write_text(json.dumps(state))
+
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+
+
+class TestSyncSessions:
+    """Test bulk session sync."""
+
+    @patch("pomo.db.get_connection")
+    def test_no_connection(self, mock_connection):
+        """Rows should be reported as not attempted without a connection."""
+        mock_connection.return_value = None
+        assert sync_sessions([make_session("a"), make_session("b")]) == [None, None]
+
+    @patch("pomo.db.get_connection")
+    def test_batch_uses_one_executemany(self, mock_connection):
+        """A clean batch should be sent with a single executemany."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+
+        assert sync_sessions([make_session("a"), make_session("b")]) == [True, True]
+
+        cur.executemany.assert_called_once()
+        params = cur.executemany.call_args[0][1]
+        assert len(params) == 2
+        assert params[0][5] == 25 * 60  # actual_duration_seconds
+        conn.__exit__.assert_called_once()  # Committed and closed
+
+    @patch("pomo.db.get_connection")
+    def test_bad_row_is_isolated(self, mock_connection):
+        """A rejected row should fail alone when the batch is retried."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.executemany.side_effect = psycopg.DataError("value too long")
+
+        def execute(sql, row=None):
+            if sql == INSERT_SESSION_SQL and row[7] == "bad":
+                raise psycopg.DataError("value too long")
+
+        cur.execute.side_effect = execute
+
+        results = sync_sessions([make_session("ok"), make_session("bad")])
+        assert results == [True, False]
+
+    @patch("pomo.db.get_connection")
+    def test_writes_are_idempotent_upserts(self, mock_connection):
+        """Client ids should be sent and conflicts should update in place."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        session = make_session("a")
+        session["id"] = "0b5c2a62-3c55-4a51-9d0e-4cfa5b4d2f8e"
+
+        sync_sessions([session, make_session("b")])
+
+        sql, params = cur.executemany.call_args[0]
+        assert "ON CONFLICT ON CONSTRAINT pomodoro_sessions_pkey DO UPDATE" in sql
+        assert params[0][0] == session["id"]
+        assert params[1][0]  # Minted when the caller has no id
+
+    @patch("pomo.db.get_connection")
+    def test_rollups_refreshed_in_transaction(self, mock_connection):
+        """The touched days should be recomputed along with the upsert."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        late = make_session("late")
+        late["started_at"] = datetime(2026, 1, 22, 0, 30, tzinfo=timezone(timedelta(hours=2)))
+        late["ended_at"] = late["started_at"] + timedelta(minutes=25)
+
+        sync_sessions([make_session("a"), late])
+
+        refresh = [c for c in cur.execute.call_args_list if c[0][0] == REFRESH_ROLLUPS_SQL]
+        assert len(refresh) == 1
+        # 00:30 at UTC+2 is still the 21st in UTC
+        assert refresh[0][0][1] == ([datetime(2026, 1, 21).date()],)
+
+    def test_write_plan_falls_back_to_savepoints(self):
+        """A rejected batch should be planned again row by row."""
+        params = [db.session_params(make_session(notes)) for notes in ("ok", "bad")]
+        plan = write_batch_plan(params)
+
+        steps = next(plan)
+        assert steps[0].many and steps[0].params == params
+        steps = plan.send(None)
+        assert [step.savepoint for step in steps[:2]] == [True, True]
+        with pytest.raises(StopIteration) as done:
+            plan.send([True, False] + [True] * (len(steps) - 2))
+        assert done.value.value == [True, False]
+
+    @patch("pomo.db.get_connection")
+    def test_missing_table_is_schema_error(self, mock_connection, config_dir):
+        """A missing rollups table should be recorded as a schema problem."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.execute.side_effect = psycopg.errors.UndefinedTable(
+            'relation "pomodoro_daily_rollups" does not exist'
+        )
+
+        assert sync_sessions([make_session("a")]) == [None]
+        assert "pomodoro_daily_rollups" in db.get_schema_error()
+
+        cur.execute.side_effect = None
+        assert sync_sessions([make_session("a")]) == [True]
+        assert db.get_schema_error() is None
+
+    def test_rollups_lock_per_day(self):
+        """Each touched day should get its own advisory lock."""
+        params = [db.session_params(make_session("a"))]
+        lock = db.rollup_steps(params)[0]
+        assert lock.sql == db.LOCK_ROLLUPS_SQL
+        assert lock.params == ([datetime(2026, 1, 21).date()],)
+
+    def test_rollup_days_skip_invalid_rows(self):
+        """Rows without a usable start should not break the rollup refresh."""
+        assert rollup_days([("id", "focus", None)]) == []
+
+    @patch("pomo.db.get_connection")
+    def test_sync_session_wraps_bulk(self, mock_connection):
+        """sync_session should report a plain bool."""
+        mock_connection.return_value = None
+        session = make_session("a")
+        assert sync_session(**session) is False
+
+
+class TestReadRouting:
+    """Test routing of read-only queries to the replica."""
+
+    @pytest.fixture
+    def servers(self, config_dir, monkeypatch):
+        """Fake primary and replica connections, by URL."""
+        monkeypatch.setenv("POMO_DATABASE_URL", PRIMARY_URL)
+        monkeypatch.setenv("POMO_DATABASE_READ_URL", REPLICA_URL)
+        servers = {PRIMARY_URL: MagicMock(), REPLICA_URL: MagicMock()}
+        servers[REPLICA_URL].execute.return_value.fetchone.return_value = (True,)
+
+        def connect(url, **kwargs):
+            server = servers[url]
+            if isinstance(server, Exception):
+                raise server
+            return server
+
+        with patch("pomo.db.psycopg.connect", side_effect=connect):
+            yield servers
+
+    def test_without_replica(self, servers, monkeypatch):
+        """Reads should use the primary when no replica is configured."""
+        monkeypatch.delenv("POMO_DATABASE_READ_URL")
+        with read_connection() as conn:
+            assert conn is servers[PRIMARY_URL]
+
+    def test_uses_replica(self, servers):
+        """Reads should go to a reachable replica."""
+        with read_connection() as conn:
+            assert conn is servers[REPLICA_URL]
+
+    def test_unreachable_replica_falls_back(self, servers):
+        """An unreachable replica should trip its own breaker only."""
+        servers[REPLICA_URL] = psycopg.OperationalError("unreachable")
+
+        with read_connection() as conn:
+            assert conn is servers[PRIMARY_URL]
+        assert breaker.get_breaker_path(REPLICA_BREAKER).exists()
+        assert not breaker.get_breaker_path().exists()
+
+    def test_lagging_replica_falls_back(self, servers):
+        """A replica behind the last write should not serve reads."""
+        replica = servers[REPLICA_URL]
+        replica.execute.return_value.fetchone.return_value = (False,)
+        record_write_lsn("0/16B3748")
+
+        with read_connection() as conn:
+            assert conn is servers[PRIMARY_URL]
+        assert replica.execute.call_args[0][1] == ("0/16B3748",)
+        replica.close.assert_called_once()
+
+    def test_read_your_writes_can_be_disabled(self, servers, monkeypatch):
+        """Without read-your-writes the replica should not be checked."""
+        monkeypatch.setenv("POMO_READ_YOUR_WRITES", "0")
+        record_write_lsn("0/16B3748")
+
+        with read_connection() as conn:
+            assert conn is servers[REPLICA_URL]
+        servers[REPLICA_URL].execute.assert_not_called()
+
+    def test_writes_record_lsn(self, servers):
+        """Syncs should remember the primary's WAL position."""
+        primary = servers[PRIMARY_URL]
+        primary.execute.return_value.fetchone.return_value = ("1/A0",)
+
+        assert sync_sessions([make_session("a")]) == [True]
+        assert get_last_write_lsn() == "1/A0"
+        primary.cursor.return_value.__enter__.return_value.executemany.assert_called_once()
+
+    def test_newest_lsn_wins(self, config_dir):
+        """An older WAL position should not replace a newer one."""
+        record_write_lsn("1/A0")
+        record_write_lsn("0/FFFFFFFF")
+        assert get_last_write_lsn() == "1/A0"
+
+
+@pytest.mark.skipif(
+    not (TEST_DATABASE_URL and TEST_READ_DATABASE_URL),
+    reason="POMO_TEST_DATABASE_URL and POMO_TEST_READ_DATABASE_URL are not set",
+)
+class TestReplica:
+    """Test replica routing on real servers (a replica, or a second database)."""
+
+    @pytest.fixture(autouse=True)
+    def servers(self, config_dir, monkeypatch):
+        monkeypatch.setenv("POMO_DATABASE_URL", TEST_DATABASE_URL)
+        monkeypatch.setenv("POMO_DATABASE_READ_URL", TEST_READ_DATABASE_URL)
+
+    def current(self, **kwargs) -> tuple:
+        with read_connection(**kwargs) as conn:
+            return conn.execute("SELECT current_database(), inet_server_port()").fetchone()
+
+    def server(self, url: str) -> tuple:
+        with psycopg.connect(url) as conn:
+            return conn.execute("SELECT current_database(), inet_server_port()").fetchone()
+
+    def test_reads_use_replica(self):
+        """Reads should be served by the read URL."""
+        assert self.current() == self.server(TEST_READ_DATABASE_URL)
+
+    def test_writes_record_lsn(self):
+        """A sync should record a WAL position the replica has to reach."""
+        assert db.init_db()
+        session = make_session("pomo-test-replica")
+        session["id"] = str(uuid.uuid4())
+
+        assert sync_sessions([session]) == [True]
+        assert get_last_write_lsn() is not None
+
+        with db.connection() as conn:
+            conn.execute("DELETE FROM pomodoro_sessions WHERE id = %s", (session["id"],))
+
+    def test_unreached_lsn_uses_primary(self):
+        """Reads should fall back to the primary until the replica catches up."""
+        record_write_lsn("FFFFFFFF/0")
+        assert self.current() == self.server(TEST_DATABASE_URL)
+        assert self.current(read_your_writes=False) == self.server(TEST_READ_DATABASE_URL)
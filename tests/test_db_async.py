@@ -0,0 +1,160 @@
+"""Tests for the asyncio database layer.
+
+Tests marked with the postgres fixture run against the database in
+POMO_TEST_DATABASE_URL and are skipped when it is not set.
+"""
+
+import asyncio
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+import pytest
+
+from pomo import breaker, db, db_async
+
+TEST_DATABASE_URL = os.getenv("POMO_TEST_DATABASE_URL")
+
+
+def make_sessions(count: int) -> list[dict]:
+    base = datetime(2026, 1, 21, 9, 0, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "session_type": "focus",
+            "started_at": base + timedelta(minutes=30 * i),
+            "ended_at": base + timedelta(minutes=30 * i + 25),
+            "planned_seconds": 25 * 60,
+            "completed": True,
+            "notes": "pomo-test-async",
+        }
+        for i in range(count)
+    ]
+
+
+async def render_while(task: asyncio.Task) -> int:
+    """Tick a fake statusline renderer until the task finishes."""
+    ticks = 0
+    while not task.done():
+        ticks += 1
+        await asyncio.sleep(0.01)
+    return ticks
+
+
+@pytest.fixture
+def postgres(config_dir, monkeypatch):
+    """Point pomo at the test database."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("POMO_TEST_DATABASE_URL is not set")
+    monkeypatch.setenv("POMO_DATABASE_URL", TEST_DATABASE_URL)
+    assert asyncio.run(db_async.init_db())
+
+
+class TestWithoutDatabase:
+    """Test behaviour when no database is available."""
+
+    def test_no_database(self, config_dir, monkeypatch):
+        """Every row should be reported as not written."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        results = asyncio.run(db_async.sync_sessions(make_sessions(3)))
+        assert results == [None, None, None]
+
+    def test_deadline_cancels_slow_writes(self, config_dir, monkeypatch):
+        """Rendering should continue while a hung write runs into its deadline."""
+
+        async def hung_batch(params):
+            await asyncio.sleep(60)
+
+        monkeypatch.setattr(db_async, "_sync_batch", hung_batch)
+
+        async def scenario():
+            task = asyncio.create_task(
+                db_async.sync_sessions(make_sessions(4), batch_size=2, deadline=0.2)
+            )
+            ticks = await render_while(task)
+            return ticks, task.result()
+
+        ticks, results = asyncio.run(scenario())
+        assert ticks >= 5
+        assert results == [None] * 4
+
+    def test_success_clears_schema_error(self, config_dir, monkeypatch):
+        """A stored session should clear a recorded schema error."""
+        db.record_schema_error(
+            psycopg.errors.UndefinedTable('relation "pomodoro_daily_rollups" does not exist')
+        )
+
+        async def failed_batch(params):
+            return [None] * len(params)
+
+        async def stored_batch(params):
+            return [True] * len(params)
+
+        monkeypatch.setattr(db_async, "_sync_batch", failed_batch)
+        asyncio.run(db_async.sync_sessions(make_sessions(2)))
+        assert db.get_schema_error() is not None
+
+        monkeypatch.setattr(db_async, "_sync_batch", stored_batch)
+        asyncio.run(db_async.sync_sessions(make_sessions(2)))
+        assert db.get_schema_error() is None
+
+    def test_get_sessions_asks_replica(self, config_dir, monkeypatch):
+        """Reads should go to a caught-up replica before the primary."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        db.record_write_lsn("16/B374D848")
+        asked = []
+
+        async def get_replica_connection(min_lsn=None):
+            asked.append(min_lsn)
+            return None
+
+        monkeypatch.setattr(db_async, "get_replica_connection", get_replica_connection)
+        assert asyncio.run(db_async.get_sessions(5)) == []
+        assert asked == ["16/B374D848"]
+
+    def test_breaker_runs_off_the_loop(self, config_dir, monkeypatch):
+        """Breaker files should be read in a worker thread, not on the loop."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://db/pomo")
+        threads = []
+
+        def allow(name="db"):
+            threads.append(threading.current_thread())
+            return False
+
+        monkeypatch.setattr(breaker, "allow", allow)
+        assert asyncio.run(db_async.sync_sessions(make_sessions(1))) == [None]
+        assert threads and threading.main_thread() not in threads
+
+
+class TestWithDatabase:
+    """Test against a real Postgres."""
+
+    def test_concurrent_batched_writes(self, postgres):
+        """Batches should be written concurrently while rendering continues."""
+        sessions = make_sessions(40)
+
+        async def scenario():
+            task = asyncio.create_task(db_async.sync_sessions(sessions, batch_size=10))
+            ticks = await render_while(task)
+            return ticks, task.result()
+
+        ticks, results = asyncio.run(scenario())
+        assert results == [True] * 40
+        assert ticks >= 1
+
+        # Retrying is an idempotent upsert
+        assert asyncio.run(db_async.sync_sessions(sessions)) == [True] * 40
+
+    def test_get_sessions(self, postgres):
+        """Written sessions should be readable."""
+        asyncio.run(db_async.sync_sessions(make_sessions(2)))
+        rows = asyncio.run(db_async.get_sessions(2))
+        assert len(rows) == 2
+
+    def test_get_sessions_from_replica(self, postgres, monkeypatch):
+        """A configured replica should serve reads."""
+        monkeypatch.setenv("POMO_DATABASE_READ_URL", TEST_DATABASE_URL)
+        asyncio.run(db_async.sync_sessions(make_sessions(1)))
+        assert len(asyncio.run(db_async.get_sessions(1))) == 1
@@ -0,0 +1,188 @@
+"""Tests for streaming session export."""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from pomo import db, local_db
+from pomo.export import EXPORT_COLUMNS, open_writer
+from pomo.main import app
+from pomo.queries import export_query
+
+runner = CliRunner()
+
+
+def make_sessions(count: int) -> list[dict]:
+    base = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+    return [
+        {
+            "session_type": "focus",
+            "started_at": base + timedelta(days=i),
+            "ended_at": base + timedelta(days=i, minutes=25),
+            "planned_seconds": 25 * 60,
+            "completed": i % 2 == 0,
+            "notes": f"session {i}" if i else None,
+        }
+        for i in range(count)
+    ]
+
+
+class TestExportQuery:
+    """Test the export query builder."""
+
+    def test_no_range(self):
+        """Without a range all rows should be selected in order."""
+        sql, params = export_query(None, None)
+        assert "WHERE" not in sql
+        assert sql.endswith("ORDER BY started_at")
+        assert params == []
+
+    def test_range_on_started_at(self):
+        """The range should be a sargable comparison on started_at."""
+        since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        until = datetime(2026, 2, 1, tzinfo=timezone.utc)
+        sql, params = export_query(since, until, placeholder="?")
+        assert "WHERE started_at >= ? AND started_at < ?" in sql
+        assert params == [since, until]
+
+    def test_local_range_uses_index(self, config_dir):
+        """SQLite should answer a range export from the started_at index."""
+        since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        sql, params = export_query(since, None, placeholder="?")
+        plan = local_db.get_connection().execute(
+            "EXPLAIN QUERY PLAN " + sql, [local_db._timestamp(since)]
+        ).fetchall()
+        assert "idx_pomo_sessions_started_at" in " ".join(row[-1] for row in plan)
+
+
+class TestWriters:
+    """Test the output formats."""
+
+    def rows(self):
+        started = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+        return [
+            ("a", "focus", started, None, 1500, None, False, None, started),
+            ("b", "deep", started, started, 5400, 0, True, 'with "quotes"', started),
+        ]
+
+    def test_csv(self):
+        """CSV should have a header and empty cells for NULLs."""
+        out = io.StringIO()
+        writer = open_writer("csv", stream=out)
+        writer.write_batch(self.rows())
+        writer.close()
+
+        records = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert tuple(records[0]) == EXPORT_COLUMNS
+        assert records[0]["ended_at"] == ""
+        assert records[1]["notes"] == 'with "quotes"'
+        assert records[1]["started_at"] == "2026-01-01T09:00:00+00:00"
+
+    def test_jsonl(self):
+        """JSONL should keep NULLs and booleans."""
+        out = io.StringIO()
+        writer = open_writer("jsonl", stream=out)
+        writer.write_batch(self.rows())
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert records[0]["ended_at"] is None
+        assert records[1]["completed"] is True
+
+    def test_binary_format_needs_path(self):
+        """Parquet and Arrow cannot be written to a text stream."""
+        with pytest.raises(ValueError):
+            open_writer("parquet", stream=io.StringIO())
+
+    def test_parquet(self, tmp_path):
+        """Parquet output should round-trip through pyarrow."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = str(tmp_path / "sessions.parquet")
+        writer = open_writer("parquet", path=path)
+        writer.write_batch(self.rows())
+        writer.write_batch(self.rows())
+        writer.close()
+
+        table = pq.read_table(path)
+        assert table.num_rows == 4
+        assert table.column_names == list(EXPORT_COLUMNS)
+
+
+class TestPostgresExport:
+    """Test streaming from Postgres."""
+
+    @patch("pomo.db.get_connection")
+    def test_uses_named_cursor(self, mock_connection):
+        """Rows should come from a server-side cursor in batches."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchmany.side_effect = [[("a",)] * 3, [("b",)], []]
+        batches = []
+
+        assert db.export_sessions(batches.append, batch_size=3) == 4
+
+        assert conn.cursor.call_args[1]["name"]
+        cur.fetchmany.assert_called_with(3)
+        assert [len(batch) for batch in batches] == [3, 1]
+        assert cur.execute.call_args[0][0].startswith("SELECT id::text,")
+
+    @patch("pomo.db.get_connection")
+    def test_unavailable(self, mock_connection):
+        """An unreachable database should be reported as -1."""
+        mock_connection.return_value = None
+        assert db.export_sessions(lambda rows: None) == -1
+
+
+class TestExportCommand:
+    """Test pomo export against the local store."""
+
+    @pytest.fixture
+    def sessions(self, config_dir, monkeypatch):
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        local_db.sync_sessions(make_sessions(10))
+
+    def test_jsonl_to_stdout(self, sessions):
+        """All sessions should be exported oldest first."""
+        result = runner.invoke(app, ["export", "--format", "jsonl"])
+
+        assert result.exit_code == 0
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert len(records) == 10
+        assert records[0]["started_at"] < records[-1]["started_at"]
+
+    def test_range_is_inclusive(self, sessions):
+        """--since and --until should include both days."""
+        result = runner.invoke(
+            app, ["export", "--since", "2026-01-03", "--until", "2026-01-05"]
+        )
+
+        records = list(csv.DictReader(io.StringIO(result.stdout)))
+        assert [r["started_at"][:10] for r in records] == [
+            "2026-01-03",
+            "2026-01-04",
+            "2026-01-05",
+        ]
+
+    def test_streams_in_batches(self, sessions, monkeypatch):
+        """The local store should also hand rows over batch by batch."""
+        batches = []
+        local_db.export_sessions(batches.append, batch_size=4)
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+
+    def test_output_file(self, sessions, tmp_path):
+        """Writing to a file should report the row count."""
+        path = tmp_path / "sessions.csv"
+        result = runner.invoke(app, ["export", "-o", str(path)])
+
+        assert "Exported 10 sessions" in result.stdout
+        assert path.read_text().count("\n") == 11
+
+    def test_parquet_needs_output(self, sessions):
+        """Parquet to stdout should be refused."""
+        result = runner.invoke(app, ["export", "--format", "parquet"])
+        assert result.exit_code == 1
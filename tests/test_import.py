@@ -0,0 +1,254 @@
+"""Tests for bulk session import."""
+
+import io
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from pomo import db, local_db
+from pomo.importer import (
+    ImportStats,
+    import_sessions,
+    map_pomo,
+    map_toggl,
+    read_records,
+    validate,
+)
+from pomo.main import app
+
+runner = CliRunner()
+
+TOGGL_CSV = """\
+User,Email,Client,Project,Task,Description,Billable,Start date,Start time,End date,End time,Duration,Tags,Amount ()
+Ann,ann@example.com,,Writing,,Chapter 3,No,2025-03-04,09:00:00,2025-03-04,09:25:00,00:25:00,,
+Ann,ann@example.com,,Writing,,Deep dive,No,2025-03-04,10:00:00,2025-03-04,11:30:00,01:30:00,deep,
+"""
+
+
+def native_record(day: int, **overrides) -> dict:
+    started_at = datetime(2025, 1, day, 9, 0, tzinfo=timezone.utc)
+    record = {
+        "session_type": "focus",
+        "started_at": started_at.isoformat(),
+        "ended_at": (started_at + timedelta(minutes=25)).isoformat(),
+        "planned_duration_seconds": 1500,
+        "completed": True,
+        "notes": f"day {day}",
+    }
+    record.update(overrides)
+    return record
+
+
+def jsonl(records: list[dict]) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+class TestMapping:
+    """Test record mappings and validation."""
+
+    def test_pomo_csv_strings(self):
+        """CSV text values should be parsed into typed sessions."""
+        session = validate(
+            map_pomo(
+                {
+                    "id": "",
+                    "session_type": "Deep",
+                    "started_at": "2025-01-02T09:00:00+00:00",
+                    "ended_at": "",
+                    "planned_duration_seconds": "5400",
+                    "completed": "false",
+                    "notes": "",
+                }
+            )
+        )
+        assert session["session_type"] == "deep"
+        assert session["ended_at"] is None
+        assert session["planned_seconds"] == 5400
+        assert session["completed"] is False
+        assert uuid.UUID(session["id"])  # Minted once, for every backend
+
+    def test_toggl(self):
+        """Toggl rows should become sessions, with tags selecting the type."""
+        records = list(read_records(io.StringIO(TOGGL_CSV), "csv"))
+        sessions = [validate(map_toggl(record)) for record in records]
+
+        assert sessions[0]["session_type"] == "focus"
+        assert sessions[0]["planned_seconds"] == 25 * 60
+        assert sessions[0]["notes"] == "Chapter 3"
+        assert sessions[1]["session_type"] == "deep"
+        assert sessions[1]["started_at"].tzinfo is not None
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"session_type": "nap"},
+            {"started_at": ""},
+            {"started_at": "yesterday"},
+            {"ended_at": "2024-12-31T00:00:00+00:00"},
+            {"planned_duration_seconds": -1},
+            {"planned_duration_seconds": 2**31},
+            {"completed": "maybe"},
+            {"notes": 42},
+            {"id": "not-a-uuid"},
+        ],
+    )
+    def test_invalid(self, overrides):
+        """Rows that do not fit the schema should be rejected."""
+        with pytest.raises(ValueError):
+            validate(map_pomo(native_record(2, **overrides)))
+
+
+class TestImportSessions:
+    """Test batching and statistics."""
+
+    def test_batches_and_errors(self):
+        """Valid rows should be loaded in batches and invalid ones reported."""
+        records = [native_record(day) for day in range(1, 8)]
+        records[3]["session_type"] = "nap"
+        loaded = []
+        progress = []
+
+        def load(batch):
+            loaded.append(len(batch))
+            return len(batch)
+
+        stats = import_sessions(
+            iter(records), "pomo", {"fake": load}, batch_size=4, progress=progress.append
+        )
+
+        assert loaded == [4, 2]
+        assert stats.read == 7
+        assert stats.invalid == 1
+        assert stats.inserted == {"fake": 6}
+        assert stats.errors == ["record 4: invalid session_type 'nap'"]
+        assert len(progress) == 2
+
+    def test_unavailable_backend_stops(self):
+        """An unreachable backend should abort the import."""
+        assert import_sessions(iter([native_record(1)]), "pomo", {"x": lambda b: -1}) is None
+
+    def test_bad_jsonl_line(self):
+        """A line that is not a JSON object should count as invalid."""
+        records = read_records(io.StringIO('not json\n\n[1]\n'), "jsonl")
+        stats = import_sessions(records, "pomo", {})
+        assert isinstance(stats, ImportStats)
+        assert stats.read == 2
+        assert stats.invalid == 2
+
+
+class TestLocalImport:
+    """Test loading into the SQLite store."""
+
+    def test_deduplicates_on_start_and_type(self, config_dir):
+        """Known and repeated (started_at, session_type) pairs should be skipped."""
+        existing = map_pomo(native_record(1))
+        local_db.sync_sessions([existing])
+
+        batch = [
+            validate(map_pomo(native_record(1))),  # Already stored
+            validate(map_pomo(native_record(2))),
+            validate(map_pomo(native_record(2, notes="dupe"))),  # Twice in a batch
+            validate(map_pomo(native_record(2, session_type="deep"))),
+        ]
+
+        assert local_db.import_sessions(batch) == 2
+        assert local_db.import_sessions(batch) == 0
+        assert len(local_db.get_sessions(10)) == 3
+
+    def test_updates_rollups(self, config_dir):
+        """Imported sessions should show up in stats."""
+        local_db.import_sessions([validate(map_pomo(native_record(2)))])
+        day = datetime(2025, 1, 2).date()
+        assert local_db.get_stats("day", day, day)[0]["sessions"] == 1
+
+
+class TestPostgresImport:
+    """Test the COPY-based load."""
+
+    @patch("pomo.db.get_connection")
+    def test_copy_then_insert_select(self, mock_connection):
+        """Rows should be copied to staging and moved with one INSERT ... SELECT."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        copy = cur.copy.return_value.__enter__.return_value
+        cur.rowcount = 1
+
+        sessions = [validate(map_pomo(native_record(day))) for day in (1, 2)]
+        assert db.import_sessions(sessions) == 1
+
+        assert cur.copy.call_args[0][0] == db.COPY_STAGING_SQL
+        assert copy.write_row.call_count == 2
+        statements = [c[0][0] for c in cur.execute.call_args_list]
+        assert statements.index(db.INSERT_FROM_STAGING_SQL) > statements.index(
+            db.CREATE_STAGING_SQL
+        )
+
+
+class TestImportCommand:
+    """Test pomo import."""
+
+    def test_roundtrip_with_export(self, config_dir, monkeypatch, tmp_path):
+        """An export should import cleanly into an empty store."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        path = tmp_path / "sessions.jsonl"
+        path.write_text(jsonl([native_record(day) for day in range(1, 6)]))
+
+        result = runner.invoke(app, ["import", str(path)])
+        assert result.exit_code == 0
+        assert "5 new in sqlite" in result.stdout
+
+        result = runner.invoke(app, ["import", str(path)])
+        assert "0 new in sqlite" in result.stdout
+
+        exported = runner.invoke(app, ["export"])
+        reimport = tmp_path / "export.csv"
+        reimport.write_text(exported.stdout)
+        result = runner.invoke(app, ["import", str(reimport)])
+        assert "Loaded 5 sessions (0 new in sqlite" in result.stdout
+
+    def test_mirror_backends_share_ids(self, config_dir, monkeypatch, tmp_path):
+        """Rows without an id should get the same id in both stores."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+        monkeypatch.setenv("POMO_STORAGE", "mirror")
+        loaded = []
+
+        def postgres_import(sessions):
+            loaded.extend(dict(session) for session in sessions)
+            return len(sessions)
+
+        monkeypatch.setattr(db, "import_sessions", postgres_import)
+        path = tmp_path / "toggl.csv"
+        path.write_text(TOGGL_CSV)
+
+        result = runner.invoke(app, ["import", str(path), "--mapping", "toggl"])
+        assert result.exit_code == 0
+
+        rows = local_db.get_connection().execute("SELECT id FROM pomodoro_sessions")
+        local_ids = {row[0] for row in rows}
+        assert len(local_ids) == 2
+        assert {session["id"] for session in loaded} == local_ids
+
+    def test_toggl_file(self, config_dir, monkeypatch, tmp_path):
+        """A Toggl report should be importable with the toggl mapping."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        path = tmp_path / "toggl.csv"
+        path.write_text(TOGGL_CSV)
+
+        result = runner.invoke(app, ["import", str(path), "--mapping", "toggl"])
+        assert result.exit_code == 0
+        assert "2 new in sqlite" in result.stdout
+
+    def test_invalid_rows_fail_the_command(self, config_dir, monkeypatch, tmp_path):
+        """Skipped rows should be listed and make the command fail."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        path = tmp_path / "sessions.jsonl"
+        path.write_text(jsonl([native_record(1), native_record(2, session_type="nap")]))
+
+        result = runner.invoke(app, ["import", str(path)])
+        assert result.exit_code == 1
+        assert "1 new in sqlite" in result.stdout
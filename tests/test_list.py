@@ -0,0 +1,242 @@
+"""Tests for keyset-paginated session listing."""
+
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from pomo import db, local_db
+from pomo.main import app
+from pomo.queries import list_query
+
+runner = CliRunner()
+
+TEST_DATABASE_URL = os.getenv("POMO_TEST_DATABASE_URL")
+
+BASE = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def make_sessions(count: int) -> list[dict]:
+    types = ("focus", "deep", "break")
+    return [
+        {
+            "session_type": types[i % 3],
+            "started_at": BASE + timedelta(hours=i),
+            "ended_at": BASE + timedelta(hours=i, minutes=25),
+            "planned_seconds": 25 * 60,
+            "completed": i % 2 == 0,
+            "notes": f"session {i}",
+        }
+        for i in range(count)
+    ]
+
+
+def local_plan(**kwargs) -> str:
+    sql, params = list_query(10, placeholder="?", **kwargs)
+    params = [local_db._param(value) for value in params]
+    rows = local_db.get_connection().execute("EXPLAIN QUERY PLAN " + sql, params)
+    return " | ".join(row[-1] for row in rows)
+
+
+class TestListQuery:
+    """Test the keyset query builder."""
+
+    def test_newest_first(self):
+        """A plain list should walk started_at backwards."""
+        sql, params = list_query(10)
+        assert sql.endswith("ORDER BY started_at DESC, id DESC LIMIT %s")
+        assert params == [10]
+
+    def test_before_cursor(self):
+        """--before should page backwards without OFFSET."""
+        sql, params = list_query(5, before=BASE)
+        assert "started_at < %s" in sql
+        assert "OFFSET" not in sql
+        assert params == [BASE, 5]
+
+    def test_after_cursor(self):
+        """--after should page forwards, oldest first."""
+        sql, _ = list_query(5, after=BASE)
+        assert "started_at > %s" in sql
+        assert "ORDER BY started_at ASC, id ASC" in sql
+
+    def test_compound_cursor(self):
+        """A cursor with an id should compare (started_at, id) pairs."""
+        sql, params = list_query(5, before=BASE, before_id="b")
+        assert "(started_at, id) < (%s, %s)" in sql
+        assert params == [BASE, "b", 5]
+
+    def test_filters(self):
+        """Filters should become equality and range conditions."""
+        sql, params = list_query(
+            5, session_type="deep", completed=True, since=BASE, until=BASE
+        )
+        assert "session_type = %s AND completed = %s" in sql
+        assert params == ["deep", True, BASE, BASE, 5]
+
+
+class TestLocalPlans:
+    """SQLite should serve every list from an index, without sorting."""
+
+    @pytest.fixture(autouse=True)
+    def sessions(self, config_dir):
+        local_db.sync_sessions(make_sessions(50))
+        local_db.get_connection().execute("ANALYZE")
+
+    def test_plain_list(self):
+        """Newest-first lists should scan the started_at index."""
+        plan = local_plan()
+        assert "idx_pomo_sessions_started_at" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_cursor_and_range(self):
+        """Cursors and date ranges should be index range scans."""
+        plan = local_plan(before=BASE + timedelta(hours=20), since=BASE)
+        assert "idx_pomo_sessions_started_at_id (started_at>? AND started_at<?)" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_compound_cursor(self):
+        """A (started_at, id) cursor should be an index range scan too."""
+        plan = local_plan(before=BASE + timedelta(hours=20), before_id="b")
+        assert "idx_pomo_sessions_started_at_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_type_filter(self):
+        """Type filters should use the composite index."""
+        plan = local_plan(session_type="deep", before=BASE + timedelta(hours=20))
+        assert "idx_pomo_sessions_type_started_at" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestLocalListing:
+    """Test listing from the SQLite store."""
+
+    @pytest.fixture(autouse=True)
+    def sessions(self, config_dir, monkeypatch):
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        local_db.sync_sessions(make_sessions(12))
+
+    def test_emits_each_row(self):
+        """Rows should be handed over one at a time."""
+        seen = []
+        assert local_db.list_sessions(seen.append, limit=5) == 5
+        assert [s["notes"] for s in seen] == [f"session {i}" for i in range(11, 6, -1)]
+
+    def test_filters(self):
+        """Type and completion filters should combine."""
+        seen = []
+        local_db.list_sessions(seen.append, limit=50, session_type="focus", completed=True)
+        assert [s["notes"] for s in seen] == ["session 6", "session 0"]
+
+    def test_pages_cover_everything_once(self):
+        """Following the next-page cursor should visit every session once."""
+        seen = []
+        args = ["list", "5"]
+        while True:
+            result = runner.invoke(app, args)
+            assert result.exit_code == 0
+            seen += re.findall(r"session \d+", result.stdout)
+            cursor = re.search(r"Next page: (--before \S+)", result.stdout)
+            if cursor is None:
+                break
+            args = ["list", "5", *cursor.group(1).split()]
+
+        assert len(seen) == 12
+        assert len(set(seen)) == 12
+
+    def test_after_lists_forward(self):
+        """--after should list the following sessions, oldest first."""
+        result = runner.invoke(app, ["list", "2", "--after", BASE.isoformat()])
+        assert re.findall(r"session \d+", result.stdout) == ["session 1", "session 2"]
+        assert "Next page: --after" in result.stdout
+
+    def test_invalid_cursor(self):
+        """A malformed cursor should be an error."""
+        result = runner.invoke(app, ["list", "--before", "yesterday"])
+        assert result.exit_code == 1
+
+
+class TestTiedStartTimes:
+    """Test paging over sessions that share a start time."""
+
+    def test_pages_cover_tied_sessions(self, config_dir, monkeypatch):
+        """Sessions that started at the same time should each be listed once."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        nine = BASE.replace(day=2)
+        sessions = make_sessions(3)
+        sessions[0].update(session_type="focus", started_at=nine, ended_at=None)
+        sessions[1].update(session_type="break", started_at=nine, ended_at=None)
+        sessions[2].update(
+            session_type="deep", started_at=nine - timedelta(minutes=30), ended_at=None
+        )
+        local_db.sync_sessions(sessions)
+
+        seen = []
+        args = ["list", "1"]
+        while True:
+            result = runner.invoke(app, args)
+            seen += re.findall(r"Focus|Break|Deep", result.stdout)
+            cursor = re.search(r"Next page: (--before \S+)", result.stdout)
+            if cursor is None:
+                break
+            args = ["list", "1", *cursor.group(1).split()]
+
+        assert sorted(seen) == ["Break", "Deep", "Focus"]
+        assert seen[-1] == "Deep"
+
+
+class TestPostgresListing:
+    """Test streaming from Postgres."""
+
+    @patch("pomo.db.get_connection")
+    def test_streams_from_named_cursor(self, mock_connection):
+        """Rows should be fetched through a server-side cursor."""
+        conn = MagicMock()
+        mock_connection.return_value = conn
+        cur = conn.cursor.return_value.__enter__.return_value
+        row = ("focus", BASE, None, 1500, None, False, None, uuid.uuid4())
+        cur.__iter__.return_value = iter([row, row])
+        seen = []
+
+        assert db.list_sessions(seen.append, limit=2, session_type="focus") == 2
+
+        assert conn.cursor.call_args[1]["name"]
+        assert cur.itersize == db.LIST_BATCH_SIZE
+        assert len(seen) == 2
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="POMO_TEST_DATABASE_URL is not set")
+class TestPostgresPlans:
+    """EXPLAIN the list queries on a real Postgres."""
+
+    @pytest.fixture
+    def cur(self, config_dir, monkeypatch):
+        monkeypatch.setenv("POMO_DATABASE_URL", TEST_DATABASE_URL)
+        assert db.init_db()
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                # Tiny test tables would otherwise be read sequentially
+                cur.execute("SET LOCAL enable_seqscan = off")
+                yield cur
+            conn.rollback()
+
+    def plan(self, cur, **kwargs) -> str:
+        sql, params = list_query(10, **kwargs)
+        cur.execute("EXPLAIN " + sql, params)
+        return "\n".join(row[0] for row in cur.fetchall())
+
+    def test_plain_list(self, cur):
+        """Newest-first lists should scan the started_at index backwards."""
+        plan = self.plan(cur, before=BASE)
+        assert "Index Scan Backward using idx_pomo_sessions_started_at" in plan
+        assert "Sort" not in plan
+
+    def test_type_filter(self, cur):
+        """Type filters should use the composite index."""
+        plan = self.plan(cur, session_type="deep", before=BASE)
+        assert "idx_pomo_sessions_type_started_at" in plan
+        assert "Sort" not in plan
@@ -0,0 +1,198 @@
+"""Tests for opt-in telemetry."""
+
+import os
+import subprocess
+import sys
+import threading
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from typer.testing import CliRunner
+
+import pomo.db
+from pomo import metrics, notify, outbox, storage
+from pomo.main import app
+from pomo.status import SessionType, Status
+
+runner = CliRunner()
+
+
+def make_status(session_type: SessionType = SessionType.FOCUS) -> Status:
+    start = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+    return Status(
+        session_type=session_type,
+        start=start,
+        end=start + timedelta(minutes=25),
+        duration_seconds=25 * 60,
+    )
+
+
+@pytest.fixture
+def recording(config_dir, monkeypatch):
+    """Record metrics in this test only."""
+    monkeypatch.setattr(metrics, "_enabled", True)
+    monkeypatch.setattr(metrics, "_pending", {})
+    yield config_dir
+    metrics._pending = {}
+
+
+class TestDisabled:
+    """Test behaviour without POMO_METRICS."""
+
+    def test_nothing_is_recorded(self, config_dir):
+        """Hooks should not record or write anything."""
+        assert not metrics.is_enabled()
+        metrics.inc("pomo_sync_sessions")
+        metrics.observe("pomo_render_duration_seconds", 0.01)
+
+        assert metrics.flush() is False
+        assert not metrics.get_textfile_path().exists()
+
+
+class TestFlush:
+    """Test merging observations into the textfile."""
+
+    def test_counters_add_up_across_flushes(self, recording):
+        """Each flush should add to the totals of earlier processes."""
+        metrics.inc("pomo_sessions_completed", type="focus")
+        metrics.flush()
+        metrics.inc("pomo_sessions_completed", type="focus")
+        metrics.inc("pomo_sessions_completed", type="deep")
+        metrics.flush()
+
+        text = metrics.get_textfile_path().read_text()
+        assert "# TYPE pomo_sessions_completed_total counter" in text
+        assert 'pomo_sessions_completed_total{type="focus"} 2' in text
+        assert 'pomo_sessions_completed_total{type="deep"} 1' in text
+
+    def test_histogram_buckets_are_cumulative(self, recording):
+        """Observations should count in every bucket at or above them."""
+        for seconds in (0.002, 0.02, 20):
+            metrics.observe("pomo_render_duration_seconds", seconds, path="direct")
+        metrics.flush()
+
+        text = metrics.get_textfile_path().read_text()
+        assert 'pomo_render_duration_seconds_bucket{path="direct",le="0.001"} 0' in text
+        assert 'pomo_render_duration_seconds_bucket{path="direct",le="0.0025"} 1' in text
+        assert 'pomo_render_duration_seconds_bucket{path="direct",le="0.025"} 2' in text
+        assert 'pomo_render_duration_seconds_bucket{path="direct",le="+Inf"} 3' in text
+        assert 'pomo_render_duration_seconds_count{path="direct"} 3' in text
+
+    def test_latest_gauge_wins(self, recording):
+        """A gauge should hold the most recent value."""
+        metrics.set_gauge("pomo_outbox_depth", 5)
+        metrics.flush()
+        metrics.set_gauge("pomo_outbox_depth", 2)
+        metrics.flush()
+
+        assert "pomo_outbox_depth 2\n" in metrics.get_textfile_path().read_text()
+
+    def test_textfile_path_override(self, recording, tmp_path, monkeypatch):
+        """POMO_METRICS_TEXTFILE should move the textfile."""
+        path = tmp_path / "collector" / "pomo.prom"
+        monkeypatch.setenv("POMO_METRICS_TEXTFILE", str(path))
+        metrics.inc("pomo_sync_sessions")
+        metrics.flush()
+        assert "pomo_sync_sessions_total 1" in path.read_text()
+
+    def test_openmetrics(self, recording):
+        """OpenMetrics output should name counter families without _total."""
+        metrics.inc("pomo_sync_sessions", 3)
+        metrics.flush()
+
+        text = metrics.render(metrics.read_state(), openmetrics=True)
+        assert "# TYPE pomo_sync_sessions counter" in text
+        assert "pomo_sync_sessions_total 3" in text
+        assert text.endswith("# EOF\n")
+
+    def test_processes_merge_safely(self, config_dir):
+        """Concurrent processes should not lose each other's counts."""
+        env = dict(os.environ, XDG_CONFIG_HOME=str(config_dir.parent), POMO_METRICS="1")
+        code = (
+            "from pomo import metrics\n"
+            "for _ in range(50):\n"
+            "    metrics.inc('pomo_sync_sessions')\n"
+            "    metrics.flush()\n"
+        )
+        processes = [subprocess.Popen([sys.executable, "-c", code], env=env) for _ in range(4)]
+        for process in processes:
+            assert process.wait() == 0
+
+        assert metrics.read_state()["pomo_sync_sessions"][""] == 200
+
+
+class TestHooks:
+    """Test the recording hooks."""
+
+    def test_sync_without_database(self, recording, monkeypatch):
+        """Unreachable syncs should count as failures."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        record = outbox.session_record(make_status(), ended_at=None, completed=True)
+        pomo.db.sync_sessions([outbox.to_session(record)] * 2)
+        metrics.flush()
+
+        state = metrics.read_state()
+        assert state["pomo_sync_failures"] == {'reason="unavailable"': 2}
+        assert state["pomo_sync_duration_seconds"][""]["count"] == 1
+
+    def test_outbox_depth(self, recording, monkeypatch):
+        """A drain should record how many sessions are left."""
+        monkeypatch.setattr(pomo.db, "sync_sessions", lambda sessions: [None] * len(sessions))
+        status = make_status()
+        outbox.append(outbox.session_record(status, ended_at=status.end, completed=True))
+        outbox.drain()
+        metrics.flush()
+
+        assert metrics.read_state()["pomo_outbox_depth"][""]["value"] == 1
+
+    def test_recorded_sessions_by_type(self, recording, monkeypatch):
+        """Completed and stopped sessions should be counted by type."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        storage.record_session(make_status(SessionType.DEEP), None, completed=True)
+        storage.record_session(make_status(SessionType.BREAK), None, completed=False)
+        metrics.flush()
+
+        state = metrics.read_state()
+        assert state["pomo_sessions_completed"] == {'type="deep"': 1}
+        assert state["pomo_sessions_stopped"] == {'type="break"': 1}
+
+    def test_failed_delivery(self, recording):
+        """A notification the child cannot deliver should count as failed."""
+        notify.deliver({"backend": "webhook", "title": "t", "body": "b", "webhook": None})
+        metrics.flush()
+
+        state = metrics.read_state()
+        assert state["pomo_notifications"] == {'backend="webhook",result="failed"': 1}
+
+
+class TestEndpoint:
+    """Test serving and printing the metrics."""
+
+    def test_http_endpoint(self, recording):
+        """/metrics should serve the merged metrics, in OpenMetrics on request."""
+        metrics.inc("pomo_sync_sessions", 4)
+        server = metrics.create_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        try:
+            with urllib.request.urlopen(url) as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert "pomo_sync_sessions_total 4" in response.read().decode()
+
+            request = urllib.request.Request(
+                url, headers={"Accept": "application/openmetrics-text"}
+            )
+            with urllib.request.urlopen(request) as response:
+                assert response.read().decode().endswith("# EOF\n")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_metrics_command(self, recording):
+        """pomo metrics should print the merged metrics."""
+        metrics.inc("pomo_sessions_completed", type="focus")
+
+        result = runner.invoke(app, ["metrics"])
+        assert result.exit_code == 0
+        assert 'pomo_sessions_completed_total{type="focus"} 1' in result.stdout
@@ -0,0 +1,156 @@
+"""Tests for schema migrations and monthly partitions.
+
+Tests of the TestPartitionedDatabase class run against the database in
+POMO_TEST_DATABASE_URL and are skipped when it is not set.
+"""
+
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pomo import db, migrations, outbox
+from pomo.migrations import (
+    MIGRATIONS,
+    create_partitions,
+    ensure_partitions,
+    migrate,
+    next_month,
+    partition_name,
+)
+
+TEST_DATABASE_URL = os.getenv("POMO_TEST_DATABASE_URL")
+
+
+class TestPartitionHelpers:
+    """Test partition naming and month arithmetic."""
+
+    def test_partition_name(self):
+        """Partitions should be named after their month."""
+        assert partition_name(date(2026, 3, 1)) == "pomodoro_sessions_y2026m03"
+
+    def test_next_month_wraps_year(self):
+        """December should be followed by January of the next year."""
+        assert next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+        assert next_month(date(2026, 1, 1)) == date(2026, 2, 1)
+
+    def test_versions_ascend(self):
+        """Migrations should have unique, ascending versions."""
+        versions = [version for version, _, _ in MIGRATIONS]
+        assert versions == sorted(set(versions))
+
+    def test_creates_through_months_ahead(self):
+        """Partitions should run from the first month to months ahead of now."""
+        cur = MagicMock()
+        cur.fetchone.return_value = (False,)
+        today = datetime.now(timezone.utc).date()
+        first = date(today.year - 1, today.month, 1)
+
+        assert create_partitions(cur, first, 2) == 15
+
+
+class TestMigrate:
+    """Test the migration runner."""
+
+    def test_skips_applied_versions(self):
+        """Recorded versions should not be applied again."""
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchone.side_effect = [(1,), None]
+        applied = MagicMock()
+
+        with patch.object(migrations, "MIGRATIONS", [(1, "a", applied), (2, "b", applied)]):
+            assert migrate(conn) == ["b"]
+
+        applied.assert_called_once_with(cur)
+
+    @patch("pomo.db.get_connection")
+    def test_unavailable(self, mock_connection):
+        """An unreachable database should be reported as -1."""
+        mock_connection.return_value = None
+        assert ensure_partitions() == -1
+
+
+class TestMaintenance:
+    """Test partition maintenance from the outbox flusher."""
+
+    def test_runs_once_per_interval(self, config_dir, monkeypatch):
+        """A successful run should not be repeated within the interval."""
+        config_dir.mkdir(parents=True)
+        calls = []
+        monkeypatch.setattr(migrations, "ensure_partitions", lambda: calls.append(1) or 0)
+
+        assert outbox.maintain()
+        assert not outbox.maintain()
+        assert len(calls) == 1
+
+    def test_failure_is_retried(self, config_dir, monkeypatch):
+        """A failed run should be retried by the next flusher."""
+        config_dir.mkdir(parents=True)
+        monkeypatch.setattr(migrations, "ensure_partitions", lambda: -1)
+
+        assert not outbox.maintain()
+        assert not (config_dir / "maintenance.stamp").exists()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="POMO_TEST_DATABASE_URL is not set")
+class TestPartitionedDatabase:
+    """Test the partitioned schema on a real Postgres."""
+
+    @pytest.fixture(autouse=True)
+    def database(self, config_dir, monkeypatch):
+        monkeypatch.setenv("POMO_DATABASE_URL", TEST_DATABASE_URL)
+        assert db.init_db()
+
+    def session(self, started_at: datetime) -> dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "session_type": "focus",
+            "started_at": started_at,
+            "ended_at": started_at + timedelta(minutes=25),
+            "planned_seconds": 25 * 60,
+            "completed": True,
+            "notes": "pomo-test-partitions",
+        }
+
+    def test_is_partitioned(self):
+        """init should leave a partitioned table with a BRIN index."""
+        with db.connection() as conn, conn.cursor() as cur:
+            assert migrations.is_partitioned(cur)
+            cur.execute("SELECT to_regclass('idx_pomo_sessions_started_at_brin')")
+            assert cur.fetchone()[0] is not None
+
+    def test_upsert_and_pruning(self):
+        """Upserts should stay idempotent and ranges should prune partitions."""
+        session = self.session(datetime.now(timezone.utc).replace(microsecond=0))
+        assert db.sync_sessions([session]) == [True]
+        assert db.sync_sessions([dict(session, notes="pomo-test-updated")]) == [True]
+
+        this_month = migrations.month_start(session["started_at"].date())
+        with db.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT notes FROM pomodoro_sessions WHERE id = %s", (session["id"],))
+            assert cur.fetchall() == [("pomo-test-updated",)]
+            cur.execute(
+                "EXPLAIN SELECT * FROM pomodoro_sessions WHERE started_at >= %s",
+                (session["started_at"],),
+            )
+            plan = "\n".join(row[0] for row in cur.fetchall())
+            assert partition_name(date(this_month.year - 1, 1, 1)) not in plan
+            cur.execute("DELETE FROM pomodoro_sessions WHERE id = %s", (session["id"],))
+
+    def test_default_rows_move_to_new_partition(self):
+        """Sessions far in the future should move out of the default partition."""
+        started_at = datetime(2999, 5, 1, 9, 0, tzinfo=timezone.utc)
+        session = self.session(started_at)
+        assert db.sync_sessions([session]) == [True]
+
+        with db.connection() as conn, conn.cursor() as cur:
+            assert migrations.create_partition(cur, date(2999, 5, 1))
+            cur.execute(
+                "SELECT tableoid::regclass::text FROM pomodoro_sessions WHERE id = %s",
+                (session["id"],),
+            )
+            assert cur.fetchone()[0] == "pomodoro_sessions_y2999m05"
+            cur.execute("DROP TABLE pomodoro_sessions_y2999m05")
@@ -1,14 +1,28 @@
 """Tests for pomo notification module."""
 
+import json
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from unittest.mock import patch, MagicMock
 
+import pytest
+
+from pomo import notify, statusline
+from pomo.config import Notifications
 from pomo.notify import (
+    deliver,
+    dispatch_notification,
     is_notify_available,
     get_notification_title,
     get_notification_body,
+    resolve_backend,
     send_notification,
 )
-from pomo.status import Status, SessionType
+from pomo.status import Status, SessionType, read_status, write_status
 
 
 class TestNotificationTitle:
@@ -205,3 +219,215 @@ class TestSendNotification:
         args = mock_run.call_args[0][0]
         body = args[-1]  # Last argument is the body
         assert "Working on API refactor" in body
+
+
+class TestResolveBackend:
+    """Test backend resolution."""
+
+    def setup_method(self):
+        notify._which_cache.clear()
+        notify._backend_cache.clear()
+
+    @patch("pomo.notify.shutil.which")
+    def test_auto_prefers_notify_send(self, mock_which):
+        """Auto should pick notify-send and only search PATH once."""
+        mock_which.return_value = "/usr/bin/notify-send"
+        settings = Notifications()
+
+        assert resolve_backend(settings) == "notify-send"
+        assert resolve_backend(settings) == "notify-send"
+        mock_which.assert_called_once_with("notify-send")
+
+    @patch("pomo.notify.shutil.which")
+    def test_auto_without_anything(self, mock_which, monkeypatch):
+        """Auto should find nothing without notify-send or a session bus."""
+        mock_which.return_value = None
+        monkeypatch.delenv("DBUS_SESSION_BUS_ADDRESS", raising=False)
+        assert resolve_backend(Notifications()) is None
+
+    def test_explicit_backend(self):
+        """An explicit backend should be used as configured."""
+        assert resolve_backend(Notifications(backend="webhook")) == "webhook"
+        assert resolve_backend(Notifications(backend="pigeon")) is None
+
+
+class TestDispatch:
+    """Test fire-and-forget dispatch."""
+
+    @patch("pomo.notify._spawn")
+    def test_command_placeholders(self, mock_spawn):
+        """Command arguments should be expanded and run detached."""
+        settings = Notifications(
+            backend="command", command=["say", "{title}", "--level={urgency}"]
+        )
+        status = Status(session_type=SessionType.BREAK, duration_seconds=60)
+
+        assert dispatch_notification(status, settings) is True
+        mock_spawn.assert_called_once_with(["say", "Break Time Over", "--level=normal"])
+
+    @patch("pomo.notify._spawn")
+    def test_literal_braces_do_not_raise(self, mock_spawn):
+        """An unescaped brace in a command should fail the delivery, not raise."""
+        command = ["sh", "-c", "echo '{\"title\": \"{title}\"}' | curl -d @- http://x"]
+        settings = Notifications(backend="command", command=command)
+
+        assert dispatch_notification(Status(duration_seconds=60), settings) is False
+        mock_spawn.assert_not_called()
+
+    @patch("pomo.notify.request", return_value=None)
+    @patch("pomo.notify._spawn")
+    def test_webhook_runs_in_child(self, mock_spawn, mock_request):
+        """Without pomod, Python backends should run in a detached pomo.notify child."""
+        settings = Notifications(backend="webhook", webhook="http://127.0.0.1:9/hook")
+        dispatch_notification(Status(duration_seconds=60), settings)
+
+        argv = mock_spawn.call_args[0][0]
+        assert argv[1:3] == ["-m", "pomo.notify"]
+        assert json.loads(argv[3])["webhook"] == "http://127.0.0.1:9/hook"
+
+    @patch("pomo.notify.request", return_value={"ok": True})
+    @patch("pomo.notify._spawn")
+    def test_python_backend_goes_to_daemon(self, mock_spawn, mock_request):
+        """With pomod running, it should deliver instead of a new child."""
+        settings = Notifications(backend="dbus")
+        assert dispatch_notification(Status(duration_seconds=60), settings) is True
+
+        message = mock_request.call_args[0][0]
+        assert message["cmd"] == "notify"
+        assert message["payload"]["backend"] == "dbus"
+        mock_spawn.assert_not_called()
+
+    def test_resident_delivers_in_process(self, monkeypatch):
+        """Inside pomod, Python backends should be delivered by a thread."""
+        delivered = threading.Event()
+        monkeypatch.setattr(notify, "_resident", True)
+        monkeypatch.setitem(notify.BACKENDS, "webhook", lambda *args: delivered.set() or True)
+        settings = Notifications(backend="webhook", webhook="http://127.0.0.1:9/hook")
+
+        with (
+            patch("pomo.notify._spawn") as mock_spawn,
+            patch("pomo.notify.request") as mock_request,
+        ):
+            assert dispatch_notification(Status(duration_seconds=60), settings) is True
+            assert delivered.wait(5)
+        mock_spawn.assert_not_called()
+        mock_request.assert_not_called()
+
+    def test_fake_backend(self, monkeypatch):
+        """A registered backend should receive the notification."""
+        received = []
+        monkeypatch.setitem(
+            notify.BACKENDS, "fake", lambda *args: received.append(args[:3]) or True
+        )
+        payload = {"backend": "fake", "title": "t", "body": "b", "urgency": "low"}
+
+        assert deliver(payload) is True
+        assert received == [("t", "b", "low")]
+
+    def test_webhook_delivery(self):
+        """The webhook backend should POST JSON to the endpoint."""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.handle_request, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/notify"
+
+        try:
+            payload = {"backend": "webhook", "title": "t", "body": "b", "webhook": url}
+            assert deliver(payload) is True
+        finally:
+            server.server_close()
+        assert received[0]["title"] == "t"
+
+
+class FakeConnection:
+    """A session bus connection that records calls."""
+
+    def __init__(self, opened: list):
+        opened.append(self)
+        self.sent = 0
+        self.fail = False
+
+    def send_and_get_reply(self, message, timeout):
+        if self.fail:
+            raise ConnectionError("bus went away")
+        self.sent += 1
+
+    def close(self):
+        pass
+
+
+class TestDbusConnection:
+    """Test reuse of the session bus connection."""
+
+    @pytest.fixture
+    def opened(self, monkeypatch):
+        """Stand in for jeepney, recording every connection opened."""
+        opened = []
+        jeepney = types.ModuleType("jeepney")
+        jeepney.DBusAddress = lambda *args, **kwargs: None
+        jeepney.new_method_call = lambda *args: None
+        blocking = types.ModuleType("jeepney.io.blocking")
+        blocking.open_dbus_connection = lambda bus: FakeConnection(opened)
+        monkeypatch.setitem(sys.modules, "jeepney", jeepney)
+        monkeypatch.setitem(sys.modules, "jeepney.io", types.ModuleType("jeepney.io"))
+        monkeypatch.setitem(sys.modules, "jeepney.io.blocking", blocking)
+        monkeypatch.setattr(notify, "_dbus_connection", None)
+        return opened
+
+    def test_connection_is_reused(self, opened):
+        """Later notifications should reuse the first connection."""
+        payload = {"backend": "dbus", "title": "t", "body": "b"}
+        assert deliver(payload) is True
+        assert deliver(payload) is True
+        assert len(opened) == 1
+        assert opened[0].sent == 2
+
+    def test_broken_connection_reconnects(self, opened):
+        """A failed send should drop the connection and reopen it next time."""
+        payload = {"backend": "dbus", "title": "t", "body": "b"}
+        deliver(payload)
+        opened[0].fail = True
+        assert deliver(payload) is False
+        assert deliver(payload) is True
+        assert len(opened) == 2
+
+
+class TestStatuslineBudget:
+    """A hanging backend must not block the statusline."""
+
+    def test_main_returns_quickly(self, config_dir, monkeypatch, capsys):
+        """Completing a session with a hung backend should stay fast."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        config_dir.mkdir(parents=True)
+        config_dir.joinpath("config.json").write_text(
+            json.dumps(
+                {
+                    "notifications": {
+                        "backend": "command",
+                        "command": [sys.executable, "-c", "import time; time.sleep(5)"],
+                    }
+                }
+            )
+        )
+        now = datetime.now(timezone.utc)
+        write_status(Status(start=now - timedelta(minutes=26), end=now - timedelta(minutes=1)))
+
+        started = time.monotonic()
+        statusline.main()
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 1.0
+        assert capsys.readouterr().out.strip()
+        assert read_status().notified is True
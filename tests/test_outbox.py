@@ -0,0 +1,160 @@
+"""Tests for the session sync outbox."""
+
+import json
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+import pytest
+from typer.testing import CliRunner
+
+import pomo.db
+from pomo import outbox
+from pomo.main import app
+from pomo.status import SessionType, Status
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    """Replace the database write with an in-memory list."""
+    rows = []
+
+    def fake_sync_sessions(sessions):
+        rows.extend(sessions)
+        return [True] * len(sessions)
+
+    monkeypatch.setattr(pomo.db, "sync_sessions", fake_sync_sessions)
+    return rows
+
+
+def make_record(notes: str) -> dict:
+    status = Status(session_type=SessionType.DEEP, duration_seconds=60, notes=notes)
+    return outbox.session_record(status, ended_at=status.end, completed=True)
+
+
+class TestAppend:
+    """Test appending to the outbox."""
+
+    def test_append_and_pending(self, config_dir):
+        """Appended records should be counted as pending."""
+        outbox.append(make_record("one"))
+        outbox.append(make_record("two"))
+        assert outbox.pending() == 2
+
+    def test_partial_line_is_ignored(self, config_dir):
+        """A torn write at the end of the file should not break reading."""
+        outbox.append(make_record("one"))
+        with open(outbox.get_outbox_path(), "a") as f:
+            f.write('{"session_type": "fo')
+        assert outbox.pending() == 1
+
+    def test_queue_without_database(self, config_dir, monkeypatch):
+        """Nothing should be queued without a database."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        assert outbox.queue_session(Status(duration_seconds=60), None, False) is False
+        assert outbox.pending() == 0
+
+
+class TestSessionId:
+    """Test session ids in outbox records."""
+
+    def test_record_uses_status_id(self):
+        """Records should carry the id minted with the status."""
+        status = Status(duration_seconds=60)
+        record = outbox.session_record(status, status.end, True)
+        assert record["id"] == status.session_id
+
+    def test_legacy_status_id_is_stable(self):
+        """A status without an id should always map to the same row."""
+        start = datetime(2026, 1, 21, 9, 0, tzinfo=timezone.utc)
+        status = Status(start=start, end=start + timedelta(minutes=25))
+        assert status.session_id is None
+        assert outbox.get_session_id(status) == outbox.get_session_id(replace(status))
+
+
+class TestDrain:
+    """Test draining the outbox."""
+
+    def test_drain_syncs_in_order(self, config_dir, synced):
+        """Drain should sync every record in batches and empty the outbox."""
+        for i in range(5):
+            outbox.append(make_record(str(i)))
+
+        assert outbox.drain(batch_size=2) == 5
+        assert [row["notes"] for row in synced] == ["0", "1", "2", "3", "4"]
+        assert synced[0]["session_type"] == "deep"
+        assert synced[0]["started_at"].tzinfo is not None
+        assert outbox.pending() == 0
+
+    def test_rejected_rows_do_not_block(self, config_dir, monkeypatch):
+        """Rows the database refuses should move to the rejected file."""
+        monkeypatch.setattr(
+            pomo.db,
+            "sync_sessions",
+            lambda sessions: [s["notes"] != "bad" for s in sessions],
+        )
+        for notes in ["good", "bad", "good"]:
+            outbox.append(make_record(notes))
+
+        assert outbox.drain() == 2
+        assert outbox.pending() == 0
+        assert "bad" in outbox.get_rejected_path().read_text()
+
+    def test_failure_keeps_records_and_backs_off(self, config_dir, monkeypatch):
+        """Failed records should stay queued and delay the next attempt."""
+        monkeypatch.setattr(
+            pomo.db, "sync_sessions", lambda sessions: [None] * len(sessions)
+        )
+        outbox.append(make_record("kept"))
+
+        assert outbox.drain() == 0
+        assert outbox.pending() == 1
+
+        state = json.loads(outbox.get_state_path().read_text())
+        assert state["failures"] == 1
+        assert state["next_attempt"] > time.time()
+        assert outbox.drain() == -1
+
+    def test_sync_reports_schema_error(self, config_dir, monkeypatch):
+        """pomo sync should ask for pomo init instead of blaming the network."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+
+        def outdated(sessions):
+            pomo.db.record_schema_error(
+                psycopg.errors.UndefinedTable('relation "pomodoro_daily_rollups" does not exist')
+            )
+            return [None] * len(sessions)
+
+        monkeypatch.setattr(pomo.db, "sync_sessions", outdated)
+        outbox.append(make_record("queued"))
+
+        result = CliRunner().invoke(app, ["sync"])
+        assert result.exit_code == 1
+        assert "schema is out of date" in result.stderr
+        assert "Run 'pomo init'" in result.stderr
+
+    def test_force_ignores_backoff(self, config_dir, synced):
+        """A forced drain should run inside the backoff window."""
+        outbox.get_config_dir().mkdir(parents=True)
+        outbox.get_state_path().write_text(
+            json.dumps({"failures": 3, "next_attempt": time.time() + 600})
+        )
+        outbox.append(make_record("forced"))
+
+        assert outbox.drain(force=True) == 1
+        assert json.loads(outbox.get_state_path().read_text()) == {}
+
+    def test_appends_during_drain_survive(self, config_dir, monkeypatch):
+        """Records appended while a flush is in flight should not be lost."""
+
+        def sync_and_append(sessions):
+            outbox.append(make_record("late"))
+            return [True] * len(sessions)
+
+        monkeypatch.setattr(pomo.db, "sync_sessions", sync_and_append)
+        outbox.append(make_record("first"))
+
+        assert outbox.drain() == 1
+        records, _ = outbox._read_records(outbox.get_outbox_path())
+        assert [r["notes"] for r in records] == ["late"]
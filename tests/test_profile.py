@@ -0,0 +1,123 @@
+"""Tests for opt-in phase timing."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pomo import profile
+
+
+@pytest.fixture
+def profiling(config_dir):
+    """Profile the test, and make sure profiling is off afterwards."""
+    profile.enable()
+    yield
+    profile.finish()
+
+
+def read_trace(path: str) -> list[dict]:
+    with open(path) as f:
+        return json.load(f)["traceEvents"]
+
+
+class TestDisabled:
+    """Test behaviour without profiling."""
+
+    def test_phase_is_shared_noop(self):
+        """Disabled phases should be the same no-op object every time."""
+        assert not profile.is_enabled()
+        assert profile.phase("a") is profile.phase("b")
+
+    def test_finish_writes_nothing(self, config_dir):
+        """Without profiling no trace should be written."""
+        assert profile.finish() is None
+        assert not (config_dir / "profiles").exists()
+
+
+class TestTrace:
+    """Test recorded traces."""
+
+    def test_phases_are_nested_events(self, profiling):
+        """Phases should become complete events inside their parents."""
+        with profile.phase("outer", rows=3):
+            with profile.phase("inner"):
+                pass
+
+        events = {e["name"]: e for e in read_trace(profile.finish())}
+        outer, inner = events["outer"], events["inner"]
+        assert outer["ph"] == "X"
+        assert outer["args"] == {"rows": 3}
+        assert outer["ts"] <= inner["ts"]
+        assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+    def test_traced_function(self, profiling):
+        """Decorated functions should be timed, and errors noted."""
+
+        @profile.traced("db.query", "db")
+        def query():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            query()
+
+        event = next(e for e in read_trace(profile.finish()) if e["name"] == "db.query")
+        assert event["cat"] == "db"
+        assert event["args"] == {"error": "ValueError"}
+
+    def test_old_traces_are_pruned(self, config_dir, monkeypatch):
+        """Only the newest traces should be kept."""
+        monkeypatch.setattr(profile, "MAX_TRACES", 2)
+        directory = config_dir / "profiles"
+        directory.mkdir(parents=True)
+        for i in range(3):
+            (directory / f"pomo-old-{i}.json").write_text("{}")
+            os.utime(directory / f"pomo-old-{i}.json", (i, i))
+
+        profile.enable()
+        path = profile.finish()
+
+        assert sorted(p.name for p in directory.glob("*.json")) == sorted(
+            [os.path.basename(path), "pomo-old-2.json"]
+        )
+
+    def test_cprofile(self, config_dir):
+        """cProfile stats should be saved next to the trace."""
+        profile.enable(cprofile=True)
+        sum(range(1000))
+        path = profile.finish()
+        assert os.path.exists(path.replace(".json", ".prof"))
+
+    def test_imports(self, config_dir, tmp_path, monkeypatch):
+        """Imports should be timed and keep their real loader."""
+        (tmp_path / "pomo_probe_module.py").write_text("VALUE = 1\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        profile.enable(imports=True)
+        import pomo_probe_module
+
+        events = read_trace(profile.finish())
+        assert any(e["name"] == "pomo_probe_module" and e["cat"] == "import" for e in events)
+        assert type(pomo_probe_module.__loader__).__name__ == "SourceFileLoader"
+        del sys.modules["pomo_probe_module"]
+
+
+class TestStatuslineProfile:
+    """Test POMO_PROFILE on the statusline."""
+
+    def test_env_writes_trace(self, config_dir):
+        """A bare pomo with POMO_PROFILE should trace its phases."""
+        env = dict(os.environ, XDG_CONFIG_HOME=str(config_dir.parent), POMO_PROFILE="imports")
+        env.pop("POMO_DATABASE_URL", None)
+        env.pop("XDG_RUNTIME_DIR", None)
+        subprocess.run(
+            [sys.executable, "-c", "from pomo.statusline import main\nmain()\n"],
+            env=env,
+            check=True,
+        )
+
+        [path] = (config_dir / "profiles").glob("*.json")
+        names = {e["name"] for e in read_trace(path)}
+        assert {"daemon.request", "read_status", "pomo.status"} <= names
@@ -0,0 +1,277 @@
+"""Tests for the status store."""
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import pomo.status
+from pomo.status import (
+    Status,
+    claim_completion,
+    get_compact_status_path,
+    read_compact_status,
+    read_status,
+    read_status_fast,
+    unpack_compact_status,
+    write_status,
+)
+
+WORKERS = 16
+TORTURE_WRITES = 150
+
+
+def finished_status() -> Status:
+    now = datetime.now(timezone.utc)
+    return Status(
+        start=now - timedelta(minutes=26),
+        end=now - timedelta(minutes=1),
+        duration_seconds=25 * 60,
+        session_id="0b5c2a62-3c55-4a51-9d0e-4cfa5b4d2f8e",
+    )
+
+
+def claim_worker(barrier, results) -> None:
+    """Race the other workers for the completion claim."""
+    status = read_status()
+    barrier.wait()
+    results.put(claim_completion(status))
+
+
+def write_worker(index: int, writes: int) -> None:
+    """Write a stream of distinct active sessions."""
+    for n in range(writes):
+        write_status(Status(duration_seconds=600, notes=f"{index}-{n}"))
+
+
+def read_worker(done, results) -> None:
+    """Read until the writers finish and count reads that looked stopped."""
+    reads = misses = 0
+    while not done.is_set():
+        reads += 1
+        if read_status().end is None:
+            misses += 1
+    results.put((reads, misses))
+
+
+class TestStatusStore:
+    """Test atomic writes and the read cache."""
+
+    def test_round_trip(self, config_dir):
+        """A written status should read back unchanged."""
+        status = Status(duration_seconds=300, notes="round trip")
+        write_status(status)
+        assert read_status() == status
+
+    def test_no_temp_files_left(self, config_dir):
+        """Atomic writes should not leave temporary files behind."""
+        for policy in pomo.status.FSYNC_POLICIES:
+            write_status(Status(duration_seconds=60), fsync=policy)
+        assert sorted(p.name for p in config_dir.iterdir()) == [
+            "status.bin",
+            "status.json",
+            "status.lock",
+        ]
+
+    def test_sees_external_edits(self, config_dir):
+        """A status.json changed by another tool should be read, not a stale copy."""
+        write_status(Status(duration_seconds=300, notes="old"))
+        assert read_status().notes == "old"
+
+        path = config_dir / "status.json"
+        data = json.loads(path.read_text())
+        data["notes"] = "edited by hand"
+        path.write_text(json.dumps(data))
+        assert read_status().notes == "edited by hand"
+
+    def test_invalid_fsync_policy(self, config_dir):
+        """An unknown fsync policy should be rejected."""
+        with pytest.raises(ValueError):
+            write_status(Status(), fsync="sometimes")
+
+    def test_read_cache_skips_parsing(self, config_dir, monkeypatch):
+        """Unchanged files should be served from the cache."""
+        write_status(Status(duration_seconds=300))
+        monkeypatch.setattr(pomo.status, "_status_cache", None)
+
+        calls = []
+        original = pomo.status.status_from_dict
+
+        def counting(data):
+            calls.append(data)
+            return original(data)
+
+        monkeypatch.setattr(pomo.status, "status_from_dict", counting)
+        first = read_status()
+        second = read_status()
+
+        assert len(calls) == 1
+        assert first == second
+        assert first is not second
+
+    def test_read_cache_sees_other_writers(self, config_dir):
+        """A file replaced by another process should be re-read."""
+        write_status(Status(duration_seconds=300, notes="ours"))
+        assert read_status().notes == "ours"
+
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from pomo.status import Status, write_status; "
+                "write_status(Status(duration_seconds=300, notes='theirs'))",
+            ],
+            env=dict(os.environ, XDG_CONFIG_HOME=str(config_dir.parent)),
+            check=True,
+        )
+        assert read_status().notes == "theirs"
+
+    def test_concurrent_writers_and_readers(self, config_dir):
+        """Readers should never see a torn file while writers race."""
+        write_status(Status(duration_seconds=600))
+
+        ctx = multiprocessing.get_context("fork")
+        done = ctx.Event()
+        results = ctx.Queue()
+        writers = [
+            ctx.Process(target=write_worker, args=(i, TORTURE_WRITES)) for i in range(4)
+        ]
+        readers = [ctx.Process(target=read_worker, args=(done, results)) for _ in range(4)]
+        for proc in readers + writers:
+            proc.start()
+        for proc in writers:
+            proc.join(timeout=60)
+        done.set()
+
+        counts = [results.get(timeout=30) for _ in readers]
+        for proc in readers:
+            proc.join(timeout=30)
+
+        assert sum(reads for reads, _ in counts) > 0
+        assert sum(misses for _, misses in counts) == 0
+        assert read_status().end is not None
+
+
+class TestCompactStatus:
+    """Test the compact binary status record."""
+
+    def test_round_trip(self, config_dir):
+        """The compact record should decode to the written status."""
+        status = Status(duration_seconds=300, notes="caf\u00e9 \U0001F345")
+        write_status(status)
+        assert read_compact_status() == status
+        assert read_compact_status(use_mmap=True) == status
+
+    def test_long_notes_fall_back_to_json(self, config_dir, monkeypatch):
+        """Notes past the read size should come from status.json."""
+        monkeypatch.setattr(pomo.status, "COMPACT_READ_SIZE", 120)
+        write_status(Status(duration_seconds=300, notes="x" * 200))
+        assert read_compact_status() is None
+        assert read_status_fast().notes == "x" * 200
+
+    def test_idle_round_trip(self, config_dir):
+        """An idle status should decode without timestamps."""
+        write_status(Status())
+        assert read_compact_status() == Status()
+
+    def test_notified_flag(self, config_dir):
+        """The notified flag should survive the round trip."""
+        status = finished_status()
+        status.notified = True
+        write_status(status)
+        assert read_compact_status().notified is True
+
+    def test_rejects_garbage(self):
+        """Short or foreign records should be rejected."""
+        assert unpack_compact_status(b"POMO", ()) is None
+        assert unpack_compact_status(b"\0" * 200, ()) is None
+
+    def test_fast_read_falls_back_to_json(self, config_dir):
+        """Without status.bin the JSON file should be used."""
+        write_status(Status(duration_seconds=300, notes="json only"))
+        get_compact_status_path().unlink()
+        assert read_compact_status() is None
+        assert read_status_fast().notes == "json only"
+
+    def test_fast_read_sees_external_edits(self, config_dir):
+        """A status.json replaced after status.bin should win over the record."""
+        write_status(Status(duration_seconds=300, notes="old"))
+        assert read_status_fast().notes == "old"
+
+        path = config_dir / "status.json"
+        data = json.loads(path.read_text())
+        data["notes"] = "edited by hand"
+        path.write_text(json.dumps(data))
+        assert read_compact_status() is None
+        assert read_status_fast().notes == "edited by hand"
+
+
+class TestClaimCompletion:
+    """Test the cross-process completion claim."""
+
+    def test_claim_once(self, config_dir):
+        """The first claim should win and mark the status as notified."""
+        status = finished_status()
+        write_status(status)
+
+        assert claim_completion(status) is True
+        assert status.notified is True
+        assert read_status().notified is True
+        assert claim_completion(finished_status()) is False
+
+    def test_claim_rejects_replaced_session(self, config_dir):
+        """A stale renderer must not claim a session that was replaced."""
+        stale = finished_status()
+        write_status(Status(duration_seconds=600))
+
+        assert claim_completion(stale) is False
+        assert read_status().notified is False
+
+    def test_concurrent_claims(self, config_dir):
+        """Exactly one of many racing processes should win the claim."""
+        write_status(finished_status())
+
+        ctx = multiprocessing.get_context("fork")
+        barrier = ctx.Barrier(WORKERS)
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=claim_worker, args=(barrier, results))
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        claims = [results.get(timeout=5) for _ in workers]
+        assert claims.count(True) == 1
+
+    def test_concurrent_renderers_queue_once(self, config_dir):
+        """Many statusline processes at the end of a session sync it once."""
+        write_status(finished_status())
+        config_dir.joinpath("config.json").write_text(
+            json.dumps({"notifications": {"enabled": False}})
+        )
+        env = dict(
+            os.environ,
+            XDG_CONFIG_HOME=str(config_dir.parent),
+            POMO_DATABASE_URL="postgresql://localhost:1/pomo",
+        )
+        env.pop("XDG_RUNTIME_DIR", None)
+
+        procs = [
+            subprocess.Popen(
+                [sys.executable, "-c", "from pomo.statusline import main; main()"],
+                env=env,
+                stdout=subprocess.PIPE,
+            )
+            for _ in range(WORKERS)
+        ]
+        outputs = [proc.communicate(timeout=30)[0] for proc in procs]
+
+        assert all(output.strip() for output in outputs)
+        assert config_dir.joinpath("outbox.jsonl").read_text().count("\n") == 1
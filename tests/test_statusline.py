@@ -0,0 +1,119 @@
+"""Tests for the fast statusline entry point."""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+from pomo.config import Config
+from pomo.status import Status, SessionType, write_status
+from pomo import local_db
+from pomo.statusline import complete_session, needs_completion, render
+
+HEAVY_MODULES = ["typer", "click", "rich", "psycopg", "pomo.main", "pomo.db"]
+
+PROBE = (
+    "import sys\n"
+    "from pomo.statusline import main\n"
+    "main()\n"
+    "print(' '.join(sorted(sys.modules)))\n"
+)
+
+
+def run_probe(config_dir, **extra_env) -> tuple[str, set[str]]:
+    """Run the statusline in a fresh interpreter and return output and modules."""
+    env = dict(os.environ, XDG_CONFIG_HOME=str(config_dir.parent))
+    env.pop("POMO_DATABASE_URL", None)
+    env.pop("XDG_RUNTIME_DIR", None)
+    env.update(extra_env)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    lines = result.stdout.splitlines()
+    return "\n".join(lines[:-1]), set(lines[-1].split())
+
+
+class TestRender:
+    """Test statusline rendering."""
+
+    def test_render_active(self):
+        """Should render emoji and remaining time."""
+        status = Status(session_type=SessionType.FOCUS, duration_seconds=600)
+        assert render(Config(), status, 90) == "\U0001F345 1m30s"
+
+    def test_render_overtime_uses_warn_emoji(self):
+        """Should use a warning emoji once time is up."""
+        status = Status(session_type=SessionType.FOCUS, duration_seconds=600)
+        assert render(Config(), status, -1) == "\U00002B55 -1s"
+
+    def test_needs_completion(self):
+        """Only finished, unnotified sessions need completion."""
+        status = Status(duration_seconds=60)
+        assert needs_completion(status, 0) is True
+        assert needs_completion(status, 10) is False
+        status.notified = True
+        assert needs_completion(status, 0) is False
+
+
+class TestCompletion:
+    """Test handling a finished session."""
+
+    def test_failed_notification_still_records(self, config_dir, monkeypatch):
+        """A notification that raises should not lose the claimed session."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+
+        def broken(status, settings):
+            raise KeyError('"title"')
+
+        monkeypatch.setattr("pomo.notify.dispatch_notification", broken)
+        now = datetime.now(timezone.utc)
+        status = Status(start=now - timedelta(minutes=2), end=now - timedelta(minutes=1))
+
+        complete_session(Config(), status)
+        assert len(local_db.get_sessions(10)) == 1
+
+
+class TestImportGraph:
+    """The statusline must not import heavy modules."""
+
+    def test_active_session_imports(self, config_dir):
+        """Rendering an active session should only use the stdlib."""
+        write_status(Status(duration_seconds=600))
+        output, modules = run_probe(config_dir)
+
+        assert re.fullmatch(r"\S+ (10|9)m\d\ds", output)
+        assert "pomo.statusline" in modules
+        for name in HEAVY_MODULES:
+            assert name not in modules
+
+    def test_no_session_imports(self, config_dir):
+        """An idle statusline should print nothing and stay light."""
+        output, modules = run_probe(config_dir)
+
+        assert output == ""
+        for name in HEAVY_MODULES:
+            assert name not in modules
+
+    def test_completion_only_appends_locally(self, config_dir):
+        """Completing a session should queue it without loading pomo.db."""
+        now = datetime.now(timezone.utc)
+        write_status(
+            Status(start=now - timedelta(minutes=2), end=now - timedelta(minutes=1))
+        )
+        config_dir.joinpath("config.json").write_text(
+            json.dumps({"notifications": {"enabled": False}})
+        )
+        _, modules = run_probe(
+            config_dir, POMO_DATABASE_URL="postgresql://localhost:1/pomo"
+        )
+
+        assert "pomo.outbox" in modules
+        for name in HEAVY_MODULES:
+            assert name not in modules
+        assert config_dir.joinpath("outbox.jsonl").read_text().count("\n") == 1
@@ -0,0 +1,363 @@
+"""Tests for the local SQLite store and backend selection."""
+
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from typer.testing import CliRunner
+
+from pomo import local_db, outbox, storage
+from pomo.main import app
+from pomo.status import SessionType, Status, write_status
+
+runner = CliRunner()
+
+
+def make_session(minutes_ago: int, **overrides) -> dict:
+    started_at = datetime(2026, 1, 21, 12, 0, tzinfo=timezone.utc) - timedelta(
+        minutes=minutes_ago
+    )
+    session = {
+        "session_type": "focus",
+        "started_at": started_at,
+        "ended_at": started_at + timedelta(minutes=25),
+        "planned_seconds": 25 * 60,
+        "completed": True,
+        "notes": None,
+    }
+    session.update(overrides)
+    return session
+
+
+class TestLocalDb:
+    """Test the SQLite session store."""
+
+    def test_uses_wal(self, config_dir):
+        """The database should run in WAL mode."""
+        assert local_db.init_db()
+        mode = local_db.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_list_uses_started_at_index(self, config_dir):
+        """Listing recent sessions should walk the started_at index."""
+        plan = local_db.get_connection().execute(
+            "EXPLAIN QUERY PLAN " + local_db.SELECT_SESSIONS_SQL, (10,)
+        ).fetchall()
+        assert "idx_pomo_sessions_started_at" in " ".join(row[-1] for row in plan)
+
+    def test_roundtrip(self, config_dir):
+        """Stored sessions should come back newest first."""
+        results = local_db.sync_sessions(
+            [make_session(120, notes="older"), make_session(30, notes="newer")]
+        )
+
+        assert results == [True, True]
+        sessions = local_db.get_sessions(10)
+        assert [s["notes"] for s in sessions] == ["newer", "older"]
+        assert sessions[0]["actual_seconds"] == 25 * 60
+        assert sessions[0]["completed"] is True
+        assert sessions[0]["started_at"] == make_session(30)["started_at"]
+
+    def test_upsert_on_id(self, config_dir):
+        """Writing a session twice should keep a single row."""
+        session = make_session(30, id="8a1c3f7e-7d7a-4d7e-9a57-6c1f1ad7e2a1")
+        local_db.sync_sessions([session])
+        local_db.sync_sessions([dict(session, completed=False)])
+
+        sessions = local_db.get_sessions(10)
+        assert len(sessions) == 1
+        assert sessions[0]["completed"] is False
+
+    def test_bad_row_does_not_block_batch(self, config_dir):
+        """A rejected row should not prevent the others from being stored."""
+        results = local_db.sync_sessions(
+            [make_session(30), make_session(60, session_type=None)]
+        )
+
+        assert results == [True, False]
+        assert len(local_db.get_sessions(10)) == 1
+
+    def test_locked_database(self, config_dir, monkeypatch):
+        """A database that cannot be written should report None."""
+        local_db.init_db()
+        monkeypatch.setattr(local_db, "BUSY_TIMEOUT", 0)
+        local_db.close()
+
+        blocker = sqlite3.connect(local_db.get_local_db_path())
+        blocker.execute("BEGIN EXCLUSIVE")
+        try:
+            assert local_db.sync_sessions([make_session(30)]) == [None]
+        finally:
+            blocker.rollback()
+            blocker.close()
+
+    def test_connection_per_thread(self, config_dir):
+        """Each thread should get its own connection."""
+        local_db.sync_sessions([make_session(30)])
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(local_db.get_sessions(10)))
+        thread.start()
+        thread.join()
+
+        assert len(seen[0]) == 1
+
+
+class TestStorageMode:
+    """Test backend selection."""
+
+    def test_auto_without_database(self, monkeypatch):
+        """Without a database URL, sessions should stay local."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        monkeypatch.delenv("POMO_STORAGE", raising=False)
+        assert storage.get_storage_mode() == "sqlite"
+        assert storage.uses_local()
+        assert not storage.uses_remote()
+
+    def test_auto_with_database(self, monkeypatch):
+        """With a database URL, sessions should stay in Postgres as before."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+        monkeypatch.delenv("POMO_STORAGE", raising=False)
+        assert storage.get_storage_mode() == "postgres"
+        assert not storage.uses_local()
+        assert storage.uses_remote()
+        assert storage.get_read_backend().__name__ == "pomo.db"
+
+    def test_mirror_reads_postgres(self, monkeypatch):
+        """A mirror should read from Postgres, then the local copy."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+        monkeypatch.setenv("POMO_STORAGE", "mirror")
+        assert storage.uses_local()
+        assert [b.__name__ for b in storage._read_backends()] == ["pomo.db", "pomo.local_db"]
+
+    def test_postgres_only(self, monkeypatch):
+        """Reads should go to Postgres when SQLite is disabled."""
+        monkeypatch.setenv("POMO_STORAGE", "postgres")
+        assert not storage.uses_local()
+        assert storage.get_read_backend().__name__ == "pomo.db"
+
+    def test_invalid_mode(self, monkeypatch, capsys):
+        """An unknown mode should warn and fall back to auto."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        monkeypatch.setenv("POMO_STORAGE", "mongodb")
+        monkeypatch.setattr(storage, "_warned_mode", None)
+        assert storage.get_storage_mode() == "sqlite"
+        assert storage.get_storage_mode() == "sqlite"
+        assert capsys.readouterr().err.count("unknown POMO_STORAGE 'mongodb'") == 1
+
+    def test_invalid_mode_keeps_session(self, config_dir, monkeypatch):
+        """A completed session should still be recorded with a bad mode."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        monkeypatch.setenv("POMO_STORAGE", "mongodb")
+        status = Status(duration_seconds=60)
+
+        assert storage.record_session(status, status.end, completed=True)
+        assert len(local_db.get_sessions(10)) == 1
+
+
+class TestRecordSession:
+    """Test recording sessions through the configured backends."""
+
+    def test_local_only(self, config_dir, monkeypatch):
+        """Sessions should be stored locally without touching the outbox."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        status = Status(session_type=SessionType.DEEP, duration_seconds=60, notes="x")
+
+        assert storage.record_session(status, status.end, completed=True)
+
+        sessions = storage.get_sessions(10)
+        assert sessions[0]["session_type"] == "deep"
+        assert sessions[0]["notes"] == "x"
+        assert not config_dir.joinpath("outbox.jsonl").exists()
+
+    def test_mirror_writes_both(self, config_dir, monkeypatch):
+        """A mirror should store locally and queue for Postgres."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+        monkeypatch.setenv("POMO_STORAGE", "mirror")
+        monkeypatch.setattr("pomo.outbox.spawn_flusher", lambda: None)
+        status = Status(duration_seconds=60)
+
+        assert storage.record_session(status, status.end, completed=True)
+
+        assert len(local_db.get_sessions(10)) == 1
+        assert config_dir.joinpath("outbox.jsonl").read_text().count("\n") == 1
+
+    def test_mirror_reads_local_copy_offline(self, config_dir, monkeypatch):
+        """With Postgres unreachable, a mirror should serve reads locally."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+        monkeypatch.setenv("POMO_STORAGE", "mirror")
+        local_db.sync_sessions([make_session(30, notes="local")])
+
+        shown = []
+        assert storage.list_sessions(shown.append, 10) == 1
+        assert shown[0]["notes"] == "local"
+        assert storage.get_sessions(10)[0]["notes"] == "local"
+
+    def test_init_backfills_mirror(self, config_dir, monkeypatch):
+        """pomo init should copy the Postgres history into a mirror's SQLite."""
+        monkeypatch.setenv("POMO_DATABASE_URL", "postgresql://localhost:1/pomo")
+        monkeypatch.setenv("POMO_STORAGE", "mirror")
+        session = make_session(30, notes="from postgres")
+        row = (
+            "5f0c1d2e-3a4b-4c5d-8e6f-7a8b9c0d1e2f",
+            "focus",
+            session["started_at"],
+            session["ended_at"],
+            25 * 60,
+            25 * 60,
+            True,
+            "from postgres",
+            session["ended_at"],
+        )
+
+        def export_sessions(write_batch, since=None, until=None):
+            write_batch([row])
+            return 1
+
+        monkeypatch.setattr("pomo.db.init_db", lambda: True)
+        monkeypatch.setattr("pomo.db.export_sessions", export_sessions)
+
+        assert storage.init_storage()
+        assert storage.init_storage()  # Already copied rows are skipped
+        sessions = local_db.get_sessions(10)
+        assert [s["notes"] for s in sessions] == ["from postgres"]
+
+    def test_locked_database_queues_session(self, config_dir, monkeypatch):
+        """A session SQLite cannot take should be queued, not dropped."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        monkeypatch.setattr(storage, "RECORD_BUSY_TIMEOUT", 0)
+        monkeypatch.setattr("pomo.outbox.spawn_flusher", lambda: None)
+        local_db.init_db()
+        status = Status(duration_seconds=60, notes="queued")
+
+        blocker = sqlite3.connect(local_db.get_local_db_path())
+        blocker.execute("BEGIN EXCLUSIVE")
+        try:
+            assert storage.record_session(status, status.end, completed=True)
+        finally:
+            blocker.rollback()
+            blocker.close()
+        assert outbox.pending_local() == 1
+
+        result = runner.invoke(app, ["sync"])
+        assert "Stored 1 queued sessions locally" in result.stdout
+        assert outbox.pending_local() == 0
+        assert local_db.get_sessions(10)[0]["notes"] == "queued"
+
+    def test_stop_and_list_offline(self, config_dir, monkeypatch):
+        """pomo stop and pomo list should work without a database."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        write_status(Status(duration_seconds=600, notes="offline"))
+
+        result = runner.invoke(app, ["stop"])
+        assert "Session recorded" in result.stdout
+
+        result = runner.invoke(app, ["list"])
+        assert result.exit_code == 0
+        assert "offline" in result.stdout
+
+
+class TestStats:
+    """Test aggregation over the daily rollups."""
+
+    def test_rollups_track_writes(self, config_dir):
+        """Each write should update the rollup of its day."""
+        local_db.sync_sessions(
+            [
+                make_session(30),
+                make_session(90, completed=False, ended_at=None),
+                make_session(60, session_type="deep", planned_seconds=90 * 60),
+            ]
+        )
+
+        rows = local_db.get_connection().execute(
+            "SELECT day, session_type, sessions, completed, seconds"
+            " FROM pomodoro_daily_rollups ORDER BY session_type"
+        ).fetchall()
+        assert rows == [
+            ("2026-01-21", "deep", 1, 1, 25 * 60),
+            ("2026-01-21", "focus", 2, 1, 25 * 60 + 25 * 60),
+        ]
+
+    def test_retries_do_not_double_count(self, config_dir):
+        """Upserting the same session again should leave the rollup unchanged."""
+        session = make_session(30, id="5d0c55a4-9a43-4bf1-8c1e-0b2b5f8f2f61")
+        local_db.sync_sessions([session])
+        local_db.sync_sessions([session])
+
+        stats = storage.get_stats("day", date(2026, 1, 21), date(2026, 1, 21))
+        assert stats[0]["sessions"] == 1
+
+    def test_periods(self, config_dir):
+        """Days should group into ISO weeks and calendar months."""
+        # Wednesday 21 Jan, Monday 19 Jan, Sunday 18 Jan, 31 Dec
+        local_db.sync_sessions(
+            [
+                make_session(0),
+                make_session(2 * 24 * 60),
+                make_session(3 * 24 * 60),
+                make_session(21 * 24 * 60),
+            ]
+        )
+        since, until = date(2025, 12, 1), date(2026, 1, 31)
+
+        days = storage.get_stats("day", since, until)
+        weeks = storage.get_stats("week", since, until)
+        months = storage.get_stats("month", since, until)
+
+        assert len(days) == 4
+        assert [(r["period"], r["sessions"]) for r in weeks] == [
+            (date(2025, 12, 29), 1),
+            (date(2026, 1, 12), 1),
+            (date(2026, 1, 19), 2),
+        ]
+        assert [(r["period"], r["sessions"]) for r in months] == [
+            (date(2025, 12, 1), 1),
+            (date(2026, 1, 1), 3),
+        ]
+
+    def test_range_is_inclusive(self, config_dir):
+        """Both ends of the range should be included."""
+        local_db.sync_sessions([make_session(0), make_session(24 * 60)])
+        stats = storage.get_stats("day", date(2026, 1, 20), date(2026, 1, 20))
+        assert [r["period"] for r in stats] == [date(2026, 1, 20)]
+
+    def test_init_rebuilds_rollups(self, config_dir):
+        """pomo init should rebuild rollups from the sessions table."""
+        local_db.sync_sessions([make_session(30)])
+        conn = local_db.get_connection()
+        with conn:
+            conn.execute("DELETE FROM pomodoro_daily_rollups")
+
+        assert local_db.init_db()
+        assert storage.get_stats("day", date(2026, 1, 21), date(2026, 1, 21))
+
+    def test_invalid_period(self, config_dir):
+        """Unknown periods should be rejected before querying."""
+        with pytest.raises(ValueError):
+            storage.get_stats("year", date(2026, 1, 1), date(2026, 1, 31))
+
+    def test_stats_command(self, config_dir, monkeypatch):
+        """pomo stats should print per-period lines and totals."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        local_db.sync_sessions([make_session(30), make_session(90, completed=False)])
+
+        result = runner.invoke(
+            app, ["stats", "week", "--since", "2026-01-01", "--until", "2026-01-31"]
+        )
+
+        assert result.exit_code == 0
+        assert "2026-01-19  Focus     2 sessions   50% completed" in result.stdout
+        assert "Total       Focus     2 sessions" in result.stdout
+
+    def test_stats_range_only_totals(self, config_dir, monkeypatch):
+        """A range report should only print totals."""
+        monkeypatch.delenv("POMO_DATABASE_URL", raising=False)
+        local_db.sync_sessions([make_session(30)])
+
+        result = runner.invoke(
+            app, ["stats", "range", "--since", "2026-01-01", "--until", "2026-01-31"]
+        )
+
+        assert "2026-01-21" not in result.stdout
+        assert "Total" in result.stdout
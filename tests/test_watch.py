@@ -0,0 +1,145 @@
+"""Tests for change-driven status streaming."""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pomo.config import get_config
+from pomo.status import Status, write_status
+from pomo.timer import seconds_until_change
+from pomo.watch import ConfigWatcher, FileWatcher, watch_status
+
+NOW = datetime(2026, 1, 21, 9, 0, tzinfo=timezone.utc)
+
+
+def status_ending_in(seconds: float) -> Status:
+    return Status(start=NOW, end=NOW + timedelta(seconds=seconds))
+
+
+class TestSecondsUntilChange:
+    """Test the next display boundary computation."""
+
+    def test_idle(self):
+        """An idle status never changes on its own."""
+        assert seconds_until_change(Status()) == float("inf")
+
+    def test_seconds_granularity(self):
+        """Below an hour the display changes every second."""
+        assert seconds_until_change(status_ending_in(90.25), NOW) == pytest.approx(0.25)
+
+    def test_minutes_granularity(self):
+        """Above an hour the display only changes every minute."""
+        assert seconds_until_change(status_ending_in(5430.5), NOW) == pytest.approx(30.5)
+
+    def test_hour_boundary(self):
+        """Dropping below an hour switches to minutes and seconds."""
+        assert seconds_until_change(status_ending_in(3600.2), NOW) == pytest.approx(0.2)
+
+    def test_overtime_blinks_every_second(self):
+        """Once time is up the warning emoji changes every second."""
+        assert seconds_until_change(status_ending_in(-3.25), NOW) == pytest.approx(0.75)
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watcher(request, config_dir, monkeypatch):
+    """A watcher on status.json, with inotify and with stat polling."""
+    if request.param == "polling":
+        monkeypatch.setattr("pomo.watch._load_inotify", lambda: None)
+    w = FileWatcher(config_dir, {"status.json"}, poll_interval=0.05)
+    if request.param == "inotify" and not w.uses_inotify:
+        pytest.skip("inotify is not available")
+    yield w
+    w.close()
+
+
+class TestFileWatcher:
+    """Test waiting for file changes."""
+
+    def test_timeout_without_changes(self, watcher):
+        """Wait should time out when nothing changes."""
+        assert watcher.wait(0.1) is False
+
+    def test_detects_status_write(self, watcher):
+        """An atomic status write should wake the watcher."""
+        threading.Timer(0.1, write_status, args=(Status(duration_seconds=60),)).start()
+        assert watcher.wait(5) is True
+
+    def test_ignores_other_files(self, watcher, config_dir):
+        """Changes to unrelated files should not wake the watcher."""
+        config_dir.joinpath("other.txt").write_text("x")
+        assert watcher.wait(0.2) is False
+
+
+class TestWatchStatus:
+    """Test the watch loop."""
+
+    def test_emits_on_change(self, config_dir):
+        """The loop should emit once per visible change."""
+        lines = queue.Queue()
+        stop = threading.Event()
+        thread = threading.Thread(target=watch_status, args=(lines.put, stop), daemon=True)
+        thread.start()
+
+        assert lines.get(timeout=5) == ""
+        write_status(Status(duration_seconds=2 * 3600))
+        assert lines.get(timeout=5).endswith(("2h00m", "1h59m"))
+
+        stop.set()
+        write_status(Status())
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+def write_config(config_dir, text: str) -> None:
+    config_dir.joinpath("config.json").write_text(text)
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def reloads(request, config_dir, monkeypatch):
+    """A running config watcher, with inotify and with stat polling; yields its reloads."""
+    if request.param == "polling":
+        monkeypatch.setattr("pomo.watch._load_inotify", lambda: None)
+    configs = queue.Queue()
+    watcher = ConfigWatcher(on_reload=configs.put, debounce=0.1, poll_interval=0.05)
+    if request.param == "inotify" and not watcher._files.uses_inotify:
+        watcher._files.close()
+        pytest.skip("inotify is not available")
+    watcher.start()
+    yield configs
+    watcher.stop()
+
+
+class TestConfigWatcher:
+    """Test reloading config.json in resident processes."""
+
+    def test_swaps_in_new_config(self, config_dir, reloads):
+        """An edited config should be visible through get_config."""
+        assert get_config().durations.focus == 25 * 60
+        write_config(config_dir, json.dumps({"durations": {"focus": "50m"}}))
+
+        assert reloads.get(timeout=5).durations.focus == 50 * 60
+        assert get_config().durations.focus == 50 * 60
+
+    def test_save_storm_reloads_once(self, config_dir, reloads):
+        """Quick successive writes should be reloaded once, at the end."""
+        for minutes in range(10, 20):
+            write_config(config_dir, json.dumps({"durations": {"focus": f"{minutes}m"}}))
+            time.sleep(0.01)
+
+        assert reloads.get(timeout=5).durations.focus == 19 * 60
+        with pytest.raises(queue.Empty):
+            reloads.get(timeout=0.5)
+
+    def test_invalid_config_keeps_last_good(self, config_dir, reloads):
+        """A broken edit should not replace the working config."""
+        write_config(config_dir, json.dumps({"durations": {"focus": "50m"}}))
+        reloads.get(timeout=5)
+        write_config(config_dir, '{"durations": {"focus": ')
+
+        with pytest.raises(queue.Empty):
+            reloads.get(timeout=1)
+        assert get_config().durations.focus == 50 * 60